@@ -0,0 +1,17 @@
+from .api import SpaceClient
+from .parser import ParsedReviewId, parse_review_id
+from .processor import DiscussionFilter
+from .session import ReviewData, ReviewSession, load_review, render_color, render_json, render_markdown
+
+__all__ = [
+    "DiscussionFilter",
+    "ParsedReviewId",
+    "ReviewData",
+    "ReviewSession",
+    "SpaceClient",
+    "load_review",
+    "parse_review_id",
+    "render_color",
+    "render_json",
+    "render_markdown",
+]
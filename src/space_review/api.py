@@ -1,41 +1,263 @@
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timezone
+from urllib.parse import quote
+
 import httpx
 
+from .limiter import AdaptiveLimiter, percentile
+
+logger = logging.getLogger(__name__)
+
 
 class SpaceClient:
     BASE_URL = "https://jetbrains.team/api/http"
+    CODE_DISCUSSION_FIELDS = "id,anchor,endAnchor,resolved,channel(id),suggestedEdit"
+    DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+    HEDGE_MIN_SAMPLES = 20
+    PAGE_SIZE = 50
+
+    def __init__(
+        self,
+        token: str,
+        http_client: httpx.Client | None = None,
+        limiter: AdaptiveLimiter | None = None,
+        hedge: bool = False,
+        hedge_budget: float = 0.1,
+    ) -> None:
+        self._owns_client = http_client is None
+        self._client = http_client or httpx.Client(timeout=self.DEFAULT_TIMEOUT)
+        self._headers = {"Authorization": f"Bearer {token}"}
+        self._inflight: dict[tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.limiter = limiter or AdaptiveLimiter()
+        self._stats = {"requests": 0, "coalesced": 0, "errors": 0, "throttled": 0, "hedged": 0, "hedge_wins": 0}
+        self._latencies: deque[float] = deque(maxlen=1000)
+        self._stats_lock = threading.Lock()
+        self.hedge = hedge
+        self.hedge_budget = hedge_budget
+        self._hedge_executor: ThreadPoolExecutor | None = None
+
+    def __enter__(self) -> "SpaceClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._stats["requests"]:
+            metrics = self.metrics()
+            logger.debug(
+                "requests=%d coalesced=%d errors=%d throttled=%d hedged=%d p50=%sms p90=%sms window=%d",
+                metrics["requests"], metrics["coalesced"], metrics["errors"], metrics["throttled"],
+                metrics["hedged"], metrics["p50_ms"], metrics["p90_ms"], metrics["window"],
+            )
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+        if self._owns_client:
+            self._client.close()
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            latencies = list(self._latencies)
+            stats = dict(self._stats)
+        p50, p90 = percentile(latencies, 0.5), percentile(latencies, 0.9)
+        return {
+            **stats,
+            "p50_ms": None if p50 is None else round(p50 * 1000),
+            "p90_ms": None if p90 is None else round(p90 * 1000),
+            "window": self.limiter.window,
+        }
+
+    def _get(
+        self, path: str, params: dict | None = None, timeout: float | None = None, hedge: bool = False
+    ) -> httpx.Response:
+        # Identical GETs issued while one is in flight wait for it instead of hitting the API again.
+        key = (path, tuple(sorted((params or {}).items())))
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                future = self._inflight[key] = Future()
+        if pending is not None:
+            with self._stats_lock:
+                self._stats["coalesced"] += 1
+            return pending.result(timeout=timeout)
+
+        try:
+            if hedge and self.hedge:
+                response = self._send_hedged(path, params, timeout)
+            else:
+                response = self._send(path, params, timeout)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def _send(self, path: str, params: dict | None, timeout: float | None) -> httpx.Response:
+        start = time.monotonic()
+        if not self.limiter.acquire(timeout):
+            raise TimeoutError("Timed out waiting for a request slot")
+        if timeout is not None:
+            timeout = max(timeout - (time.monotonic() - start), 0.001)
+
+        status = latency = None
+        overloaded = False
+        try:
+            sent = time.monotonic()
+            response = self._client.get(
+                self.BASE_URL + path,
+                params=params,
+                headers=self._headers,
+                timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout,
+            )
+            latency = time.monotonic() - sent
+            status = response.status_code
+            overloaded = status == 429 or status >= 500
+            response.raise_for_status()
+            return response
+        except httpx.TimeoutException:
+            overloaded = True
+            raise
+        finally:
+            self.limiter.release(latency, overloaded)
+            self._record(path, status, latency, overloaded)
+
+    def _hedge_delay(self) -> float | None:
+        with self._stats_lock:
+            if len(self._latencies) < self.HEDGE_MIN_SAMPLES:
+                return None
+            return percentile(self._latencies, 0.95)
 
-    def __init__(self, token: str) -> None:
-        self._client = httpx.Client(
-            base_url=self.BASE_URL,
-            headers={"Authorization": f"Bearer {token}"},
+    def _take_hedge_budget(self) -> bool:
+        with self._stats_lock:
+            if self._stats["hedged"] + 1 > self.hedge_budget * self._stats["requests"]:
+                return False
+            self._stats["hedged"] += 1
+            return True
+
+    def _send_hedged(self, path: str, params: dict | None, timeout: float | None) -> httpx.Response:
+        """Send a GET and, if it is still pending after the running p95, a duplicate of it.
+
+        Whichever succeeds first wins. A losing request that is already on the wire cannot
+        be interrupted with the sync client, so it finishes in the background and is dropped.
+        """
+        delay = self._hedge_delay()
+        if delay is None or (timeout is not None and delay >= timeout):
+            return self._send(path, params, timeout)
+
+        if self._hedge_executor is None:
+            with self._stats_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="space-review-hedge")
+        start = time.monotonic()
+        primary = self._hedge_executor.submit(self._send, path, params, timeout)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_hedge_budget():
+            return primary.result()
+
+        remaining = None if timeout is None else max(timeout - (time.monotonic() - start), 0.001)
+        backup = self._hedge_executor.submit(self._send, path, params, remaining)
+        for future in as_completed([primary, backup]):
+            if future.exception() is None:
+                (backup if future is primary else primary).cancel()
+                if future is backup:
+                    with self._stats_lock:
+                        self._stats["hedge_wins"] += 1
+                return future.result()
+        return primary.result()
+
+    def _record(self, path: str, status: int | None, latency: float | None, overloaded: bool) -> None:
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            if status is None or status >= 400:
+                self._stats["errors"] += 1
+            if overloaded:
+                self._stats["throttled"] += 1
+            if latency is not None:
+                self._latencies.append(latency)
+        logger.debug(
+            "GET %s %s %s window=%d in_flight=%d",
+            path.partition("$fields")[0].rstrip("?&"),
+            status or "failed",
+            "-" if latency is None else f"{latency * 1000:.0f}ms",
+            self.limiter.window,
+            self.limiter.in_flight,
         )
 
-    def get_review_by_number(self, project: str, number: str) -> dict:
-        response = self._client.get(
+    def get_review_by_number(self, project: str, number: str, timeout: float | None = None) -> dict:
+        response = self._get(
             f"/projects/key:{project}/code-reviews/number:{number}",
             params={"$fields": "id,project,number,title,state,feedChannelId,branchPairs"},
+            timeout=timeout,
         )
-        response.raise_for_status()
         return response.json()
 
-    def get_feed_messages(self, channel_id: str) -> list[dict]:
-        fields = "messages(id,text,author(name),time,details(className,codeDiscussion))"
-        url = f"/chats/messages?channel=id:{channel_id}&sorting=FromOldestToNewest&batchSize=50&$fields={fields}"
-        response = self._client.get(url)
-        response.raise_for_status()
-        return response.json()["messages"]
+    def get_feed_messages(
+        self,
+        channel_id: str,
+        include_snippets: bool = True,
+        timeout: float | None = None,
+        since: datetime | None = None,
+    ) -> list[dict]:
+        code_discussion = "codeDiscussion" if include_snippets else f"codeDiscussion({self.CODE_DISCUSSION_FIELDS})"
+        fields = f"messages(id,text,author(name),time,details(className,{code_discussion}))"
+        start = None if since is None else since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        messages = {}
+        # Consecutive pages can repeat a message sent at the boundary timestamp.
+        for page in self._iter_message_pages(channel_id, fields, timeout, start):
+            for message in page:
+                messages.setdefault(message["id"], message)
+        return list(messages.values())
+
+    def get_resolution_states(self, channel_id: str, timeout: float | None = None) -> list[dict]:
+        """Feed messages with nothing but the id and resolved flag of each code discussion.
+
+        Reads every page of the feed, so long reviews are refreshed completely.
+        """
+        return [message for page in self.iter_resolution_pages(channel_id, timeout=timeout) for message in page]
+
+    def iter_resolution_pages(self, channel_id: str, timeout: float | None = None) -> Iterator[list[dict]]:
+        """Pages of get_resolution_states; stopping early saves the remaining requests."""
+        return self._iter_message_pages(channel_id, "messages(details(className,codeDiscussion(id,resolved)))", timeout)
+
+    def _iter_message_pages(
+        self, channel_id: str, fields: str, timeout: float | None, start: str | None = None
+    ) -> Iterator[list[dict]]:
+        """Page through a channel oldest first, following nextStartFromDate.
+
+        A page shorter than PAGE_SIZE is the last one, so it ends paging without another request.
+        """
+        url = (
+            f"/chats/messages?channel=id:{channel_id}&sorting=FromOldestToNewest&batchSize={self.PAGE_SIZE}"
+            f"&$fields={fields},nextStartFromDate"
+        )
+        while True:
+            page_url = url if start is None else f"{url}&startFromDate={quote(start, safe=':')}"
+            page = self._get(page_url, timeout=timeout, hedge=True).json()
+            yield page["messages"]
+            next_start = page.get("nextStartFromDate")
+            if len(page["messages"]) < self.PAGE_SIZE or not next_start or next_start == start:
+                return
+            start = next_start
 
-    def get_discussion_thread(self, channel_id: str) -> list[dict]:
+    def get_discussion_thread(self, channel_id: str, timeout: float | None = None) -> list[dict]:
         fields = "messages(id,text,author(name),time)"
         url = f"/chats/messages?channel=id:{channel_id}&sorting=FromOldestToNewest&batchSize=50&$fields={fields}"
-        response = self._client.get(url)
-        response.raise_for_status()
-        return response.json()["messages"]
+        return self._get(url, timeout=timeout, hedge=True).json()["messages"]
 
-    def get_unbound_discussions(self, project: str, review_id: str) -> list[dict]:
-        response = self._client.get(
+    def get_unbound_discussions(self, project: str, review_id: str, timeout: float | None = None) -> list[dict]:
+        response = self._get(
             f"/projects/key:{project}/code-reviews/{review_id}/unbound-discussions",
             params={"$fields": "data(id,resolved,archived,item(id))"},
+            timeout=timeout,
         )
-        response.raise_for_status()
         return response.json()["data"]
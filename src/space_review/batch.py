@@ -0,0 +1,66 @@
+import hashlib
+import heapq
+import json
+import marshal
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+from .formatter import format_markdown, format_json, format_color
+
+OUTPUT_FORMATS = ("markdown", "color", "json")
+
+
+def serialize_review(review: dict, discussions: list[dict], general_comments: list[dict]) -> bytes:
+    # marshal keeps shared snippet lists as back-references and is much cheaper than pickle for plain data.
+    return marshal.dumps((review, [dict(d) for d in discussions], general_comments))
+
+
+def render_serialized(payload: bytes, output_format: str) -> str:
+    review, discussions, general_comments = marshal.loads(payload)
+    if output_format == "json":
+        return format_json(review, discussions, general_comments, indent=None)
+    elif output_format == "color":
+        return format_color(review, discussions, general_comments)
+    else:
+        return format_markdown(review, discussions, general_comments)
+
+
+def render_many(payloads: Iterable[bytes], output_format: str, workers: int | None = None) -> Iterator[str]:
+    if workers == 1:
+        for payload in payloads:
+            yield render_serialized(payload, output_format)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for payload in payloads:
+            pending.append(pool.submit(render_serialized, payload, output_format))
+            while pending and pending[0].done():
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def shard_index(project: str, number: str | int, count: int) -> int:
+    """0-based shard of a review; stable across machines and Python runs, unlike hash()."""
+    digest = hashlib.sha256(f"{project}-{int(number)}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def review_order(project: str, number: str | int) -> tuple[str, int]:
+    return project, int(number)
+
+
+def _ndjson_order(line: str) -> tuple[str, int]:
+    review = json.loads(line)["review"]
+    return review_order(review["project"], review["number"])
+
+
+def merge_ndjson(streams: Iterable[Iterable[str]]) -> Iterator[str]:
+    """K-way merge of NDJSON batch outputs that are each sorted by review_order.
+
+    Only one line per stream is held in memory at a time.
+    """
+    sources = [(line.rstrip("\n") for line in stream if line.strip()) for stream in streams]
+    yield from heapq.merge(*sources, key=_ndjson_order)
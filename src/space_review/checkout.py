@@ -0,0 +1,104 @@
+import mmap
+import subprocess
+from pathlib import Path
+
+SNIPPET_CONTEXT_LINES = 3
+
+
+def _line_range(buffer: bytes | mmap.mmap, start: int, stop: int) -> list[str]:
+    """Decode lines [start, stop) while only touching the bytes up to the last one."""
+    lines = []
+    position = 0
+    index = 0
+    size = len(buffer)
+    while index < stop and position < size:
+        end = buffer.find(b"\n", position)
+        if end == -1:
+            end = size
+        if index >= start:
+            lines.append(buffer[position:end].decode("utf-8", errors="replace").rstrip("\r"))
+        position = end + 1
+        index += 1
+    return lines
+
+
+class LocalCheckout:
+    """Reads anchored files from a local git checkout instead of downloading snippets."""
+
+    def __init__(self, root: str | Path, context: int = SNIPPET_CONTEXT_LINES) -> None:
+        result = subprocess.run(
+            ["git", "-C", str(root), "rev-parse", "--show-toplevel"],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise ValueError(f"Not a git checkout: {root}")
+        self.root = Path(result.stdout.strip())
+        self.context = context
+        self._buffers: dict[tuple[str, str], bytes | mmap.mmap | None] = {}
+        self._files = []
+
+    def __enter__(self) -> "LocalCheckout":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for buffer in self._buffers.values():
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+        for f in self._files:
+            f.close()
+        self._buffers.clear()
+        self._files.clear()
+
+    def _git(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(["git", "-C", str(self.root), *args], capture_output=True)
+
+    def _buffer(self, revision: str, path: str) -> bytes | mmap.mmap | None:
+        key = (revision, path)
+        if key not in self._buffers:
+            self._buffers[key] = self._load(revision, path)
+        return self._buffers[key]
+
+    def _load(self, revision: str, path: str) -> bytes | mmap.mmap | None:
+        working_file = self.root / path
+        if working_file.is_file() and self._git("diff", "--quiet", revision, "--", path).returncode == 0:
+            f = open(working_file, "rb")
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                f.close()
+                return b""
+            self._files.append(f)
+            return buffer
+
+        result = self._git("cat-file", "blob", f"{revision}:{path}")
+        return result.stdout if result.returncode == 0 else None
+
+    def snippet(self, anchor: dict, end_anchor: dict | None = None) -> list[dict]:
+        filename = anchor.get("filename")
+        revision = anchor.get("revision")
+        line = anchor.get("line")
+        if not filename or not revision or line is None:
+            return []
+
+        buffer = self._buffer(revision, filename.lstrip("/"))
+        if buffer is None:
+            return []
+
+        end_line = end_anchor.get("line") if end_anchor and end_anchor.get("line") is not None else line
+        start = max(line - self.context, 0)
+        texts = _line_range(buffer, start, end_line + self.context + 1)
+        return [
+            {
+                "text": text,
+                "type": None,
+                "old_line": None,
+                "new_line": start + offset,
+                "deletes": None,
+                "inserts": None,
+            }
+            for offset, text in enumerate(texts)
+        ]
@@ -1,5 +1,13 @@
+import json
+import logging
 import os
+import re
+import shlex
+import subprocess
 import sys
+from collections.abc import Generator, Iterator
+from contextlib import ExitStack
+from datetime import datetime
 
 import click
 from dotenv import load_dotenv
@@ -7,79 +15,654 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from .api import SpaceClient
-from .parser import parse_review_id
-from .formatter import format_markdown, format_json, format_color
-from .processor import extract_code_discussions, extract_general_comments, filter_discussions, build_discussion_with_thread
+from .batch import merge_ndjson, render_many, review_order, serialize_review, shard_index
+from .checkout import LocalCheckout
+from .limiter import AdaptiveLimiter
+from .parser import ParsedReviewId, parse_review_id, scan_review_ids
+from .compare import diff_reviews, load_review_file
+from .export import join_lines, write_export
+from .formatter import format_search_results, format_changes, iter_color, iter_json, iter_markdown
+from .processor import (
+    DiscussionFilter,
+    SnippetPool,
+    extract_code_discussions,
+    extract_general_comments,
+    filter_discussions,
+    filter_general_comments,
+    build_discussion_with_thread,
+)
+from .paths import default_index_path, default_store_path
+from .session import (
+    DEFAULT_CONCURRENCY,
+    ReviewSession,
+    ThreadScheduler,
+    fetch_review_data,
+    fetch_review_feed,
+    count_unresolved,
+    load_review,
+    refresh_resolutions,
+)
+from .store import ReviewStore
+from .webhook import make_server
 
 
 def fetch_review(
     review_id: str,
-    token: str,
+    token: str | None,
     unresolved_only: bool = False,
     output_json: bool = False,
     output_color: bool = False,
+    store_path: str | None = None,
+    offline: bool = False,
+    snapshot_path: str | None = None,
+    checkout_dir: str | None = None,
+    deadline: float | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    hedge: bool = False,
+    filters: DiscussionFilter | None = None,
+    stack: ExitStack | None = None,
 ) -> tuple[str, list]:
+    chunks, discussions = fetch_review_chunks(
+        review_id,
+        token,
+        unresolved_only=unresolved_only,
+        output_json=output_json,
+        output_color=output_color,
+        store_path=store_path,
+        offline=offline,
+        snapshot_path=snapshot_path,
+        checkout_dir=checkout_dir,
+        deadline=deadline,
+        concurrency=concurrency,
+        hedge=hedge,
+        filters=filters,
+        stack=stack,
+    )
+    return "".join(chunks), discussions
+
+
+def fetch_review_chunks(
+    review_id: str,
+    token: str | None,
+    unresolved_only: bool = False,
+    output_json: bool = False,
+    output_color: bool = False,
+    store_path: str | None = None,
+    offline: bool = False,
+    snapshot_path: str | None = None,
+    checkout_dir: str | None = None,
+    deadline: float | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    hedge: bool = False,
+    filters: DiscussionFilter | None = None,
+    stack: ExitStack | None = None,
+) -> tuple[Iterator[str], list]:
+    """Render a review lazily; a snapshot it was loaded from is closed with ``stack``, if given."""
+    if offline:
+        data = load_review(
+            review_id, unresolved_only, store_path=store_path, snapshot_path=snapshot_path, filters=filters
+        )
+        if stack is not None:
+            stack.enter_context(data)
+    else:
+        with ReviewSession(token=token, hedge=hedge, max_concurrency=concurrency) as session:
+            data = session.get_review(
+                review_id,
+                unresolved_only,
+                store_path=store_path,
+                snapshot_path=snapshot_path,
+                checkout_dir=checkout_dir,
+                deadline=deadline,
+                concurrency=concurrency,
+                filters=filters,
+            )
+
+    chunks = _render_chunks(
+        data.review, data.discussions, data.general_comments, data.fetched_at, output_json, output_color
+    )
+    return chunks, data.discussions
+
+
+def stream_review_color(
+    review_id: str,
+    token: str,
+    unresolved_only: bool = False,
+    checkout_dir: str | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    hedge: bool = False,
+    filters: DiscussionFilter | None = None,
+) -> Iterator[str]:
     parsed = parse_review_id(review_id)
-    client = SpaceClient(token=token)
+    client = SpaceClient(token=token, hedge=hedge, limiter=AdaptiveLimiter(maximum=concurrency))
+    try:
+        yield from _stream_review_color(client, parsed, unresolved_only, checkout_dir, concurrency, filters)
+    finally:
+        client.close()
+
+
+def _stream_review_color(
+    client: SpaceClient,
+    parsed: ParsedReviewId,
+    unresolved_only: bool,
+    checkout_dir: str | None,
+    concurrency: int,
+    filters: DiscussionFilter | None = None,
+) -> Iterator[str]:
+    review, feed_messages, unbound_discussions = fetch_review_feed(
+        client,
+        parsed,
+        include_snippets=checkout_dir is None,
+        index_path=default_index_path(),
+        since=filters.since if filters else None,
+    )
+    if checkout_dir:
+        with LocalCheckout(checkout_dir) as checkout:
+            discussions = extract_code_discussions(feed_messages, snippet_source=checkout.snippet)
+    else:
+        discussions = extract_code_discussions(feed_messages)
+    discussions = filter_discussions(discussions, unresolved_only, filters)
+    general_comments = filter_general_comments(extract_general_comments(feed_messages, unbound_discussions), filters)
+
+    # Spare workers prefetch unresolved and suggestion threads while the stream renders in
+    # feed order; resolved threads are fetched only once the stream reaches them.
+    with ThreadScheduler(client, discussions, concurrency, actionable_only=True) as scheduler:
+
+        def load_thread(discussion: dict) -> None:
+            discussion.update(build_discussion_with_thread(discussion, scheduler.thread(discussion)))
 
-    review = client.get_review_by_number(parsed.project, parsed.number)
+        yield from iter_color(review, discussions, general_comments, load_thread=load_thread)
 
-    feed_messages = client.get_feed_messages(review["feedChannelId"])
-    unbound_discussions = client.get_unbound_discussions(parsed.project, review["id"])
-    discussions = extract_code_discussions(feed_messages)
-    discussions = filter_discussions(discussions, unresolved_only)
-    general_comments = extract_general_comments(feed_messages, unbound_discussions)
 
-    for discussion in discussions:
-        thread_messages = client.get_discussion_thread(discussion["channel_id"])
-        discussion.update(build_discussion_with_thread(discussion, thread_messages))
+def _write_stream(chunks: Generator[str, None, None], use_pager: bool) -> None:
+    pager = None
+    if use_pager and sys.stdout.isatty():
+        env = {**os.environ, "LESS": os.environ.get("LESS", "FRX")}
+        pager = subprocess.Popen(
+            shlex.split(os.environ.get("PAGER") or "less -R"), stdin=subprocess.PIPE, text=True, encoding="utf-8", env=env
+        )
+        out = pager.stdin
+    else:
+        out = sys.stdout
 
+    try:
+        for chunk in chunks:
+            out.write(chunk + "\n")
+            out.flush()
+    except BrokenPipeError:
+        # The reader went away (pager quit, `| head`): stop fetching and rendering the rest.
+        if pager is None:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        chunks.close()
+        if pager is not None:
+            try:
+                pager.stdin.close()
+            except BrokenPipeError:
+                pass
+            pager.wait()
+
+
+def _render_chunks(
+    review: dict,
+    discussions: list,
+    general_comments: list[dict],
+    cached_at: str | None,
+    output_json: bool,
+    output_color: bool,
+) -> Iterator[str]:
     if output_json:
-        return format_json(review, discussions, general_comments), discussions
+        return iter_json(review, discussions, general_comments, cached_at=cached_at)
     elif output_color:
-        return format_color(review, discussions, general_comments), discussions
+        return join_lines(iter_color(review, discussions, general_comments, cached_at=cached_at))
     else:
-        return format_markdown(review, discussions, general_comments), discussions
+        return join_lines(iter_markdown(review, discussions, general_comments, cached_at=cached_at))
+
 
+def _enable_trace() -> None:
+    logging.basicConfig(format="[trace] %(message)s", stream=sys.stderr, force=True)
+    logging.getLogger("space_review").setLevel(logging.DEBUG)
 
-@click.command()
+
+class Duration(click.ParamType):
+    name = "duration"
+    _UNITS = {"ms": 0.001, "s": 1, "m": 60}
+
+    def convert(self, value, param, ctx) -> float:
+        if isinstance(value, (int, float)):
+            return float(value)
+        match = re.fullmatch(r"(\d+(?:\.\d+)?)(ms|s|m)?", value.strip())
+        if not match or float(match.group(1)) <= 0:
+            self.fail(f"{value!r} is not a duration like 5s, 500ms or 2m", param, ctx)
+        return float(match.group(1)) * self._UNITS[match.group(2) or "s"]
+
+
+class Shard(click.ParamType):
+    name = "i/n"
+
+    def convert(self, value, param, ctx) -> tuple[int, int]:
+        if isinstance(value, tuple):
+            return value
+        match = re.fullmatch(r"(\d+)/(\d+)", value.strip())
+        if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+            self.fail(f"{value!r} is not a shard like 1/4", param, ctx)
+        return int(match.group(1)) - 1, int(match.group(2))
+
+
+def _select_shard(ids: list[str], shard: tuple[int, int]) -> list[str]:
+    """Keep this shard's reviews, sorted so shard outputs can be merged.
+
+    IDs that do not parse are kept by the first shard, so the error is reported once.
+    """
+    index, count = shard
+    selected = []
+    for review_id in ids:
+        try:
+            parsed = parse_review_id(review_id)
+        except ValueError:
+            if index == 0:
+                selected.append((("", -1), review_id))
+            continue
+        if shard_index(parsed.project, parsed.number, count) == index:
+            selected.append((review_order(parsed.project, parsed.number), review_id))
+    return [review_id for _, review_id in sorted(selected)]
+
+
+class ReviewGroup(click.Group):
+    """Group that falls back to the review command when no subcommand is given."""
+
+    default_command = "show"
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if not args or (args[0] not in self.commands and args[0] not in ctx.help_option_names):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+    def format_help(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        self.commands[self.default_command].format_help(ctx, formatter)
+        self.format_commands(ctx, formatter)
+
+
+@click.group(cls=ReviewGroup)
+def main():
+    pass
+
+
+@main.command("show", hidden=True)
 @click.argument("review_id")
 @click.option("--json", "output_json", is_flag=True, help="Output as JSON")
 @click.option("--color", "output_color", is_flag=True, help="Output with colors (default is plain markdown)")
 @click.option("--unresolved", "unresolved_only", is_flag=True, help="Show only unresolved discussions")
 @click.option("--token", envvar="SPACE_TOKEN", help="Space API token")
 @click.option("-o", "--output", "output_file", type=click.Path(), help="Export to markdown file")
-def main(review_id: str, output_json: bool, output_color: bool, unresolved_only: bool, token: str | None, output_file: str | None):
+@click.option("--store", "store_path", type=click.Path(), help="Persist the review into a local SQLite store")
+@click.option("--offline", is_flag=True, help="Render from the local store without network access or token")
+@click.option("--snapshot", "snapshot_path", type=click.Path(), help="Write a binary snapshot (or read it with --offline)")
+@click.option("--no-pager", is_flag=True, help="Write --color output to stdout instead of $PAGER")
+@click.option("--checkout", "checkout_dir", type=click.Path(exists=True, file_okay=False), help="Read code snippets from this local git checkout instead of downloading them")
+@click.option("--deadline", type=Duration(), help="Time budget, e.g. 5s; threads not loaded by then are shown as placeholders")
+@click.option("--concurrency", default=DEFAULT_CONCURRENCY, show_default=True, type=click.IntRange(min=1), help="Upper bound on parallel requests to Space")
+@click.option("--trace", is_flag=True, help="Log every API request and a metrics summary to stderr")
+@click.option("--hedge", is_flag=True, help="Re-send thread and feed requests that run past the p95 latency")
+@click.option("--author", help="Only discussions and comments started by this author")
+@click.option("--file", "file_glob", help="Only discussions on files matching this glob, e.g. 'plugins/bazel/*.kt'")
+@click.option("--since", type=click.DateTime(["%Y-%m-%d", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M:%S"]), help="Only feedback posted from this date (local time) on")
+@click.option("--suggestions-only", is_flag=True, help="Show only code suggestions")
+def show(
+    review_id: str,
+    output_json: bool,
+    output_color: bool,
+    unresolved_only: bool,
+    token: str | None,
+    output_file: str | None,
+    store_path: str | None,
+    offline: bool,
+    snapshot_path: str | None,
+    no_pager: bool,
+    checkout_dir: str | None,
+    deadline: float | None,
+    concurrency: int,
+    trace: bool,
+    hedge: bool,
+    author: str | None,
+    file_glob: str | None,
+    since: datetime | None,
+    suggestions_only: bool,
+):
     """Fetch code review discussions from JetBrains Space.
 
     REVIEW_ID can be in format: IJ-CR-174369, IJ-MR-188658, or a Space URL.
     """
     if token is None:
         token = os.environ.get("SPACE_TOKEN")
+    if trace:
+        _enable_trace()
+
+    if not token and not offline:
+        click.echo("Error: No token provided. Use --token flag, SPACE_TOKEN env var, or .env file.", err=True)
+        sys.exit(1)
+
+    filters = None
+    if author or file_glob or since or suggestions_only:
+        filters = DiscussionFilter(author=author, file_glob=file_glob, suggestions_only=suggestions_only, since=since)
 
+    try:
+        if output_color and not (output_json or output_file or store_path or snapshot_path or offline or deadline):
+            _write_stream(
+                stream_review_color(
+                    review_id,
+                    token,
+                    unresolved_only,
+                    checkout_dir=checkout_dir,
+                    concurrency=concurrency,
+                    hedge=hedge,
+                    filters=filters,
+                ),
+                use_pager=not no_pager,
+            )
+            return
+
+        with ExitStack() as stack:
+            fetch = fetch_review_chunks if output_file else fetch_review
+            output, _ = fetch(
+                review_id=review_id,
+                token=token,
+                unresolved_only=unresolved_only,
+                output_json=output_json,
+                output_color=output_color,
+                store_path=store_path,
+                offline=offline,
+                snapshot_path=snapshot_path,
+                checkout_dir=checkout_dir,
+                deadline=deadline,
+                concurrency=concurrency,
+                hedge=hedge,
+                filters=filters,
+                stack=stack,
+            )
+            if output_file:
+                if write_export(output_file, output):
+                    click.echo(f"Exported to {output_file}")
+                else:
+                    click.echo(f"Unchanged: {output_file}")
+            else:
+                click.echo(output)
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"Error fetching review: {e}", err=True)
+        sys.exit(1)
+
+
+@main.command()
+@click.argument("review_ids", nargs=-1)
+@click.option("--from", "ids_file", type=click.File("r"), help="Read review IDs, one per line, from a file (- for stdin)")
+@click.option("--json", "output_json", is_flag=True, help="Output as NDJSON, one review per line")
+@click.option("--color", "output_color", is_flag=True, help="Output with colors (default is plain markdown)")
+@click.option("--unresolved", "unresolved_only", is_flag=True, help="Show only unresolved discussions")
+@click.option("-j", "--jobs", type=click.IntRange(min=1), help="Render processes (default: number of CPUs)")
+@click.option("--token", envvar="SPACE_TOKEN", help="Space API token")
+@click.option("--trace", is_flag=True, help="Log every API request and a metrics summary to stderr")
+@click.option("--hedge", is_flag=True, help="Re-send thread and feed requests that run past the p95 latency")
+@click.option("--shard", type=Shard(), help="Only fetch shard i of n (e.g. 2/4), sorted by review for `merge`")
+def batch(
+    review_ids: tuple[str, ...],
+    ids_file,
+    output_json: bool,
+    output_color: bool,
+    unresolved_only: bool,
+    jobs: int | None,
+    token: str | None,
+    trace: bool,
+    hedge: bool,
+    shard: tuple[int, int] | None,
+):
+    """Fetch several reviews and render them in parallel processes."""
+    if trace:
+        _enable_trace()
+    ids = list(review_ids)
+    if ids_file:
+        ids.extend(line.strip() for line in ids_file if line.strip())
+    if not ids:
+        click.echo("Error: No review IDs given.", err=True)
+        sys.exit(1)
+    if shard:
+        ids = _select_shard(ids, shard)
+        if not ids:
+            return
     if not token:
         click.echo("Error: No token provided. Use --token flag, SPACE_TOKEN env var, or .env file.", err=True)
         sys.exit(1)
 
+    session = ReviewSession(token=token, hedge=hedge)
+    snippet_pool = SnippetPool()
+    failures = 0
+
+    def payloads():
+        nonlocal failures
+        for review_id in ids:
+            try:
+                parsed = parse_review_id(review_id)
+                data = fetch_review_data(
+                    session.client, parsed, unresolved_only, snippet_pool=snippet_pool, index_path=session.index_path
+                )
+            except Exception as e:
+                failures += 1
+                click.echo(f"Error fetching {review_id}: {e}", err=True)
+                continue
+            yield serialize_review(*data)
+
+    output_format = "json" if output_json else "color" if output_color else "markdown"
+    with session:
+        for output in render_many(payloads(), output_format, workers=jobs):
+            click.echo(output)
+
+    if failures:
+        sys.exit(1)
+
+
+@main.command()
+@click.argument("files", nargs=-1, required=True, type=click.File("r"))
+def merge(files):
+    """Merge sharded `batch --json --shard` outputs into one stream ordered by review."""
+    try:
+        for line in merge_ndjson(files):
+            click.echo(line)
+    except (ValueError, KeyError, TypeError) as e:
+        click.echo(f"Error: not a sorted batch --json output: {e}", err=True)
+        sys.exit(1)
+
+
+@main.command()
+@click.argument("files", nargs=-1, type=click.File("r"))
+@click.option("--host", "hosts", multiple=True, envvar="SPACE_HOSTS", help="Additional Space host to recognize in URLs")
+def scan(files, hosts: tuple[str, ...]):
+    """Print every review ID or URL found in FILES (or stdin), one per line.
+
+    The output can be piped into `space-review batch --from -`.
+    """
+    streams = files or [sys.stdin]
+    for parsed in scan_review_ids((line for stream in streams for line in stream), hosts=hosts):
+        click.echo(f"{parsed.project}-CR-{parsed.number}")
+
+
+@main.command()
+@click.option("--host", default="127.0.0.1", show_default=True, help="Interface to listen on")
+@click.option("--port", default=8080, show_default=True, help="Port to listen on")
+@click.option("--signing-key", envvar="SPACE_WEBHOOK_SIGNING_KEY", help="Webhook signing key from the Space application")
+@click.option("--store", "store_path", type=click.Path(), help="Path to the local SQLite store")
+def listen(host: str, port: int, signing_key: str | None, store_path: str | None):
+    """Receive Space webhooks and keep reviews in the local store up to date."""
+    if not signing_key:
+        click.echo("Error: No signing key provided. Use --signing-key or SPACE_WEBHOOK_SIGNING_KEY.", err=True)
+        sys.exit(1)
+
+    def on_event(class_name: str, updated: str | None) -> None:
+        click.echo(f"{class_name}: {'updated ' + updated if updated else 'ignored'}", err=True)
+
+    server = make_server(store_path or default_store_path(), signing_key, host=host, port=port, on_event=on_event)
+    click.echo(f"Listening on http://{host}:{server.server_port}", err=True)
     try:
-        output, _ = fetch_review(
-            review_id=review_id,
-            token=token,
-            unresolved_only=unresolved_only,
-            output_json=output_json,
-            output_color=output_color,
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@main.command()
+@click.option("--review", "review_id", help="Review ID or URL, e.g. IJ-CR-174369")
+@click.option("--project", help="Project key, e.g. IJ")
+@click.option("--file", "filename_prefix", help="Only discussions on files under this path prefix")
+@click.option("--author", help="Only discussions started by this author")
+@click.option("--unresolved", "unresolved_only", is_flag=True, help="Show only unresolved discussions")
+@click.option("--json", "output_json", is_flag=True, help="Output as JSON")
+@click.option("--store", "store_path", type=click.Path(), help="Path to the local SQLite store")
+def query(
+    review_id: str | None,
+    project: str | None,
+    filename_prefix: str | None,
+    author: str | None,
+    unresolved_only: bool,
+    output_json: bool,
+    store_path: str | None,
+):
+    """Query discussions persisted with --store, without contacting Space."""
+    number = None
+    try:
+        if review_id:
+            parsed = parse_review_id(review_id)
+            project, number = parsed.project, parsed.number
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+    with ReviewStore(store_path or default_store_path()) as store:
+        discussions = store.query_discussions(
+            project=project,
+            number=number,
+            filename_prefix=filename_prefix,
+            author=author,
+            resolved=False if unresolved_only else None,
         )
-        if output_file:
-            with open(output_file, "w") as f:
-                f.write(output)
-            click.echo(f"Exported to {output_file}")
-        else:
-            click.echo(output)
+
+    if output_json:
+        click.echo(json.dumps(discussions, indent=2))
+        return
+
+    for d in discussions:
+        display_line = d["line"] + 1 if d["line"] is not None else 0
+        status = "resolved" if d["resolved"] else "open"
+        summary = (d["text"] or "").split("\n", 1)[0]
+        click.echo(f"{d['project']}-CR-{d['number']}  {d['filename']}:{display_line}  [{status}] {d['author']}: {summary}")
+
+
+@main.command()
+@click.argument("text")
+@click.option("--limit", default=20, show_default=True, help="Maximum number of hits")
+@click.option("--json", "output_json", is_flag=True, help="Output as JSON")
+@click.option("--store", "store_path", type=click.Path(), help="Path to the local SQLite store")
+def search(text: str, limit: int, output_json: bool, store_path: str | None):
+    """Full-text search over discussions, replies, comments and snippets in the local store."""
+    try:
+        with ReviewStore(store_path or default_store_path()) as store:
+            hits = store.search(text, limit=limit)
     except ValueError as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
+
+    if output_json:
+        click.echo(json.dumps(hits, indent=2))
+    else:
+        click.echo(format_search_results(text, hits))
+
+
+@main.command()
+@click.argument("review_id")
+@click.option("--max-unresolved", default=0, show_default=True, type=click.IntRange(min=0), help="Unresolved discussions and comments allowed")
+@click.option("--token", envvar="SPACE_TOKEN", help="Space API token")
+@click.option("--trace", is_flag=True, help="Log every API request and a metrics summary to stderr")
+def check(review_id: str, max_unresolved: int, token: str | None, trace: bool):
+    """Exit with 1 if REVIEW_ID has more unresolved feedback than --max-unresolved.
+
+    Only resolution flags are read and paging stops once the limit is exceeded,
+    so this is cheap enough for merge gates. Exits with 2 on errors.
+    """
+    if trace:
+        _enable_trace()
+    if not token:
+        click.echo("Error: No token provided. Use --token flag, SPACE_TOKEN env var, or .env file.", err=True)
+        sys.exit(2)
+    try:
+        parsed = parse_review_id(review_id)
+        with SpaceClient(token=token) as client:
+            count, complete = count_unresolved(client, parsed, limit=max_unresolved, index_path=default_index_path())
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(2)
     except Exception as e:
-        click.echo(f"Error fetching review: {e}", err=True)
+        click.echo(f"Error checking review: {e}", err=True)
+        sys.exit(2)
+
+    label = f"{parsed.project}-CR-{parsed.number}"
+    if count > max_unresolved:
+        click.echo(f"{label} FAIL: {'' if complete else 'at least '}{count} unresolved (max {max_unresolved})")
+        sys.exit(1)
+    click.echo(f"{label} OK: {count} unresolved (max {max_unresolved})")
+
+
+@main.command()
+@click.argument("review_id")
+@click.option("--store", "store_path", type=click.Path(), help="Path to the local SQLite store")
+@click.option("--token", envvar="SPACE_TOKEN", help="Space API token")
+@click.option("--json", "output_json", is_flag=True, help="Output as JSON")
+@click.option("--exit-code", is_flag=True, help="Exit with 1 if a resolution changed")
+def refresh(review_id: str, store_path: str | None, token: str | None, output_json: bool, exit_code: bool):
+    """Update resolution flags of a stored review from the feed's resolved flags only."""
+    if not token:
+        click.echo("Error: No token provided. Use --token flag, SPACE_TOKEN env var, or .env file.", err=True)
+        sys.exit(2)
+    try:
+        with SpaceClient(token=token) as client:
+            changes = refresh_resolutions(client, review_id, store_path=store_path)
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(2)
+    except Exception as e:
+        click.echo(f"Error refreshing review: {e}", err=True)
+        sys.exit(2)
+
+    if output_json:
+        click.echo(json.dumps(changes, indent=2))
+    else:
+        click.echo(format_changes(changes))
+
+    if exit_code and changes:
+        sys.exit(1)
+
+
+@main.command()
+@click.argument("old", type=click.Path(exists=True, dir_okay=False))
+@click.argument("new", type=click.Path(exists=True, dir_okay=False))
+@click.option("--json", "output_json", is_flag=True, help="Output as JSON")
+@click.option("--exit-code", is_flag=True, help="Exit with 1 if there are changes")
+def diff(old: str, new: str, output_json: bool, exit_code: bool):
+    """Report review activity between two snapshots or --json exports."""
+    try:
+        with ExitStack() as stack:
+            _, old_discussions, old_comments = load_review_file(old, stack)
+            _, new_discussions, new_comments = load_review_file(new, stack)
+            changes = diff_reviews(old_discussions, new_discussions, old_comments, new_comments)
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(2)
+
+    if output_json:
+        click.echo(json.dumps(changes, indent=2))
+    else:
+        click.echo(format_changes(changes))
+
+    if exit_code and changes:
         sys.exit(1)
 
 
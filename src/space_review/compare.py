@@ -0,0 +1,87 @@
+import json
+from collections.abc import Mapping
+from contextlib import ExitStack
+from pathlib import Path
+
+from .hashing import content_hash
+from .snapshot import MAGIC, Snapshot
+
+
+def item_hash(item: Mapping) -> str:
+    return content_hash([
+        item.get("text"),
+        item.get("resolved"),
+        item.get("suggested_edit"),
+        item.get("thread", []),
+    ])
+
+
+def load_review_file(path: str | Path, stack: ExitStack) -> tuple[dict, list[Mapping], list[dict]]:
+    with open(path, "rb") as f:
+        is_snapshot = f.read(len(MAGIC)) == MAGIC
+
+    if is_snapshot:
+        snapshot = stack.enter_context(Snapshot(path))
+        return snapshot.review, list(snapshot.iter_discussions()), snapshot.general_comments()
+
+    try:
+        data = json.loads(Path(path).read_text())
+        return data["review"], data["discussions"], data.get("general_comments", [])
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        raise ValueError(f"{path} is neither a snapshot nor a --json export") from e
+
+
+def _anchor(item: Mapping) -> str:
+    if "filename" in item:
+        display_line = item["line"] + 1 if item.get("line") is not None else 0
+        return f"{item['filename']}:{display_line}"
+    return item.get("author") or ""
+
+
+def _diff_items(kind: str, old_items: list[Mapping], new_items: list[Mapping]) -> list[dict]:
+    old_by_id = {item["id"]: item for item in old_items}
+    new_ids = {item["id"] for item in new_items}
+    changes = []
+
+    for item in new_items:
+        change = {"kind": kind, "id": item["id"], "anchor": _anchor(item)}
+        old = old_by_id.get(item["id"])
+        if old is None:
+            changes.append({**change, "change": "added"})
+            continue
+        if item_hash(old) == item_hash(item):
+            continue
+
+        if bool(old.get("resolved")) != bool(item.get("resolved")):
+            changes.append({**change, "change": "resolved" if item.get("resolved") else "reopened"})
+        if content_hash(old.get("text")) != content_hash(item.get("text")):
+            changes.append({**change, "change": "edited"})
+        if content_hash(old.get("suggested_edit")) != content_hash(item.get("suggested_edit")):
+            changes.append({**change, "change": "suggestion_changed"})
+
+        old_thread = old.get("thread", [])
+        new_thread = item.get("thread", [])
+        old_reply_hashes = [content_hash(reply) for reply in old_thread]
+        new_reply_hashes = [content_hash(reply) for reply in new_thread]
+        if new_reply_hashes[:len(old_reply_hashes)] != old_reply_hashes:
+            changes.append({**change, "change": "replies_edited"})
+        elif len(new_thread) > len(old_thread):
+            changes.append({**change, "change": "new_replies", "count": len(new_thread) - len(old_thread)})
+
+    for item in old_items:
+        if item["id"] not in new_ids:
+            changes.append({"kind": kind, "id": item["id"], "anchor": _anchor(item), "change": "removed"})
+
+    return changes
+
+
+def diff_reviews(
+    old_discussions: list[Mapping],
+    new_discussions: list[Mapping],
+    old_comments: list[Mapping] | None = None,
+    new_comments: list[Mapping] | None = None,
+) -> list[dict]:
+    return (
+        _diff_items("discussion", old_discussions, new_discussions)
+        + _diff_items("comment", old_comments or [], new_comments or [])
+    )
@@ -0,0 +1,103 @@
+import gzip
+import os
+import shutil
+import tempfile
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO
+from pathlib import Path
+
+_BLOCK_SIZE = 1 << 16
+
+
+def join_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Yield the pieces of "\\n".join(lines) without building the whole string."""
+    first = True
+    for line in lines:
+        yield line if first else "\n" + line
+        first = False
+
+
+def _open_existing(path: Path, compressed: bool) -> BinaryIO | None:
+    try:
+        return gzip.open(path, "rb") if compressed else open(path, "rb")
+    except OSError:
+        return None
+
+
+def _read(f: BinaryIO, size: int) -> bytes | None:
+    try:
+        return f.read(size)
+    except (OSError, EOFError):
+        return None
+
+
+def _copy_prefix(path: Path, compressed: bool, size: int, out: BinaryIO) -> None:
+    with gzip.open(path, "rb") if compressed else open(path, "rb") as f:
+        while size:
+            block = f.read(min(_BLOCK_SIZE, size))
+            if not block:
+                raise OSError(f"{path} changed while exporting")
+            out.write(block)
+            size -= len(block)
+
+
+def _default_mode() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def write_export(path: str | Path, chunks: Iterable[str]) -> bool:
+    """Stream chunks into path atomically; returns False if the file already had this content.
+
+    Chunks are compared against the existing file as they arrive. A temp file is only
+    created, with the matching prefix copied over, once the content turns out to differ.
+    """
+    path = Path(path)
+    compressed = path.suffix == ".gz"
+    existing = _open_existing(path, compressed) if path.exists() else None
+    matched = 0
+    tmp_name = raw = out = None
+
+    def start_temp() -> None:
+        nonlocal tmp_name, raw, out
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        raw = os.fdopen(fd, "wb")
+        # mtime=0 keeps identical content byte-identical on disk as well.
+        out = gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) if compressed else raw
+        if matched:
+            _copy_prefix(path, compressed, matched, out)
+
+    try:
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            if out is None:
+                if existing is not None and _read(existing, len(data)) == data:
+                    matched += len(data)
+                    continue
+                start_temp()
+            out.write(data)
+
+        if out is None:
+            if existing is not None and _read(existing, 1) == b"":
+                return False
+            start_temp()
+
+        if compressed:
+            out.close()
+        raw.close()
+        if path.exists():
+            shutil.copymode(path, tmp_name)
+        else:
+            os.chmod(tmp_name, _default_mode())
+        os.replace(tmp_name, path)
+        return True
+    except BaseException:
+        if raw is not None:
+            raw.close()
+        if tmp_name is not None and os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+    finally:
+        if existing is not None:
+            existing.close()
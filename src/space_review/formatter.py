@@ -1,5 +1,9 @@
 import json
 import difflib
+import hashlib
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from datetime import datetime, timezone
 from pathlib import Path
 
 EXTENSION_TO_LANGUAGE = {
@@ -41,6 +45,23 @@ def _detect_language(filename: str) -> str:
     return EXTENSION_TO_LANGUAGE.get(ext, "")
 
 
+def _cache_age_seconds(cached_at: str) -> int:
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(cached_at)
+    return max(int(age.total_seconds()), 0)
+
+
+def _format_age(seconds: int) -> str:
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes = seconds // 60
+    if minutes < 60:
+        return f"{minutes}m"
+    hours = minutes // 60
+    if hours < 48:
+        return f"{hours}h {minutes % 60}m"
+    return f"{hours // 24}d {hours % 24}h"
+
+
 def _apply_inline_diff_plain(text: str, deletes: list[dict] | None, inserts: list[dict] | None) -> str:
     if not deletes and not inserts:
         return text
@@ -160,7 +181,10 @@ def _format_discussion(discussion: dict, is_suggestion: bool = False) -> str:
     author = discussion["author"]
     lines.append(f"**{author}**")
     lines.append("")
-    lines.append(discussion["text"])
+    if discussion.get("partial"):
+        lines.append("_Thread not loaded before the deadline._")
+    else:
+        lines.append(discussion["text"])
     lines.append("")
 
     suggested_edit = discussion.get("suggested_edit")
@@ -199,24 +223,61 @@ def _format_discussion(discussion: dict, is_suggestion: bool = False) -> str:
     return "\n".join(lines)
 
 
-def format_markdown(review: dict, discussions: list[dict], general_comments: list[dict] | None = None) -> str:
+def _format_general_comment(comment: dict) -> str:
     lines = []
 
-    lines.append("```")
-    lines.append("Legend: + added | - deleted | * modified | > selected lines")
-    lines.append("```")
+    resolved = comment.get("resolved")
+    status_icon = "✅" if resolved else "💬" if resolved is False else "💭"
+    lines.append(f"### {status_icon} **{comment['author']}**")
     lines.append("")
+    for text_line in comment["text"].split('\n'):
+        lines.append(f"> {text_line}")
+    lines.append("")
+    lines.append("---")
+    lines.append("")
+
+    return "\n".join(lines)
+
+
+def format_markdown(
+    review: dict,
+    discussions: list[dict],
+    general_comments: list[dict] | None = None,
+    cached_at: str | None = None,
+) -> str:
+    return "\n".join(iter_markdown(review, discussions, general_comments, cached_at=cached_at))
+
+
+def iter_markdown(
+    review: dict,
+    discussions: list[dict],
+    general_comments: list[dict] | None = None,
+    cached_at: str | None = None,
+) -> Iterator[str]:
+    yield "```"
+    yield "Legend: + added | - deleted | * modified | > selected lines"
+    yield "```"
+    yield ""
 
     title = review["title"]
-    lines.append(f"# {title}")
-    lines.append("")
+    yield f"# {title}"
+    yield ""
 
     project_key = review["project"]["key"]
     number = review["number"]
     state = review["state"]
     state_icon = "🟢" if state == "Opened" else "🔴" if state == "Closed" else "⚪"
-    lines.append(f"**Review:** `{project_key}-CR-{number}` | **State:** {state_icon} {state}")
-    lines.append("")
+    yield f"**Review:** `{project_key}-CR-{number}` | **State:** {state_icon} {state}"
+    yield ""
+
+    if cached_at:
+        yield f"> ⚠️ **Offline:** cached {_format_age(_cache_age_seconds(cached_at))} ago ({cached_at})"
+        yield ""
+
+    partial_count = sum(1 for d in discussions if d.get("partial"))
+    if partial_count:
+        yield f"> ⏱️ **Partial:** {partial_count} threads not loaded before the deadline"
+        yield ""
 
     all_items = []
     for comment in (general_comments or []):
@@ -242,30 +303,35 @@ def format_markdown(review: dict, discussions: list[dict], general_comments: lis
         if discussion_count:
             parts.append(f"{discussion_count} discussions")
 
-        lines.append(f"## Feedback ({total_unresolved} unresolved, {total_resolved} resolved)")
-        lines.append(f"*{', '.join(parts)}*")
-        lines.append("")
+        yield f"## Feedback ({total_unresolved} unresolved, {total_resolved} resolved)"
+        yield f"*{', '.join(parts)}*"
+        yield ""
 
         for item in all_items:
             if item["type"] == "comment":
-                comment = item["data"]
-                resolved = comment.get("resolved")
-                status_icon = "✅" if resolved else "💬" if resolved is False else "💭"
-                lines.append(f"### {status_icon} **{comment['author']}**")
-                lines.append("")
-                for text_line in comment["text"].split('\n'):
-                    lines.append(f"> {text_line}")
-                lines.append("")
-                lines.append("---")
-                lines.append("")
+                yield _format_general_comment(item["data"])
             else:
                 is_suggestion = item["type"] == "suggestion"
-                lines.append(_format_discussion(item["data"], is_suggestion=is_suggestion))
-
-    return "\n".join(lines)
-
-
-def format_json(review: dict, discussions: list[dict], general_comments: list[dict] | None = None) -> str:
+                yield _format_discussion(item["data"], is_suggestion=is_suggestion)
+
+
+def format_json(
+    review: dict,
+    discussions: list[dict],
+    general_comments: list[dict] | None = None,
+    cached_at: str | None = None,
+    indent: int | None = 2,
+) -> str:
+    return "".join(iter_json(review, discussions, general_comments, cached_at=cached_at, indent=indent))
+
+
+def iter_json(
+    review: dict,
+    discussions: list[dict],
+    general_comments: list[dict] | None = None,
+    cached_at: str | None = None,
+    indent: int | None = 2,
+) -> Iterator[str]:
     output = {
         "review": {
             "title": review["title"],
@@ -274,12 +340,82 @@ def format_json(review: dict, discussions: list[dict], general_comments: list[di
             "state": review["state"],
         },
         "general_comments": general_comments or [],
-        "discussions": discussions,
+        "discussions": [dict(d) for d in discussions],
     }
-    return json.dumps(output, indent=2)
+    if cached_at:
+        output["cache"] = {"fetched_at": cached_at, "age_seconds": _cache_age_seconds(cached_at)}
+    return json.JSONEncoder(indent=indent).iterencode(output)
+
+
+def format_search_results(query: str, hits: list[dict]) -> str:
+    lines = []
+
+    lines.append(f"## Search: `{query}` ({len(hits)} hits)")
+    lines.append("")
+
+    for hit in hits:
+        item = hit["item"]
+        lines.append(f"**Review:** `{item['project']}-CR-{item['number']}` | **Matched:** {', '.join(hit['matched'])}")
+        lines.append("")
+        if hit["type"] == "comment":
+            lines.append(_format_general_comment(item))
+        else:
+            discussion = {**item, "text": item["text"] or ""}
+            lines.append(_format_discussion(discussion, is_suggestion=item.get("is_suggestion", False)))
+
+    return "\n".join(lines)
+
+
+_CHANGE_MARKERS = {
+    "added": "+",
+    "removed": "-",
+    "new_replies": "+",
+}
+
+
+def format_changes(changes: list[dict]) -> str:
+    if not changes:
+        return "No changes"
+
+    lines = []
+    for change in changes:
+        marker = _CHANGE_MARKERS.get(change["change"], "~")
+        label = change["change"].replace("_", " ")
+        if change["change"] == "new_replies":
+            label = f"{change['count']} new replies"
+        lines.append(f"{marker} {change['kind']} {change['anchor']}  {label}  ({change['id']})")
+    return "\n".join(lines)
+
+
+SUGGESTED_EDIT_DIFF_LIMIT = 2000
+_SUGGESTED_EDIT_DIFF_CACHE_SIZE = 256
+_suggested_edit_diff_cache: OrderedDict[bytes, str] = OrderedDict()
 
 
 def format_suggested_edit_diff(original: str, suggested: str) -> str:
+    key = hashlib.sha256(f"{len(original)}:{original}{suggested}".encode("utf-8")).digest()
+    diff = _suggested_edit_diff_cache.get(key)
+    if diff is None:
+        diff = _suggested_edit_diff(original, suggested)
+        _suggested_edit_diff_cache[key] = diff
+        if len(_suggested_edit_diff_cache) > _SUGGESTED_EDIT_DIFF_CACHE_SIZE:
+            _suggested_edit_diff_cache.popitem(last=False)
+    else:
+        _suggested_edit_diff_cache.move_to_end(key)
+    return diff
+
+
+def _format_unified_range(start: int, stop: int) -> str:
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def _suggested_edit_diff(original: str, suggested: str) -> str:
     original_lines = original.splitlines(keepends=True)
     suggested_lines = suggested.splitlines(keepends=True)
 
@@ -288,18 +424,52 @@ def format_suggested_edit_diff(original: str, suggested: str) -> str:
     if suggested_lines and not suggested_lines[-1].endswith("\n"):
         suggested_lines[-1] += "\n"
 
-    diff = difflib.unified_diff(
-        original_lines,
-        suggested_lines,
-        fromfile="original",
-        tofile="suggested",
-        lineterm="",
-    )
-
-    diff_lines = list(diff)
-    if len(diff_lines) > 2:
-        diff_lines = diff_lines[2:]
-
+    prefix = 0
+    max_prefix = min(len(original_lines), len(suggested_lines))
+    while prefix < max_prefix and original_lines[prefix] == suggested_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    max_suffix = max_prefix - prefix
+    while suffix < max_suffix and original_lines[-1 - suffix] == suggested_lines[-1 - suffix]:
+        suffix += 1
+
+    removed = original_lines[prefix:len(original_lines) - suffix]
+    added = suggested_lines[prefix:len(suggested_lines) - suffix]
+    if not removed and not added:
+        return ""
+
+    simplified = bool(removed and added) and len(removed) + len(added) > SUGGESTED_EDIT_DIFF_LIMIT
+    if removed and added and not simplified:
+        diff = difflib.unified_diff(
+            original_lines,
+            suggested_lines,
+            fromfile="original",
+            tofile="suggested",
+            lineterm="",
+        )
+        diff_lines = list(diff)
+        if len(diff_lines) > 2:
+            diff_lines = diff_lines[2:]
+        return "".join(diff_lines).rstrip("\n")
+
+    # Pure additions/deletions, and edits too large for difflib's quadratic matching,
+    # become a single hunk around the changed middle with three lines of context.
+    start = max(prefix - 3, 0)
+    after = min(suffix, 3)
+    old_stop = len(original_lines) - suffix + after
+    new_stop = len(suggested_lines) - suffix + after
+    diff_lines = [
+        f"@@ -{_format_unified_range(start, old_stop)} +{_format_unified_range(start, new_stop)} @@",
+        *(" " + line for line in original_lines[start:prefix]),
+        *("-" + line for line in removed),
+        *("+" + line for line in added),
+        *(" " + line for line in original_lines[len(original_lines) - suffix:old_stop]),
+    ]
+    if simplified:
+        diff_lines.append(
+            f"\\ Simplified line-level diff: {len(removed)} removed and {len(added)} added lines "
+            f"exceed the {SUGGESTED_EDIT_DIFF_LIMIT}-line limit\n"
+        )
     return "".join(diff_lines).rstrip("\n")
 
 
@@ -419,10 +589,12 @@ def _format_discussion_color(discussion: dict, is_suggestion: bool = False) -> s
         lines.append("")
 
     author = discussion["author"]
-    text = discussion["text"]
     lines.append(f"{Colors.CYAN}{Colors.BOLD}{author}:{Colors.RESET}")
-    for text_line in text.split('\n'):
-        lines.append(f"  {text_line}")
+    if discussion.get("partial"):
+        lines.append(f"  {Colors.DIM}(thread not loaded before the deadline){Colors.RESET}")
+    else:
+        for text_line in discussion["text"].split('\n'):
+            lines.append(f"  {text_line}")
     lines.append("")
 
     suggested_edit = discussion.get("suggested_edit")
@@ -460,22 +632,49 @@ def _format_discussion_color(discussion: dict, is_suggestion: bool = False) -> s
     return "\n".join(lines)
 
 
-def format_color(review: dict, discussions: list[dict], general_comments: list[dict] | None = None) -> str:
-    lines = []
+def format_color(
+    review: dict,
+    discussions: list[dict],
+    general_comments: list[dict] | None = None,
+    cached_at: str | None = None,
+) -> str:
+    return "\n".join(iter_color(review, discussions, general_comments, cached_at=cached_at))
 
-    lines.append(f"{Colors.DIM}Legend:{Colors.RESET} {Colors.GREEN}+ added{Colors.RESET} | {Colors.RED}- deleted{Colors.RESET} | * modified | {Colors.YELLOW}{Colors.BOLD}>{Colors.RESET} selected")
-    lines.append("")
+
+def iter_color(
+    review: dict,
+    discussions: list[dict],
+    general_comments: list[dict] | None = None,
+    cached_at: str | None = None,
+    load_thread: Callable[[dict], None] | None = None,
+) -> Iterator[str]:
+    """Yield the lines of format_color one item at a time.
+
+    load_thread is called for each discussion right before it is rendered, so a
+    consumer that stops early also stops the work for the remaining threads.
+    """
+    yield f"{Colors.DIM}Legend:{Colors.RESET} {Colors.GREEN}+ added{Colors.RESET} | {Colors.RED}- deleted{Colors.RESET} | * modified | {Colors.YELLOW}{Colors.BOLD}>{Colors.RESET} selected"
+    yield ""
 
     title = review["title"]
-    lines.append(f"{Colors.BOLD}{Colors.WHITE}{title}{Colors.RESET}")
-    lines.append("")
+    yield f"{Colors.BOLD}{Colors.WHITE}{title}{Colors.RESET}"
+    yield ""
 
     project_key = review["project"]["key"]
     number = review["number"]
     state = review["state"]
     state_color = Colors.GREEN if state == "Opened" else Colors.RED if state == "Closed" else Colors.WHITE
-    lines.append(f"{Colors.DIM}Review:{Colors.RESET} {project_key}-CR-{number}  {Colors.DIM}State:{Colors.RESET} {state_color}{state}{Colors.RESET}")
-    lines.append("")
+    yield f"{Colors.DIM}Review:{Colors.RESET} {project_key}-CR-{number}  {Colors.DIM}State:{Colors.RESET} {state_color}{state}{Colors.RESET}"
+    yield ""
+
+    if cached_at:
+        yield f"{Colors.YELLOW}Offline: cached {_format_age(_cache_age_seconds(cached_at))} ago ({cached_at}){Colors.RESET}"
+        yield ""
+
+    partial_count = sum(1 for d in discussions if d.get("partial"))
+    if partial_count:
+        yield f"{Colors.YELLOW}Partial: {partial_count} threads not loaded before the deadline{Colors.RESET}"
+        yield ""
 
     all_items = []
     for comment in (general_comments or []):
@@ -487,29 +686,26 @@ def format_color(review: dict, discussions: list[dict], general_comments: list[d
     all_items.sort(key=lambda x: x["feed_index"])
 
     if all_items:
-        suggestion_count = sum(1 for i in all_items if i["type"] == "suggestion")
-        discussion_count = sum(1 for i in all_items if i["type"] == "discussion")
-        comment_count = sum(1 for i in all_items if i["type"] == "comment")
         total_resolved = sum(1 for i in all_items if i["data"].get("resolved"))
         total_unresolved = len(all_items) - total_resolved
 
-        lines.append(f"{Colors.BOLD}Feedback{Colors.RESET} ({Colors.YELLOW}{total_unresolved} open{Colors.RESET}, {Colors.GREEN}{total_resolved} resolved{Colors.RESET})")
-        lines.append(f"{Colors.DIM}{'═' * 60}{Colors.RESET}")
-        lines.append("")
+        yield f"{Colors.BOLD}Feedback{Colors.RESET} ({Colors.YELLOW}{total_unresolved} open{Colors.RESET}, {Colors.GREEN}{total_resolved} resolved{Colors.RESET})"
+        yield f"{Colors.DIM}{'═' * 60}{Colors.RESET}"
+        yield ""
 
         for item in all_items:
             if item["type"] == "comment":
                 comment = item["data"]
                 resolved = comment.get("resolved")
                 status = f"{Colors.GREEN}✓{Colors.RESET}" if resolved else f"{Colors.YELLOW}○{Colors.RESET}" if resolved is False else f"{Colors.DIM}?{Colors.RESET}"
-                lines.append(f"{status} {Colors.CYAN}{Colors.BOLD}{comment['author']}:{Colors.RESET}")
+                yield f"{status} {Colors.CYAN}{Colors.BOLD}{comment['author']}:{Colors.RESET}"
                 for text_line in comment["text"].split('\n'):
-                    lines.append(f"    {text_line}")
-                lines.append("")
-                lines.append(f"{Colors.DIM}{'─' * 60}{Colors.RESET}")
-                lines.append("")
+                    yield f"    {text_line}"
+                yield ""
+                yield f"{Colors.DIM}{'─' * 60}{Colors.RESET}"
+                yield ""
             else:
+                if load_thread is not None:
+                    load_thread(item["data"])
                 is_suggestion = item["type"] == "suggestion"
-                lines.append(_format_discussion_color(item["data"], is_suggestion=is_suggestion))
-
-    return "\n".join(lines)
+                yield _format_discussion_color(item["data"], is_suggestion=is_suggestion)
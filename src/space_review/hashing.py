@@ -0,0 +1,7 @@
+import hashlib
+import json
+
+
+def content_hash(value) -> str:
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
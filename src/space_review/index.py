@@ -0,0 +1,45 @@
+import sqlite3
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_index (
+    project TEXT NOT NULL,
+    number TEXT NOT NULL,
+    review_id TEXT NOT NULL,
+    feed_channel_id TEXT NOT NULL,
+    PRIMARY KEY (project, number)
+) WITHOUT ROWID;
+"""
+
+
+class ReviewIndex:
+    """Maps review numbers to the immutable review id and feed channel id."""
+
+    def __init__(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5)
+        self._conn.executescript(SCHEMA)
+
+    def __enter__(self) -> "ReviewIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get(self, project: str, number: str | int) -> tuple[str, str] | None:
+        row = self._conn.execute(
+            "SELECT review_id, feed_channel_id FROM review_index WHERE project = ? AND number = ?",
+            (project, str(number)),
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def put(self, project: str, number: str | int, review_id: str, feed_channel_id: str) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO review_index (project, number, review_id, feed_channel_id) VALUES (?, ?, ?, ?)",
+                (project, str(number), review_id, feed_channel_id),
+            )
@@ -0,0 +1,86 @@
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable
+
+
+def percentile(values: Iterable[float], q: float) -> float | None:
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+class AdaptiveLimiter:
+    """AIMD limit on concurrent requests.
+
+    The window grows by one slot per window's worth of successful requests while the
+    p90 latency of recent requests stays within ``tolerance`` of the best p90 seen,
+    and is halved on throttling (429/5xx/timeouts) or a latency spike.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 16,
+        sample_size: int = 20,
+        tolerance: float = 2.0,
+    ) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self._limit = float(max(minimum, min(initial, maximum)))
+        self._in_flight = 0
+        self._latencies: deque[float] = deque(maxlen=sample_size)
+        self._baseline: float | None = None
+        self._condition = threading.Condition()
+
+    @property
+    def window(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._in_flight >= self.window:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self._in_flight += 1
+            return True
+
+    def release(self, latency: float | None, overloaded: bool = False) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            if overloaded:
+                self._decrease()
+            elif latency is not None:
+                self._record(latency)
+            self._condition.notify_all()
+
+    def p90(self) -> float | None:
+        with self._condition:
+            return percentile(self._latencies, 0.9)
+
+    def _record(self, latency: float) -> None:
+        self._latencies.append(latency)
+        if len(self._latencies) == self._latencies.maxlen:
+            p90 = percentile(self._latencies, 0.9)
+            if self._baseline is not None and p90 > self._baseline * self.tolerance:
+                # Latency is no longer flat: back off and relearn the baseline at the new level.
+                self._baseline = None
+                self._decrease()
+                return
+            self._baseline = p90 if self._baseline is None else min(self._baseline, p90)
+        self._limit = min(self.maximum, self._limit + 1 / self._limit)
+
+    def _decrease(self) -> None:
+        self._limit = max(self.minimum, self._limit / 2)
+        self._latencies.clear()
@@ -1,4 +1,5 @@
 import re
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 
 
@@ -8,17 +9,48 @@ class ParsedReviewId:
     number: str
 
 
+DEFAULT_HOSTS = ("jetbrains.team",)
+
 _REVIEW_ID_PATTERN = re.compile(r"^([A-Z]+)-(CR|MR)-(\d+)$")
 _URL_PATTERN = re.compile(
     r"https://jetbrains\.team/p/([a-zA-Z]+)/reviews/(\d+)(?:/\w+)?$"
 )
+_SCAN_ID_PATTERN = re.compile(r"(?<![\w-])([A-Z]+)-(CR|MR)-(\d+)(?!\w)")
+
+
+def _normalize_host(host: str) -> str:
+    return re.sub(r"^https?://", "", host.strip()).rstrip("/")
+
+
+def _host_url_pattern(hosts: Iterable[str]) -> re.Pattern:
+    alternatives = "|".join(re.escape(_normalize_host(host)) for host in hosts)
+    return re.compile(rf"https://(?:{alternatives})/p/([a-zA-Z]+)/reviews/(\d+)(?:/\w+)?")
 
 
-def parse_review_id(input_str: str) -> ParsedReviewId:
+def parse_review_id(input_str: str, hosts: Iterable[str] = ()) -> ParsedReviewId:
     if match := _REVIEW_ID_PATTERN.match(input_str):
         return ParsedReviewId(project=match.group(1), number=match.group(3))
 
     if match := _URL_PATTERN.match(input_str):
         return ParsedReviewId(project=match.group(1).upper(), number=match.group(2))
 
+    hosts = list(hosts)
+    if hosts and (match := _host_url_pattern(hosts).fullmatch(input_str)):
+        return ParsedReviewId(project=match.group(1).upper(), number=match.group(2))
+
     raise ValueError(f"Invalid review identifier: {input_str}")
+
+
+def scan_review_ids(lines: Iterable[str], hosts: Iterable[str] = ()) -> Iterator[ParsedReviewId]:
+    url_pattern = _host_url_pattern([*DEFAULT_HOSTS, *hosts])
+    seen = set()
+    for line in lines:
+        matches = [
+            (match.start(), match.group(1), match.group(3)) for match in _SCAN_ID_PATTERN.finditer(line)
+        ] + [
+            (match.start(), match.group(1).upper(), match.group(2)) for match in url_pattern.finditer(line)
+        ]
+        for _, project, number in sorted(matches):
+            if (project, number) not in seen:
+                seen.add((project, number))
+                yield ParsedReviewId(project=project, number=number)
@@ -0,0 +1,15 @@
+import os
+from pathlib import Path
+
+
+def cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "space-review"
+
+
+def default_store_path() -> Path:
+    return Path(os.environ.get("SPACE_REVIEW_STORE") or cache_dir() / "reviews.db")
+
+
+def default_index_path() -> Path:
+    return cache_dir() / "index.db"
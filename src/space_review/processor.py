@@ -1,4 +1,43 @@
-def extract_code_discussions(feed_messages: list[dict]) -> list[dict]:
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from fnmatch import fnmatchcase
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+class SnippetPool:
+    """Shares identical snippet lines and snippets between discussions and reviews."""
+
+    def __init__(self) -> None:
+        self._lines: dict[tuple, dict] = {}
+        self._snippets: dict[tuple, list[dict]] = {}
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def intern(self, lines: list[dict]) -> list[dict]:
+        keys = tuple(_freeze(line) for line in lines)
+        snippet = self._snippets.get(keys)
+        if snippet is None:
+            snippet = [self._lines.setdefault(key, line) for key, line in zip(keys, lines)]
+            self._snippets[keys] = snippet
+        return snippet
+
+
+def extract_code_discussions(
+    feed_messages: list[dict],
+    snippet_pool: SnippetPool | None = None,
+    snippet_source: Callable[[dict, dict | None], list[dict]] | None = None,
+) -> list[dict]:
+    if snippet_pool is None:
+        snippet_pool = SnippetPool()
     discussions = []
     for feed_index, message in enumerate(feed_messages):
         details = message.get("details")
@@ -10,7 +49,7 @@ def extract_code_discussions(feed_messages: list[dict]) -> list[dict]:
         code_discussion = details["codeDiscussion"]
         anchor = code_discussion["anchor"]
         end_anchor = code_discussion.get("endAnchor")
-        snippet_data = code_discussion.get("snippet", {})
+        snippet_data = code_discussion.get("snippet") or {}
         snippet_lines = [
             {
                 "text": line["text"],
@@ -22,6 +61,9 @@ def extract_code_discussions(feed_messages: list[dict]) -> list[dict]:
             }
             for line in snippet_data.get("lines", [])
         ]
+        if not snippet_lines and snippet_source is not None:
+            snippet_lines = snippet_source(anchor, end_anchor)
+        snippet_lines = snippet_pool.intern(snippet_lines)
 
         suggested_edit = code_discussion.get("suggestedEdit")
         is_suggestion = bool(suggested_edit and "suggestionCommitId" in suggested_edit)
@@ -86,10 +128,48 @@ def extract_general_comments(feed_messages: list[dict], unbound_discussions: lis
     return comments
 
 
-def filter_discussions(discussions: list[dict], unresolved_only: bool) -> list[dict]:
-    if not unresolved_only:
-        return discussions
-    return [d for d in discussions if d["resolved"] is False]
+@dataclass
+class DiscussionFilter:
+    """Narrows a review before any discussion thread is fetched.
+
+    since is not checked locally: it is sent to Space as the feed's startFromDate.
+    """
+
+    author: str | None = None
+    file_glob: str | None = None
+    suggestions_only: bool = False
+    since: datetime | None = None
+
+    def matches(self, discussion: dict) -> bool:
+        if self.author and discussion.get("author") != self.author:
+            return False
+        if self.file_glob and not fnmatchcase(discussion["filename"].lstrip("/"), self.file_glob.lstrip("/")):
+            return False
+        return not self.suggestions_only or bool(discussion.get("is_suggestion"))
+
+
+def filter_discussions(
+    discussions: list[dict], unresolved_only: bool, filters: DiscussionFilter | None = None
+) -> list[dict]:
+    if unresolved_only:
+        discussions = [d for d in discussions if d["resolved"] is False]
+    if filters is not None:
+        discussions = [d for d in discussions if filters.matches(d)]
+    return discussions
+
+
+def filter_general_comments(comments: list[dict], filters: DiscussionFilter | None = None) -> list[dict]:
+    """General comments have no file and are never suggestions, so those filters drop them all."""
+    if filters is None:
+        return comments
+    if filters.file_glob or filters.suggestions_only:
+        return []
+    return [c for c in comments if not filters.author or c["author"] == filters.author]
+
+
+def thread_priority(discussion: dict) -> tuple:
+    """Sort key for thread fetches: unresolved first, suggestions next, then the most recent."""
+    return (discussion.get("resolved") is not False, not discussion.get("is_suggestion"), -discussion.get("feed_index", 0))
 
 
 def build_discussion_with_thread(discussion: dict, thread_messages: list[dict]) -> dict:
@@ -0,0 +1,507 @@
+import heapq
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from .api import SpaceClient
+from .checkout import LocalCheckout
+from .compare import diff_reviews
+from .formatter import format_color, format_json, format_markdown
+from .index import ReviewIndex
+from .limiter import AdaptiveLimiter
+from .parser import ParsedReviewId, parse_review_id
+from .paths import default_index_path, default_store_path
+from .processor import (
+    DiscussionFilter,
+    SnippetPool,
+    build_discussion_with_thread,
+    extract_code_discussions,
+    extract_general_comments,
+    filter_discussions,
+    filter_general_comments,
+    thread_priority,
+)
+from .snapshot import Snapshot, write_snapshot
+from .store import ReviewStore
+
+
+DEFAULT_CONCURRENCY = 16
+
+
+@dataclass
+class ReviewData:
+    """One review; when loaded from a snapshot, discussions are lazy views into it.
+
+    Use it as a context manager (or call close()) to release such a snapshot.
+    """
+
+    review: dict
+    discussions: list[dict]
+    general_comments: list[dict] = field(default_factory=list)
+    fetched_at: str | None = None
+    snapshot: Snapshot | None = field(default=None, repr=False, compare=False)
+
+    def __enter__(self) -> "ReviewData":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.snapshot is not None:
+            self.snapshot.close()
+
+    @property
+    def partial(self) -> bool:
+        return any(d.get("partial") for d in self.discussions)
+
+
+def _remaining(deadline: float | None) -> float | None:
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("Deadline exceeded")
+    return remaining
+
+
+class ThreadScheduler:
+    """Fetches discussion threads on a small worker pool in thread_priority order.
+
+    Workers pop the highest-priority pending discussion from a heap, so actionable
+    threads load first under a concurrency or time budget. thread() fetches a
+    discussion that is still queued right away in the calling thread, so a consumer
+    rendering in feed order never waits behind the queue. With actionable_only, only
+    unresolved discussions and suggestions are queued; the rest are fetched when
+    thread() asks for them. close() drops whatever has not started yet without
+    waiting for requests in flight.
+    """
+
+    def __init__(
+        self,
+        client: SpaceClient,
+        discussions: list[dict],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        deadline: float | None = None,
+        actionable_only: bool = False,
+    ) -> None:
+        self._client = client
+        self._deadline = deadline
+        self._lock = threading.Lock()
+        self.futures: dict[str, Future] = {}
+        self._heap = []
+        for index, discussion in enumerate(discussions):
+            future = self.futures[discussion["id"]] = Future()
+            if actionable_only and discussion.get("resolved") is not False and not discussion.get("is_suggestion"):
+                continue
+            self._heap.append((thread_priority(discussion), index, discussion["channel_id"], future))
+        heapq.heapify(self._heap)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        for _ in range(min(concurrency, len(self._heap))):
+            self._executor.submit(self._work)
+
+    def __enter__(self) -> "ThreadScheduler":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            for future in self.futures.values():
+                future.cancel()
+            self._heap.clear()
+        self._executor.shutdown(wait=False)
+
+    def thread(self, discussion: dict) -> list[dict]:
+        future = self.futures[discussion["id"]]
+        with self._lock:
+            claimed = self._claim(future)
+        if claimed:
+            self._fetch(discussion["channel_id"], future)
+        return future.result()
+
+    def _claim(self, future: Future) -> bool:
+        return not (future.running() or future.done()) and future.set_running_or_notify_cancel()
+
+    def _fetch(self, channel_id: str, future: Future) -> None:
+        try:
+            future.set_result(self._client.get_discussion_thread(channel_id, timeout=_remaining(self._deadline)))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                if not self._heap:
+                    return
+                *_, channel_id, future = heapq.heappop(self._heap)
+                claimed = self._claim(future)
+            if claimed:
+                self._fetch(channel_id, future)
+
+
+def _load_threads(
+    client: SpaceClient,
+    discussions: list[dict],
+    deadline: float | None,
+    concurrency: int,
+) -> None:
+    """Fetch discussion threads; threads missing at the deadline are marked partial."""
+    if not discussions:
+        return
+
+    with ThreadScheduler(client, discussions, concurrency, deadline) as scheduler:
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        done, _ = wait(scheduler.futures.values(), timeout=timeout)
+
+    for discussion in discussions:
+        future = scheduler.futures[discussion["id"]]
+        error = future.exception() if future in done else None
+        if future not in done or (deadline is not None and isinstance(error, (TimeoutError, httpx.TimeoutException))):
+            discussion["partial"] = True
+        elif error is not None:
+            raise error
+        else:
+            discussion.update(build_discussion_with_thread(discussion, future.result()))
+
+
+def _indexed_ids(index_path: str | Path | None, parsed: ParsedReviewId) -> tuple[str, str] | None:
+    if index_path is None:
+        return None
+    try:
+        with ReviewIndex(index_path) as index:
+            return index.get(parsed.project, parsed.number)
+    except (sqlite3.Error, OSError):
+        return None
+
+
+def _index_review(index_path: str | Path | None, parsed: ParsedReviewId, review: dict) -> None:
+    try:
+        with ReviewIndex(index_path) as index:
+            index.put(parsed.project, parsed.number, review["id"], review["feedChannelId"])
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def fetch_review_feed(
+    client: SpaceClient,
+    parsed: ParsedReviewId,
+    include_snippets: bool = True,
+    deadline: float | None = None,
+    index_path: str | Path | None = None,
+    since: datetime | None = None,
+) -> tuple[dict, list[dict], list[dict]]:
+    """Fetch the review header, its feed and its unbound discussions.
+
+    The review id and feed channel never change, so once a review is in the index at
+    index_path the feed and unbound discussions are requested alongside the header
+    instead of after it. With since, only feed messages from that time on are requested.
+    """
+    known = _indexed_ids(index_path, parsed)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+
+        def start(review_id: str, feed_channel_id: str) -> tuple[Future, Future]:
+            return (
+                executor.submit(
+                    client.get_feed_messages,
+                    feed_channel_id,
+                    include_snippets=include_snippets,
+                    timeout=_remaining(deadline),
+                    since=since,
+                ),
+                executor.submit(client.get_unbound_discussions, parsed.project, review_id, timeout=_remaining(deadline)),
+            )
+
+        header = executor.submit(client.get_review_by_number, parsed.project, parsed.number, timeout=_remaining(deadline))
+        if known is not None:
+            feed, unbound = start(*known)
+        review = header.result()
+        ids = (review["id"], review["feedChannelId"])
+        if ids != known:
+            if known is not None:
+                feed.cancel()
+                unbound.cancel()
+            feed, unbound = start(*ids)
+        feed_messages, unbound_discussions = feed.result(), unbound.result()
+
+    if index_path is not None and ids != known:
+        _index_review(index_path, parsed, review)
+    return review, feed_messages, unbound_discussions
+
+
+def fetch_review_data(
+    client: SpaceClient,
+    parsed: ParsedReviewId,
+    unresolved_only: bool,
+    store_path: str | None = None,
+    snapshot_path: str | None = None,
+    snippet_pool: SnippetPool | None = None,
+    checkout: LocalCheckout | None = None,
+    deadline: float | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    index_path: str | Path | None = None,
+    filters: DiscussionFilter | None = None,
+) -> tuple[dict, list[dict], list[dict]]:
+    """Fetch and assemble one review.
+
+    deadline is a time.monotonic() value. The header and feed are required; discussion
+    threads that are not loaded by then are returned with ``partial`` set, and such an
+    incomplete review is not persisted. unresolved_only and filters are applied before
+    any thread is fetched unless the review is persisted.
+    """
+    # The store and snapshots keep whole reviews, so filtering happens after persisting.
+    persist = bool(store_path or snapshot_path)
+    since = filters.since if filters else None
+    if since and persist:
+        raise ValueError("A since filter loads only part of the feed and cannot be combined with --store or --snapshot")
+    review, feed_messages, unbound_discussions = fetch_review_feed(
+        client, parsed, include_snippets=checkout is None, deadline=deadline, index_path=index_path, since=since
+    )
+    discussions = extract_code_discussions(
+        feed_messages, snippet_pool=snippet_pool, snippet_source=checkout.snippet if checkout else None
+    )
+    discussions = filter_discussions(discussions, unresolved_only and not persist, None if persist else filters)
+    general_comments = extract_general_comments(feed_messages, unbound_discussions)
+
+    _load_threads(client, discussions, deadline, concurrency)
+
+    if any(d.get("partial") for d in discussions):
+        store_path = snapshot_path = None
+    if store_path:
+        with ReviewStore(store_path) as store:
+            store.save_review(review, discussions, general_comments)
+    if snapshot_path:
+        write_snapshot(snapshot_path, review, discussions, general_comments)
+    discussions = filter_discussions(discussions, unresolved_only, filters)
+
+    return review, discussions, filter_general_comments(general_comments, filters)
+
+
+def load_review(
+    review_id: str,
+    unresolved_only: bool = False,
+    store_path: str | None = None,
+    snapshot_path: str | None = None,
+    filters: DiscussionFilter | None = None,
+) -> ReviewData:
+    """Load a review persisted with --store or --snapshot, without contacting Space.
+
+    A snapshot stays open for the lazily decoded discussions; close the returned
+    ReviewData (e.g. ``with load_review(...) as data:``) once it has been rendered.
+    """
+    if filters and filters.since:
+        raise ValueError("A since filter is applied by Space and is not available offline")
+    parsed = parse_review_id(review_id)
+    if snapshot_path:
+        snapshot = Snapshot(snapshot_path)
+        try:
+            review = snapshot.review
+            if (review["project"]["key"], str(review["number"])) != (parsed.project, str(parsed.number)):
+                raise ValueError(
+                    f"Snapshot {snapshot_path} holds {review['project']['key']}-CR-{review['number']}, not {review_id}"
+                )
+            discussions = snapshot.iter_discussions(
+                unresolved_only=unresolved_only, file_glob=filters.file_glob if filters else None
+            )
+            return ReviewData(
+                review,
+                filter_discussions(list(discussions), False, filters),
+                filter_general_comments(snapshot.general_comments(), filters),
+                snapshot.fetched_at,
+                snapshot=snapshot,
+            )
+        except BaseException:
+            snapshot.close()
+            raise
+
+    with ReviewStore(store_path or default_store_path()) as store:
+        cached = store.load_review(parsed.project, parsed.number)
+    if cached is None:
+        raise ValueError(f"Review {review_id} is not in the local store; fetch it once with --store first")
+    review, discussions, general_comments, fetched_at = cached
+    return ReviewData(
+        review,
+        filter_discussions(discussions, unresolved_only, filters),
+        filter_general_comments(general_comments, filters),
+        fetched_at,
+    )
+
+
+def count_unresolved(
+    client: SpaceClient,
+    parsed: ParsedReviewId,
+    limit: int | None = None,
+    index_path: str | Path | None = None,
+) -> tuple[int, bool]:
+    """Count unresolved discussions and comments from their resolved flags, without fetching threads.
+
+    With limit, paging the feed stops as soon as the count exceeds it. Returns the count
+    and whether it is complete.
+    """
+    ids = _indexed_ids(index_path, parsed)
+    if ids is None:
+        review = client.get_review_by_number(parsed.project, parsed.number)
+        ids = (review["id"], review["feedChannelId"])
+        if index_path is not None:
+            _index_review(index_path, parsed, review)
+    review_id, feed_channel_id = ids
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        unbound = executor.submit(client.get_unbound_discussions, parsed.project, review_id)
+        unresolved_ids = set()
+        for page in client.iter_resolution_pages(feed_channel_id):
+            for message in page:
+                details = message.get("details") or {}
+                if details.get("className") == "CodeDiscussionAddedFeedEvent":
+                    code_discussion = details["codeDiscussion"]
+                    if code_discussion["resolved"] is False:
+                        unresolved_ids.add(code_discussion["id"])
+            count = len(unresolved_ids)
+            if unbound.done():
+                count += _count_unresolved_unbound(unbound.result())
+            if limit is not None and count > limit:
+                return count, False
+        return len(unresolved_ids) + _count_unresolved_unbound(unbound.result()), True
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _count_unresolved_unbound(unbound_discussions: list[dict]) -> int:
+    return sum(1 for ud in unbound_discussions if ud.get("resolved") is False and not ud.get("archived"))
+
+
+def refresh_resolutions(
+    client: SpaceClient,
+    review_id: str,
+    store_path: str | None = None,
+    deadline: float | None = None,
+) -> list[dict]:
+    """Update the resolved flags of a stored review without refetching its content.
+
+    Reads only the discussion ids and resolved flags from the feed pages, plus one
+    unbound-discussions request. Returns the resolved/reopened changes in the format
+    of diff_reviews. Discussions posted after the review was stored are not added;
+    fetch the review again with --store for those.
+    """
+    parsed = parse_review_id(review_id)
+    with ReviewStore(store_path or default_store_path()) as store:
+        cached = store.load_review(parsed.project, parsed.number)
+        if cached is None:
+            raise ValueError(f"Review {review_id} is not in the local store; fetch it once with --store first")
+        review, discussions, general_comments, _ = cached
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            feed = executor.submit(client.get_resolution_states, review["feedChannelId"], timeout=_remaining(deadline))
+            unbound = executor.submit(
+                client.get_unbound_discussions, parsed.project, review["id"], timeout=_remaining(deadline)
+            )
+            discussion_states = {
+                message["details"]["codeDiscussion"]["id"]: message["details"]["codeDiscussion"]["resolved"]
+                for message in feed.result()
+                if (message.get("details") or {}).get("className") == "CodeDiscussionAddedFeedEvent"
+            }
+            comment_states = {ud["item"]["id"]: ud.get("resolved") for ud in unbound.result() if ud.get("item")}
+
+        refreshed_discussions = [{**d, "resolved": discussion_states.get(d["id"], d["resolved"])} for d in discussions]
+        refreshed_comments = [
+            {**c, "resolved": comment_states[c["id"]]} if c["id"] in comment_states else c for c in general_comments
+        ]
+        store.update_resolved(
+            review["id"],
+            {new["id"]: new["resolved"] for old, new in zip(discussions, refreshed_discussions) if old != new},
+            {new["id"]: new["resolved"] for old, new in zip(general_comments, refreshed_comments) if old != new},
+        )
+    return diff_reviews(discussions, refreshed_discussions, general_comments, refreshed_comments)
+
+
+class ReviewSession:
+    """Long-lived entry point for library use: one connection pool shared by every lookup.
+
+    Pass ``client`` to reuse an existing SpaceClient; it is then left open on close().
+    Review ids are remembered in the index at ``index_path`` (default: the user cache).
+    ``max_concurrency`` caps the requests the owned client's adaptive limiter lets run at once.
+    """
+
+    def __init__(
+        self,
+        token: str | None = None,
+        client: SpaceClient | None = None,
+        index_path: str | Path | None = None,
+        hedge: bool = False,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> None:
+        if client is None and not token:
+            raise ValueError("Either token or client is required")
+        self._owns_client = client is None
+        self.client = client or SpaceClient(
+            token=token, hedge=hedge, limiter=AdaptiveLimiter(maximum=max_concurrency)
+        )
+        self.index_path = index_path or default_index_path()
+
+    def __enter__(self) -> "ReviewSession":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._owns_client:
+            self.client.close()
+
+    def get_review(
+        self,
+        review_id: str,
+        unresolved_only: bool = False,
+        store_path: str | None = None,
+        snapshot_path: str | None = None,
+        checkout_dir: str | None = None,
+        snippet_pool: SnippetPool | None = None,
+        deadline: float | None = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        filters: DiscussionFilter | None = None,
+    ) -> ReviewData:
+        """Fetch a review; deadline is a budget in seconds for the whole lookup."""
+        if deadline is not None:
+            deadline += time.monotonic()
+        parsed = parse_review_id(review_id)
+        with ExitStack() as stack:
+            checkout = stack.enter_context(LocalCheckout(checkout_dir)) if checkout_dir else None
+            review, discussions, general_comments = fetch_review_data(
+                self.client,
+                parsed,
+                unresolved_only,
+                store_path=store_path,
+                snapshot_path=snapshot_path,
+                snippet_pool=snippet_pool,
+                checkout=checkout,
+                deadline=deadline,
+                concurrency=concurrency,
+                index_path=self.index_path,
+                filters=filters,
+            )
+        return ReviewData(review, discussions, general_comments)
+
+    def refresh_resolutions(self, review_id: str, store_path: str | None = None) -> list[dict]:
+        """Pull only the resolved flags of a review stored with --store; see refresh_resolutions()."""
+        return refresh_resolutions(self.client, review_id, store_path=store_path)
+
+
+def render_markdown(data: ReviewData) -> str:
+    return format_markdown(data.review, data.discussions, data.general_comments, cached_at=data.fetched_at)
+
+
+def render_json(data: ReviewData, indent: int | None = 2) -> str:
+    return format_json(data.review, data.discussions, data.general_comments, cached_at=data.fetched_at, indent=indent)
+
+
+def render_color(data: ReviewData) -> str:
+    return format_color(data.review, data.discussions, data.general_comments, cached_at=data.fetched_at)
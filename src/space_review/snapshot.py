@@ -0,0 +1,390 @@
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+from collections.abc import Iterator, Mapping
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+from .export import _default_mode
+from .hashing import content_hash
+
+MAGIC = b"SRSNAP01"
+NO_STRING = 0xFFFFFFFF
+NO_LINE = -1
+
+# magic, review, fetched_at, then (offset, count) for each section
+_HEADER = struct.Struct("<8sII" + "QI" * 7)
+_STRING_ENTRY = struct.Struct("<QI")
+# id, feed_index, filename, line, old_line, end_line, old_end_line, resolved, is_suggestion,
+# channel_id, author, text, suggested_edit, snippet_start, snippet_count, reply_start, reply_count
+_DISCUSSION = struct.Struct("<IIIiiiibBIIIIIIII")
+# text, type, old_line, new_line, deletes, inserts
+_SNIPPET_LINE = struct.Struct("<IIiiII")
+# author, text
+_REPLY = struct.Struct("<II")
+# id, feed_index, author, text, time, resolved
+_COMMENT = struct.Struct("<IIIIIb")
+# filename, discussion index
+_FILE_ENTRY = struct.Struct("<II")
+
+_RESOLVED_CODES = {False: 0, True: 1, None: 2}
+_RESOLVED_VALUES = {0: False, 1: True, 2: None}
+
+
+def _line_or_none(value: int) -> int | None:
+    return None if value == NO_LINE else value
+
+
+def _none_or_line(value: int | None) -> int:
+    return NO_LINE if value is None else value
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self.strings: list[bytes] = []
+
+    def add(self, value: str | None) -> int:
+        if value is None:
+            return NO_STRING
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self._ids[value] = string_id
+            self.strings.append(value.encode("utf-8"))
+        return string_id
+
+    def add_json(self, value) -> int:
+        return NO_STRING if value is None else self.add(json.dumps(value))
+
+
+def write_snapshot(
+    path: str | Path,
+    review: dict,
+    discussions: list[dict],
+    general_comments: list[dict] | None = None,
+    fetched_at: str | None = None,
+) -> None:
+    strings = _StringTable()
+    review_id = strings.add(json.dumps(review))
+    fetched_at_id = strings.add(fetched_at or datetime.now(timezone.utc).isoformat())
+
+    discussion_records = bytearray()
+    snippet_records = bytearray()
+    reply_records = bytearray()
+    snippet_count = 0
+    reply_count = 0
+    snippet_ranges: dict[str, int] = {}
+    for d in discussions:
+        snippet = [line for line in d.get("snippet", []) if isinstance(line, dict)]
+        snippet_hash = content_hash(snippet)
+        snippet_start = snippet_ranges.get(snippet_hash)
+        if snippet_start is None:
+            snippet_start = snippet_ranges[snippet_hash] = snippet_count
+            for line in snippet:
+                snippet_records += _SNIPPET_LINE.pack(
+                    strings.add(line.get("text", "")),
+                    strings.add(line.get("type")),
+                    _none_or_line(line.get("old_line")),
+                    _none_or_line(line.get("new_line")),
+                    strings.add_json(line.get("deletes")),
+                    strings.add_json(line.get("inserts")),
+                )
+            snippet_count += len(snippet)
+        thread = d.get("thread", [])
+        for reply in thread:
+            reply_records += _REPLY.pack(strings.add(reply["author"]), strings.add(reply["text"]))
+        discussion_records += _DISCUSSION.pack(
+            strings.add(d["id"]),
+            d.get("feed_index", 0),
+            strings.add(d["filename"]),
+            _none_or_line(d.get("line")),
+            _none_or_line(d.get("old_line")),
+            _none_or_line(d.get("end_line")),
+            _none_or_line(d.get("old_end_line")),
+            _RESOLVED_CODES[d.get("resolved")],
+            bool(d.get("is_suggestion")),
+            strings.add(d.get("channel_id")),
+            strings.add(d.get("author")),
+            strings.add(d.get("text")),
+            strings.add_json(d.get("suggested_edit")),
+            snippet_start,
+            len(snippet),
+            reply_count,
+            len(thread),
+        )
+        reply_count += len(thread)
+
+    comment_records = bytearray()
+    for c in (general_comments or []):
+        comment_records += _COMMENT.pack(
+            strings.add(c["id"]),
+            c.get("feed_index", 0),
+            strings.add(c.get("author")),
+            strings.add(c.get("text")),
+            strings.add(c.get("time")),
+            _RESOLVED_CODES[c.get("resolved")],
+        )
+
+    file_index = sorted(range(len(discussions)), key=lambda i: (discussions[i]["filename"], i))
+    file_records = b"".join(
+        _FILE_ENTRY.pack(strings.add(discussions[i]["filename"]), i) for i in file_index
+    )
+
+    string_entries = bytearray()
+    string_data = bytearray()
+    for value in strings.strings:
+        string_entries += _STRING_ENTRY.pack(len(string_data), len(value))
+        string_data += value
+
+    sections = [
+        (string_entries, len(strings.strings)),
+        (string_data, len(string_data)),
+        (discussion_records, len(discussions)),
+        (snippet_records, snippet_count),
+        (reply_records, reply_count),
+        (comment_records, len(general_comments or [])),
+        (file_records, len(discussions)),
+    ]
+    offsets = []
+    offset = _HEADER.size
+    for data, count in sections:
+        offsets.extend([offset, count])
+        offset += len(data)
+
+    # Written next to the target and renamed into place, so a crash never leaves a truncated snapshot.
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, review_id, fetched_at_id, *offsets))
+            for data, _ in sections:
+                f.write(data)
+        os.chmod(tmp_name, _default_mode())
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+class SnapshotDiscussion(Mapping):
+    """Read-only view of one discussion record; fields are decoded on access."""
+
+    _KEYS = (
+        "id", "feed_index", "filename", "line", "old_line", "end_line", "old_end_line", "resolved",
+        "snippet", "channel_id", "author", "text", "suggested_edit", "is_suggestion", "thread",
+    )
+
+    def __init__(self, snapshot: "Snapshot", index: int) -> None:
+        self._snapshot = snapshot
+        self._record = snapshot._discussion_record(index)
+
+    def __getitem__(self, key: str):
+        (
+            id_, feed_index, filename, line, old_line, end_line, old_end_line, resolved, is_suggestion,
+            channel_id, author, text, suggested_edit, snippet_start, snippet_count, reply_start, reply_count,
+        ) = self._record
+        s = self._snapshot
+        match key:
+            case "id":
+                return s._string(id_)
+            case "feed_index":
+                return feed_index
+            case "filename":
+                return s._string(filename)
+            case "line":
+                return _line_or_none(line)
+            case "old_line":
+                return _line_or_none(old_line)
+            case "end_line":
+                return _line_or_none(end_line)
+            case "old_end_line":
+                return _line_or_none(old_end_line)
+            case "resolved":
+                return _RESOLVED_VALUES[resolved]
+            case "snippet":
+                return s._snippet(snippet_start, snippet_count)
+            case "channel_id":
+                return s._string(channel_id)
+            case "author":
+                return s._string(author)
+            case "text":
+                return s._string(text)
+            case "suggested_edit":
+                return s._json(suggested_edit)
+            case "is_suggestion":
+                return bool(is_suggestion)
+            case "thread":
+                return s._replies(reply_start, reply_count)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+
+class Snapshot:
+    def __init__(self, path: str | Path) -> None:
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            self._file.close()
+            raise ValueError(f"Invalid snapshot file: {path}") from e
+        if len(self._mm) < _HEADER.size or self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Invalid snapshot file: {path}")
+
+        header = _HEADER.unpack_from(self._mm, 0)
+        sizes = (_STRING_ENTRY.size, 1, _DISCUSSION.size, _SNIPPET_LINE.size, _REPLY.size, _COMMENT.size, _FILE_ENTRY.size)
+        sections = zip(header[3::2], header[4::2], sizes)
+        if any(offset + count * size > len(self._mm) for offset, count, size in sections):
+            self.close()
+            raise ValueError(f"Invalid snapshot file: {path}")
+        self._review_id, self._fetched_at_id = header[1], header[2]
+        (
+            self._strings_offset, self._string_count,
+            self._string_data_offset, _,
+            self._discussions_offset, self.discussion_count,
+            self._snippet_offset, _,
+            self._replies_offset, _,
+            self._comments_offset, self._comment_count,
+            self._file_index_offset, _,
+        ) = header[3:]
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    @property
+    def review(self) -> dict:
+        return json.loads(self._string(self._review_id))
+
+    @property
+    def fetched_at(self) -> str:
+        return self._string(self._fetched_at_id)
+
+    def discussion(self, index: int) -> SnapshotDiscussion:
+        return SnapshotDiscussion(self, index)
+
+    def iter_discussions(
+        self, filename: str | None = None, unresolved_only: bool = False, file_glob: str | None = None
+    ) -> Iterator[SnapshotDiscussion]:
+        if filename is not None:
+            indices = self._file_discussions(filename)
+        elif file_glob is not None:
+            indices = self._glob_discussions(file_glob)
+        else:
+            indices = range(self.discussion_count)
+        for index in indices:
+            if unresolved_only and self._discussion_record(index)[7] != _RESOLVED_CODES[False]:
+                continue
+            yield SnapshotDiscussion(self, index)
+
+    def general_comments(self) -> list[dict]:
+        comments = []
+        for index in range(self._comment_count):
+            id_, feed_index, author, text, time, resolved = _COMMENT.unpack_from(
+                self._mm, self._comments_offset + index * _COMMENT.size
+            )
+            comments.append({
+                "id": self._string(id_),
+                "feed_index": feed_index,
+                "author": self._string(author),
+                "text": self._string(text),
+                "time": self._string(time),
+                "resolved": _RESOLVED_VALUES[resolved],
+            })
+        return comments
+
+    def _file_discussions(self, filename: str) -> list[int]:
+        indices = []
+        for position in range(self._file_position(filename), self.discussion_count):
+            name, index = self._file_entry(position)
+            if name != filename:
+                break
+            indices.append(index)
+        return indices
+
+    def _glob_discussions(self, file_glob: str) -> list[int]:
+        """Discussions on files matching file_glob (as in DiscussionFilter), in feed order.
+
+        Only the file index entries sharing the glob's literal prefix are read.
+        """
+        pattern = file_glob.lstrip("/")
+        prefix = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+        indices = []
+        for candidate in (prefix, "/" + prefix) if prefix else ("",):
+            for position in range(self._file_position(candidate), self.discussion_count):
+                name, index = self._file_entry(position)
+                if not name.startswith(candidate):
+                    break
+                if fnmatchcase(name.lstrip("/"), pattern):
+                    indices.append(index)
+        return sorted(set(indices))
+
+    def _file_position(self, filename: str) -> int:
+        lo, hi = 0, self.discussion_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._file_entry(mid)[0] < filename:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _file_entry(self, position: int) -> tuple[str, int]:
+        name_id, index = _FILE_ENTRY.unpack_from(self._mm, self._file_index_offset + position * _FILE_ENTRY.size)
+        return self._string(name_id), index
+
+    def _discussion_record(self, index: int) -> tuple:
+        if not 0 <= index < self.discussion_count:
+            raise IndexError(index)
+        return _DISCUSSION.unpack_from(self._mm, self._discussions_offset + index * _DISCUSSION.size)
+
+    def _string(self, string_id: int) -> str | None:
+        if string_id == NO_STRING:
+            return None
+        offset, length = _STRING_ENTRY.unpack_from(self._mm, self._strings_offset + string_id * _STRING_ENTRY.size)
+        start = self._string_data_offset + offset
+        return self._mm[start:start + length].decode("utf-8")
+
+    def _json(self, string_id: int):
+        value = self._string(string_id)
+        return None if value is None else json.loads(value)
+
+    def _snippet(self, start: int, count: int) -> list[dict]:
+        lines = []
+        for index in range(start, start + count):
+            text, type_, old_line, new_line, deletes, inserts = _SNIPPET_LINE.unpack_from(
+                self._mm, self._snippet_offset + index * _SNIPPET_LINE.size
+            )
+            lines.append({
+                "text": self._string(text),
+                "type": self._string(type_),
+                "old_line": _line_or_none(old_line),
+                "new_line": _line_or_none(new_line),
+                "deletes": self._json(deletes),
+                "inserts": self._json(inserts),
+            })
+        return lines
+
+    def _replies(self, start: int, count: int) -> list[dict]:
+        replies = []
+        for index in range(start, start + count):
+            author, text = _REPLY.unpack_from(self._mm, self._replies_offset + index * _REPLY.size)
+            replies.append({"author": self._string(author), "text": self._string(text)})
+        return replies
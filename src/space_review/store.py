@@ -0,0 +1,585 @@
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .hashing import content_hash
+
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    title TEXT,
+    state TEXT,
+    feed_channel_id TEXT,
+    fetched_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_reviews_project_number ON reviews (project, number);
+CREATE INDEX IF NOT EXISTS idx_reviews_feed_channel ON reviews (feed_channel_id);
+
+CREATE TABLE IF NOT EXISTS discussions (
+    id TEXT PRIMARY KEY,
+    review_id TEXT NOT NULL REFERENCES reviews (id) ON DELETE CASCADE,
+    feed_index INTEGER,
+    filename TEXT NOT NULL,
+    line INTEGER,
+    old_line INTEGER,
+    end_line INTEGER,
+    old_end_line INTEGER,
+    resolved INTEGER,
+    snippet_hash TEXT REFERENCES snippets (hash),
+    channel_id TEXT,
+    author TEXT,
+    text TEXT,
+    suggested_edit TEXT,
+    is_suggestion INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_discussions_review ON discussions (review_id, feed_index);
+CREATE INDEX IF NOT EXISTS idx_discussions_filename ON discussions (filename);
+CREATE INDEX IF NOT EXISTS idx_discussions_author ON discussions (author);
+CREATE INDEX IF NOT EXISTS idx_discussions_resolved ON discussions (resolved, filename);
+CREATE INDEX IF NOT EXISTS idx_discussions_snippet ON discussions (snippet_hash);
+CREATE INDEX IF NOT EXISTS idx_discussions_channel ON discussions (channel_id);
+
+CREATE TABLE IF NOT EXISTS snippets (
+    hash TEXT PRIMARY KEY,
+    lines TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS replies (
+    discussion_id TEXT NOT NULL REFERENCES discussions (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    author TEXT,
+    text TEXT,
+    PRIMARY KEY (discussion_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_replies_author ON replies (author);
+
+CREATE TABLE IF NOT EXISTS general_comments (
+    id TEXT PRIMARY KEY,
+    review_id TEXT NOT NULL REFERENCES reviews (id) ON DELETE CASCADE,
+    feed_index INTEGER,
+    author TEXT,
+    text TEXT,
+    time TEXT,
+    resolved INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_general_comments_review ON general_comments (review_id, feed_index);
+CREATE INDEX IF NOT EXISTS idx_general_comments_author ON general_comments (author);
+CREATE INDEX IF NOT EXISTS idx_general_comments_resolved ON general_comments (resolved);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5 (
+    body,
+    kind UNINDEXED,
+    review_id UNINDEXED,
+    item_id UNINDEXED
+);
+"""
+
+
+def _to_bool(value: int | None) -> bool | None:
+    return None if value is None else bool(value)
+
+
+def _fts_query(text: str) -> str:
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+def _search_rows(review_id: str, discussions: list[dict], general_comments: list[dict]) -> list[tuple]:
+    rows = []
+    for d in discussions:
+        if d.get("text"):
+            rows.append((d["text"], "discussion", review_id, d["id"]))
+        for reply in d.get("thread", []):
+            rows.append((reply["text"], "reply", review_id, d["id"]))
+        snippet_text = "\n".join(line["text"] for line in d.get("snippet", []) if isinstance(line, dict))
+        if snippet_text:
+            rows.append((snippet_text, "snippet", review_id, d["id"]))
+    for c in general_comments:
+        rows.append((c["text"], "comment", review_id, c["id"]))
+    return rows
+
+
+class ReviewStore:
+    def __init__(self, path: str | Path) -> None:
+        path = Path(path)
+        if str(path) != ":memory:":
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._migrate()
+
+    def _migrate(self) -> None:
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            # The store is a cache of Space data, so older layouts are rebuilt rather than converted.
+            tables = [row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            with self._conn:
+                self._conn.execute("PRAGMA foreign_keys = OFF")
+                for table in ("search_index", "replies", "general_comments", "discussions", "reviews", "snippets"):
+                    if table in tables:
+                        self._conn.execute(f"DROP TABLE {table}")
+                self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def __enter__(self) -> "ReviewStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def save_review(
+        self,
+        review: dict,
+        discussions: list[dict],
+        general_comments: list[dict] | None = None,
+        fetched_at: str | None = None,
+    ) -> None:
+        fetched_at = fetched_at or datetime.now(timezone.utc).isoformat()
+        with self._conn:
+            previous_hashes = [
+                row[0] for row in self._conn.execute(
+                    "SELECT DISTINCT snippet_hash FROM discussions WHERE review_id = ?", (review["id"],)
+                )
+            ]
+            self._conn.execute("DELETE FROM reviews WHERE id = ?", (review["id"],))
+            self._conn.execute(
+                "INSERT INTO reviews (id, project, number, title, state, feed_channel_id, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    review["id"],
+                    review["project"]["key"],
+                    int(review["number"]),
+                    review.get("title"),
+                    review.get("state"),
+                    review.get("feedChannelId"),
+                    fetched_at,
+                ),
+            )
+            self._conn.execute("DELETE FROM search_index WHERE review_id = ?", (review["id"],))
+            self._insert_items(review["id"], discussions, general_comments or [])
+            self._conn.executemany(
+                "DELETE FROM snippets WHERE hash = ? "
+                "AND NOT EXISTS (SELECT 1 FROM discussions WHERE snippet_hash = snippets.hash)",
+                [(h,) for h in previous_hashes],
+            )
+
+    def _insert_items(self, review_id: str, discussions: list[dict], general_comments: list[dict]) -> None:
+        """Insert discussions with their snippets and replies, general comments, and their search rows."""
+        # Discussions from the same SnippetPool share snippet lists, so each one is hashed once.
+        hash_by_snippet_id: dict[int, str] = {}
+        snippets: dict[str, list] = {}
+        discussion_snippet_hashes = []
+        for d in discussions:
+            snippet = d.get("snippet") or []
+            snippet_hash = hash_by_snippet_id.get(id(snippet)) if snippet else None
+            if snippet_hash is None:
+                snippet_hash = content_hash(snippet)
+                if snippet:
+                    hash_by_snippet_id[id(snippet)] = snippet_hash
+            snippets.setdefault(snippet_hash, snippet)
+            discussion_snippet_hashes.append(snippet_hash)
+
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO snippets (hash, lines) VALUES (?, ?)",
+            [(snippet_hash, json.dumps(snippet)) for snippet_hash, snippet in snippets.items()],
+        )
+        self._conn.executemany(
+            "INSERT INTO discussions (id, review_id, feed_index, filename, line, old_line, end_line, "
+            "old_end_line, resolved, snippet_hash, channel_id, author, text, suggested_edit, is_suggestion) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    d["id"],
+                    review_id,
+                    d.get("feed_index"),
+                    d["filename"],
+                    d.get("line"),
+                    d.get("old_line"),
+                    d.get("end_line"),
+                    d.get("old_end_line"),
+                    d.get("resolved"),
+                    snippet_hash,
+                    d.get("channel_id"),
+                    d.get("author"),
+                    d.get("text"),
+                    json.dumps(d["suggested_edit"]) if d.get("suggested_edit") else None,
+                    bool(d.get("is_suggestion")),
+                )
+                for d, snippet_hash in zip(discussions, discussion_snippet_hashes)
+            ],
+        )
+        self._conn.executemany(
+            "INSERT INTO replies (discussion_id, position, author, text) VALUES (?, ?, ?, ?)",
+            [
+                (d["id"], position, reply["author"], reply["text"])
+                for d in discussions
+                for position, reply in enumerate(d.get("thread", []))
+            ],
+        )
+        self._conn.executemany(
+            "INSERT INTO general_comments (id, review_id, feed_index, author, text, time, resolved) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    c["id"],
+                    review_id,
+                    c.get("feed_index"),
+                    c.get("author"),
+                    c.get("text"),
+                    c.get("time"),
+                    c.get("resolved"),
+                )
+                for c in general_comments
+            ],
+        )
+        self._conn.executemany(
+            "INSERT INTO search_index (body, kind, review_id, item_id) VALUES (?, ?, ?, ?)",
+            _search_rows(review_id, discussions, general_comments),
+        )
+
+    def load_review(self, project: str, number: int | str) -> tuple[dict, list[dict], list[dict], str] | None:
+        row = self._conn.execute(
+            "SELECT * FROM reviews WHERE project = ? AND number = ?", (project, int(number))
+        ).fetchone()
+        if row is None:
+            return None
+
+        review = {
+            "id": row["id"],
+            "project": {"key": row["project"]},
+            "number": row["number"],
+            "title": row["title"],
+            "state": row["state"],
+            "feedChannelId": row["feed_channel_id"],
+        }
+        discussion_rows = self._conn.execute(
+            "SELECT * FROM discussions WHERE review_id = ? ORDER BY feed_index", (row["id"],)
+        ).fetchall()
+        general_comments = [
+            self._general_comment_from_row(r)
+            for r in self._conn.execute(
+                "SELECT * FROM general_comments WHERE review_id = ? ORDER BY feed_index", (row["id"],)
+            )
+        ]
+        return review, self._discussions_from_rows(discussion_rows), general_comments, row["fetched_at"]
+
+    def update_resolved(
+        self, review_id: str, discussions: dict[str, bool], general_comments: dict[str, bool | None]
+    ) -> int:
+        """Set resolved flags by item id without rewriting the rest of the review.
+
+        Returns how many items changed.
+        """
+        with self._conn:
+            changed = self._conn.executemany(
+                "UPDATE discussions SET resolved = ? WHERE id = ? AND review_id = ? AND resolved IS NOT ?",
+                [(resolved, item_id, review_id, resolved) for item_id, resolved in discussions.items()],
+            ).rowcount
+            changed += self._conn.executemany(
+                "UPDATE general_comments SET resolved = ? WHERE id = ? AND review_id = ? AND resolved IS NOT ?",
+                [(resolved, item_id, review_id, resolved) for item_id, resolved in general_comments.items()],
+            ).rowcount
+        return changed
+
+    def update_review(self, review_id: str, title: str | None = None, state: str | None = None) -> bool:
+        """Set the title and/or state of a stored review; returns whether either changed."""
+        with self._conn:
+            cursor = self._conn.execute(
+                "UPDATE reviews SET title = COALESCE(?, title), state = COALESCE(?, state) "
+                "WHERE id = ? AND (COALESCE(?, title) IS NOT title OR COALESCE(?, state) IS NOT state)",
+                (title, state, review_id, title, state),
+            )
+        return cursor.rowcount > 0
+
+    def add_feed_items(self, review_id: str, discussions: list[dict], general_comments: list[dict]) -> bool:
+        """Append new feed discussions and comments to a stored review, skipping ids it already has.
+
+        The items share the next feed index. Returns whether anything was added.
+        """
+        ids = [d["id"] for d in discussions] + [c["id"] for c in general_comments]
+        if not ids:
+            return False
+        placeholders = ",".join("?" * len(ids))
+        with self._conn:
+            known = {
+                row[0] for row in self._conn.execute(
+                    f"SELECT id FROM discussions WHERE id IN ({placeholders}) "
+                    f"UNION SELECT id FROM general_comments WHERE id IN ({placeholders})",
+                    ids + ids,
+                )
+            }
+            (last_index,) = self._conn.execute(
+                "SELECT MAX(feed_index) FROM (SELECT feed_index FROM discussions WHERE review_id = ? "
+                "UNION ALL SELECT feed_index FROM general_comments WHERE review_id = ?)",
+                (review_id, review_id),
+            ).fetchone()
+            feed_index = 0 if last_index is None else last_index + 1
+            discussions = [{**d, "feed_index": feed_index} for d in discussions if d["id"] not in known]
+            general_comments = [{**c, "feed_index": feed_index} for c in general_comments if c["id"] not in known]
+            self._insert_items(review_id, discussions, general_comments)
+        return bool(discussions or general_comments)
+
+    def add_reply(self, channel_id: str, author: str, text: str) -> bool:
+        """Add a message to the thread of the discussion with this channel.
+
+        The first message fills in the discussion's own author and text. A message equal to the
+        latest one in the thread is a redelivery and is skipped. Returns whether the thread changed.
+        """
+        with self._conn:
+            discussion = self._conn.execute(
+                "SELECT id, review_id, author, text FROM discussions WHERE channel_id = ? LIMIT 1", (channel_id,)
+            ).fetchone()
+            if discussion is None:
+                return False
+            if discussion["text"] is None:
+                self._conn.execute(
+                    "UPDATE discussions SET author = ?, text = ? WHERE id = ?", (author, text, discussion["id"])
+                )
+                if text:
+                    self._conn.execute(
+                        "INSERT INTO search_index (body, kind, review_id, item_id) VALUES (?, 'discussion', ?, ?)",
+                        (text, discussion["review_id"], discussion["id"]),
+                    )
+                return True
+
+            latest = self._conn.execute(
+                "SELECT position, author, text FROM replies WHERE discussion_id = ? ORDER BY position DESC LIMIT 1",
+                (discussion["id"],),
+            ).fetchone() or {"position": -1, "author": discussion["author"], "text": discussion["text"]}
+            if (latest["author"], latest["text"]) == (author, text):
+                return False
+            self._conn.execute(
+                "INSERT INTO replies (discussion_id, position, author, text) VALUES (?, ?, ?, ?)",
+                (discussion["id"], latest["position"] + 1, author, text),
+            )
+            self._conn.execute(
+                "INSERT INTO search_index (body, kind, review_id, item_id) VALUES (?, 'reply', ?, ?)",
+                (text, discussion["review_id"], discussion["id"]),
+            )
+        return True
+
+    def update_general_comment(self, review_id: str, comment_id: str, text: str) -> bool:
+        """Replace the text of a stored general comment; returns whether it changed."""
+        with self._conn:
+            cursor = self._conn.execute(
+                "UPDATE general_comments SET text = ? WHERE id = ? AND review_id = ? AND text IS NOT ?",
+                (text, comment_id, review_id, text),
+            )
+            if cursor.rowcount:
+                self._conn.execute(
+                    "UPDATE search_index SET body = ? WHERE kind = 'comment' AND item_id = ?", (text, comment_id)
+                )
+        return cursor.rowcount > 0
+
+    def delete_general_comment(self, review_id: str, comment_id: str) -> bool:
+        """Remove a stored general comment and its search entry; returns whether it existed."""
+        with self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM general_comments WHERE id = ? AND review_id = ?", (comment_id, review_id)
+            )
+            if cursor.rowcount:
+                self._conn.execute("DELETE FROM search_index WHERE kind = 'comment' AND item_id = ?", (comment_id,))
+        return cursor.rowcount > 0
+
+    def feed_review_id(self, channel_id: str) -> str | None:
+        """Id of the stored review whose feed is this channel."""
+        row = self._conn.execute("SELECT id FROM reviews WHERE feed_channel_id = ?", (channel_id,)).fetchone()
+        return row["id"] if row else None
+
+    def review_key(self, review_id: str | None = None, channel_id: str | None = None) -> tuple[str, int] | None:
+        """(project, number) of the stored review with this id, feed channel or discussion channel."""
+        row = self._conn.execute(
+            "SELECT project, number FROM reviews WHERE id = ? OR feed_channel_id = ? "
+            "UNION ALL SELECT r.project, r.number FROM discussions d JOIN reviews r ON r.id = d.review_id "
+            "WHERE d.channel_id = ? LIMIT 1",
+            (review_id, channel_id, channel_id),
+        ).fetchone()
+        return (row["project"], row["number"]) if row else None
+
+    def query_discussions(
+        self,
+        project: str | None = None,
+        number: int | str | None = None,
+        filename_prefix: str | None = None,
+        author: str | None = None,
+        resolved: bool | None = None,
+    ) -> list[dict]:
+        clauses = []
+        params: list = []
+        if project is not None:
+            clauses.append("r.project = ?")
+            params.append(project)
+        if number is not None:
+            clauses.append("r.number = ?")
+            params.append(int(number))
+        if filename_prefix:
+            if not filename_prefix.startswith("/"):
+                filename_prefix = "/" + filename_prefix
+            # Range comparison instead of LIKE so SQLite can use the filename index.
+            clauses.append("d.filename >= ? AND d.filename < ?")
+            params.extend([filename_prefix, filename_prefix + "\U0010ffff"])
+        if author is not None:
+            clauses.append("d.author = ?")
+            params.append(author)
+        if resolved is not None:
+            clauses.append("d.resolved = ?")
+            params.append(int(resolved))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn.execute(
+            f"SELECT d.*, r.project, r.number FROM discussions d JOIN reviews r ON r.id = d.review_id "
+            f"{where} ORDER BY r.project, r.number, d.feed_index",
+            params,
+        ).fetchall()
+        return self._discussions_from_rows(rows)
+
+    def search(self, text: str, limit: int = 20) -> list[dict]:
+        terms = _fts_query(text)
+        if not terms or limit < 1:
+            return []
+        try:
+            hits = self._ranked_hits(terms, limit)
+            if not hits:
+                return []
+            # Kinds matched anywhere in the returned items, not just in their best-ranked rows.
+            placeholders = ",".join("?" * len(hits))
+            for row in self._conn.execute(
+                f"SELECT DISTINCT kind, item_id FROM search_index WHERE search_index MATCH ? "
+                f"AND rowid IN (SELECT rowid FROM search_index WHERE item_id IN ({placeholders}))",
+                [terms, *(hit["id"] for hit in hits.values())],
+            ):
+                hit = hits.get(("comment" if row["kind"] == "comment" else "discussion", row["item_id"]))
+                if hit is not None and row["kind"] not in hit["matched"]:
+                    hit["matched"].append(row["kind"])
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query: {text}") from e
+
+        discussion_ids = [h["id"] for h in hits.values() if h["type"] == "discussion"]
+        comment_ids = [h["id"] for h in hits.values() if h["type"] == "comment"]
+        items = {("discussion", d["id"]): d for d in self._load_discussions(discussion_ids)}
+        items.update({("comment", c["id"]): c for c in self._load_general_comments(comment_ids)})
+
+        results = []
+        for key, hit in hits.items():
+            if key in items:
+                hit["item"] = items[key]
+                results.append(hit)
+        return results
+
+    def _ranked_hits(self, terms: str, limit: int) -> dict[tuple[str, str], dict]:
+        """The limit best-ranked items, read from a window of the best rows that widens until it holds them.
+
+        FTS5 ranks (bm25) every match but reads the unindexed columns only of the rows in the window.
+        """
+        window = limit * 4
+        while True:
+            rows = self._conn.execute(
+                "SELECT kind, item_id, rank AS score FROM search_index WHERE search_index MATCH ? ORDER BY rank LIMIT ?",
+                (terms, window),
+            ).fetchall()
+            hits: dict[tuple[str, str], dict] = {}
+            for row in rows:
+                item_type = "comment" if row["kind"] == "comment" else "discussion"
+                key = (item_type, row["item_id"])
+                if key not in hits:
+                    if len(hits) == limit:
+                        break
+                    hits[key] = {"type": item_type, "id": row["item_id"], "score": row["score"], "matched": []}
+                if row["kind"] not in hits[key]["matched"]:
+                    hits[key]["matched"].append(row["kind"])
+            if len(hits) == limit or len(rows) < window:
+                return hits
+            window *= 4
+
+    def _load_discussions(self, ids: list[str]) -> list[dict]:
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        rows = self._conn.execute(
+            f"SELECT d.*, r.project, r.number FROM discussions d JOIN reviews r ON r.id = d.review_id "
+            f"WHERE d.id IN ({placeholders})",
+            ids,
+        ).fetchall()
+        return self._discussions_from_rows(rows)
+
+    def _load_general_comments(self, ids: list[str]) -> list[dict]:
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        rows = self._conn.execute(
+            f"SELECT c.*, r.project, r.number FROM general_comments c JOIN reviews r ON r.id = c.review_id "
+            f"WHERE c.id IN ({placeholders})",
+            ids,
+        ).fetchall()
+        return [self._general_comment_from_row(row) for row in rows]
+
+    def _load_snippets(self, hashes: set[str]) -> dict[str, list[dict]]:
+        if not hashes:
+            return {}
+        placeholders = ",".join("?" * len(hashes))
+        return {
+            row["hash"]: json.loads(row["lines"])
+            for row in self._conn.execute(f"SELECT hash, lines FROM snippets WHERE hash IN ({placeholders})", list(hashes))
+        }
+
+    def _discussions_from_rows(self, rows: list[sqlite3.Row]) -> list[dict]:
+        snippets = self._load_snippets({row["snippet_hash"] for row in rows if row["snippet_hash"]})
+        discussions = [self._discussion_from_row(row, snippets.get(row["snippet_hash"], [])) for row in rows]
+        by_id = {d["id"]: d for d in discussions}
+        if by_id:
+            placeholders = ",".join("?" * len(by_id))
+            for row in self._conn.execute(
+                f"SELECT discussion_id, author, text FROM replies "
+                f"WHERE discussion_id IN ({placeholders}) ORDER BY discussion_id, position",
+                list(by_id),
+            ):
+                by_id[row["discussion_id"]]["thread"].append({"author": row["author"], "text": row["text"]})
+        return discussions
+
+    @staticmethod
+    def _general_comment_from_row(row: sqlite3.Row) -> dict:
+        comment = {
+            "id": row["id"],
+            "feed_index": row["feed_index"],
+            "author": row["author"],
+            "text": row["text"],
+            "time": row["time"],
+            "resolved": _to_bool(row["resolved"]),
+        }
+        if "project" in row.keys():
+            comment["project"] = row["project"]
+            comment["number"] = row["number"]
+        return comment
+
+    @staticmethod
+    def _discussion_from_row(row: sqlite3.Row, snippet: list[dict]) -> dict:
+        discussion = {
+            "id": row["id"],
+            "feed_index": row["feed_index"],
+            "filename": row["filename"],
+            "line": row["line"],
+            "old_line": row["old_line"],
+            "end_line": row["end_line"],
+            "old_end_line": row["old_end_line"],
+            "resolved": _to_bool(row["resolved"]),
+            "snippet": snippet,
+            "channel_id": row["channel_id"],
+            "author": row["author"],
+            "text": row["text"],
+            "suggested_edit": json.loads(row["suggested_edit"]) if row["suggested_edit"] else None,
+            "is_suggestion": bool(row["is_suggestion"]),
+            "thread": [],
+        }
+        if "project" in row.keys():
+            discussion["project"] = row["project"]
+            discussion["number"] = row["number"]
+        return discussion
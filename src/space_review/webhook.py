@@ -0,0 +1,152 @@
+import hashlib
+import hmac
+import json
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+from .processor import extract_code_discussions, extract_general_comments
+from .store import ReviewStore
+
+SIGNATURE_TOLERANCE_SECONDS = 300
+
+
+def sign(signing_key: str, timestamp: str, body: bytes) -> str:
+    message = timestamp.encode() + b":" + body
+    return hmac.new(signing_key.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(
+    signing_key: str,
+    timestamp: str | None,
+    body: bytes,
+    signature: str | None,
+    now: float | None = None,
+) -> bool:
+    """Check X-Space-Signature (HMAC-SHA256 of "timestamp:body") and reject stale timestamps."""
+    if not timestamp or not signature:
+        return False
+    try:
+        sent_at = int(timestamp) / 1000
+    except ValueError:
+        return False
+    if abs((now if now is not None else time.time()) - sent_at) > SIGNATURE_TOLERANCE_SECONDS:
+        return False
+    return hmac.compare_digest(sign(signing_key, timestamp, body), signature.lower())
+
+
+def _apply_review_event(store: ReviewStore, event: dict) -> bool:
+    record = event.get("review") or {}
+    return store.update_review(
+        record.get("id") or event.get("reviewId"),
+        title=record.get("title") or event.get("title") or None,
+        state=record.get("state") or None,
+    )
+
+
+def _apply_resolution(store: ReviewStore, event: dict) -> bool:
+    resolved = (event.get("resolved") or {}).get("new")
+    wrapper = event.get("discussion") or {}
+    record = wrapper.get("discussion") or {}
+    if resolved is None or not record:
+        return False
+    review_id = (event.get("review") or {}).get("id")
+    if wrapper.get("className") == "CodeReviewDiscussion.Unbound":
+        return store.update_resolved(review_id, {}, {(record.get("item") or {}).get("id"): resolved}) > 0
+    return store.update_resolved(review_id, {record.get("id"): resolved}, {}) > 0
+
+
+def _apply_message(store: ReviewStore, event: dict) -> bool:
+    channel_id = event.get("channelId")
+    message = event.get("message") or {}
+    if not message.get("author"):
+        return False
+
+    review_id = store.feed_review_id(channel_id)
+    if review_id is not None:
+        return store.add_feed_items(
+            review_id, extract_code_discussions([message]), extract_general_comments([message])
+        )
+    return store.add_reply(channel_id, message["author"]["name"], message.get("text", ""))
+
+
+def _apply_message_change(store: ReviewStore, event: dict) -> bool:
+    # Only general comments keep their message id, so edits and deletions elsewhere are not tracked.
+    review_id = store.feed_review_id(event.get("channelId"))
+    message = event.get("message") or {}
+    message_id = message.get("id") or event.get("messageId")
+    if review_id is None or not message_id:
+        return False
+    if event.get("className") == "ChatMessageDeletedEvent":
+        return store.delete_general_comment(review_id, message_id)
+    return store.update_general_comment(review_id, message_id, message.get("text", ""))
+
+
+def apply_event(store: ReviewStore, event: dict) -> str | None:
+    """Apply one webhook event to a review already in the store.
+
+    Only the rows the event touches are written. Returns "<project>-CR-<number>" when
+    the stored review changed, None otherwise. Events for reviews that are not in the
+    store are ignored.
+    """
+    class_name = event.get("className")
+    if class_name in ("CodeReviewWebhookEvent", "CodeReviewUpdatedWebhookEvent"):
+        key = store.review_key(review_id=(event.get("review") or {}).get("id") or event.get("reviewId"))
+    elif class_name == "CodeReviewDiscussionWebhookEvent":
+        key = store.review_key(review_id=(event.get("review") or {}).get("id"))
+    elif class_name in ("ChatMessageCreatedEvent", "ChatMessageUpdatedEvent", "ChatMessageDeletedEvent"):
+        key = store.review_key(channel_id=event.get("channelId"))
+    else:
+        return None
+    if key is None:
+        return None
+
+    if class_name == "CodeReviewDiscussionWebhookEvent":
+        changed = _apply_resolution(store, event)
+    elif class_name == "ChatMessageCreatedEvent":
+        changed = _apply_message(store, event)
+    elif class_name in ("ChatMessageUpdatedEvent", "ChatMessageDeletedEvent"):
+        changed = _apply_message_change(store, event)
+    else:
+        changed = _apply_review_event(store, event)
+    return f"{key[0]}-CR-{key[1]}" if changed else None
+
+
+def make_server(
+    store_path: str | Path,
+    signing_key: str,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    on_event: Callable[[str, str | None], None] | None = None,
+) -> HTTPServer:
+    """HTTP server that verifies Space webhook requests and applies their events to the store."""
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if not verify_signature(
+                signing_key, self.headers.get("X-Space-Timestamp"), body, self.headers.get("X-Space-Signature")
+            ):
+                self._reply(401)
+                return
+            try:
+                event = json.loads(body)["payload"]
+                with ReviewStore(store_path) as store:
+                    updated = apply_event(store, event)
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self._reply(400)
+                return
+            if on_event is not None:
+                on_event(event.get("className", "?"), updated)
+            self._reply(200)
+
+        def _reply(self, status: int) -> None:
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return HTTPServer((host, port), WebhookHandler)
@@ -1,6 +1,13 @@
-import pytest
+from collections.abc import Callable
 from typing import Any
 
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
 
 @pytest.fixture
 def sample_review_data() -> dict[str, Any]:
@@ -54,3 +61,30 @@ def sample_thread_message() -> dict[str, Any]:
         "author": {"name": "Lev.Leontev"},
         "time": "2024-01-15T11:00:00Z",
     }
+
+
+@pytest.fixture
+def make_discussion() -> Callable[..., dict[str, Any]]:
+    """Factory for processed code discussions; keyword arguments override fields."""
+
+    def make(id: str = "d1", filename: str = "/src/Main.kt", **fields: Any) -> dict[str, Any]:
+        return {
+            "id": id,
+            "feed_index": 0,
+            "filename": filename,
+            "line": 9,
+            "old_line": None,
+            "end_line": None,
+            "old_end_line": None,
+            "resolved": False,
+            "snippet": [{"text": "val x = 1", "type": "ADDED", "old_line": None, "new_line": 9, "deletes": None, "inserts": None}],
+            "channel_id": f"channel-{id}",
+            "author": "Andrew.Kozlov",
+            "text": "Please rename",
+            "suggested_edit": None,
+            "is_suggestion": False,
+            "thread": [],
+            **fields,
+        }
+
+    return make
@@ -1,8 +1,16 @@
+import logging
+import threading
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
 import pytest
 from urllib.parse import unquote
 from pytest_httpx import HTTPXMock
 
 from space_review.api import SpaceClient
+from space_review.limiter import AdaptiveLimiter
 
 
 BASE_URL = "https://jetbrains.team/api/http"
@@ -68,6 +76,115 @@ class TestGetFeedMessages:
         assert "batchSize=50" in url
         assert "$fields=messages(id,text,author(name),time,details(className,codeDiscussion))" in url
 
+    def test_get_feed_messages_can_skip_snippets(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(json={"messages": []})
+
+        client = SpaceClient(token="test-token")
+        client.get_feed_messages(channel_id="feed-channel-123", include_snippets=False)
+
+        url = str(httpx_mock.get_request().url)
+        assert "codeDiscussion(id,anchor,endAnchor,resolved,channel(id),suggestedEdit)" in url
+        assert "snippet" not in url
+
+    def test_get_resolution_states_requests_minimal_fields(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(json={"messages": []})
+
+        SpaceClient(token="test-token").get_resolution_states("feed-channel-123")
+
+        url = unquote(str(httpx_mock.get_request().url))
+        assert "channel=id:feed-channel-123" in url
+        assert "$fields=messages(details(className,codeDiscussion(id,resolved)))" in url
+
+    def test_iter_resolution_pages_follows_next_start(self, httpx_mock: HTTPXMock):
+        first = [{"id": f"m{i}"} for i in range(50)]
+        httpx_mock.add_response(
+            url=re.compile(r".*startFromDate=2024-01-15T10:00:00.000Z.*"),
+            json={"messages": [{"id": "m50"}], "nextStartFromDate": "2024-01-15T11:00:00.000Z", "orgLimitReached": False},
+        )
+        httpx_mock.add_response(
+            json={"messages": first, "nextStartFromDate": "2024-01-15T10:00:00.000Z", "orgLimitReached": False},
+        )
+
+        pages = list(SpaceClient(token="test-token").iter_resolution_pages("feed-channel-123"))
+
+        assert pages == [first, [{"id": "m50"}]]
+        assert len(httpx_mock.get_requests()) == 2
+
+    def test_short_page_is_the_last(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(
+            json={"messages": [{"id": "m1"}], "nextStartFromDate": "2024-01-15T10:00:00.000Z", "orgLimitReached": False},
+        )
+
+        pages = list(SpaceClient(token="test-token").iter_resolution_pages("feed-channel-123"))
+
+        assert pages == [[{"id": "m1"}]]
+        assert len(httpx_mock.get_requests()) == 1
+
+    def test_get_resolution_states_reads_every_page(self, httpx_mock: HTTPXMock):
+        def discussion(id):
+            return {"details": {"className": "CodeDiscussionAddedFeedEvent", "codeDiscussion": {"id": id, "resolved": True}}}
+
+        httpx_mock.add_response(
+            url=re.compile(r".*startFromDate=2024-01-15T10:00:00.000Z.*"),
+            json={"messages": [discussion("d50")], "nextStartFromDate": None, "orgLimitReached": False},
+        )
+        httpx_mock.add_response(
+            json={
+                "messages": [discussion(f"d{i}") for i in range(50)],
+                "nextStartFromDate": "2024-01-15T10:00:00.000Z",
+                "orgLimitReached": False,
+            },
+        )
+
+        states = SpaceClient(token="test-token").get_resolution_states("feed-channel-123")
+
+        assert [m["details"]["codeDiscussion"]["id"] for m in states] == [f"d{i}" for i in range(51)]
+
+    def test_get_feed_messages_reads_every_page(self, httpx_mock: HTTPXMock):
+        # Pages may overlap on messages sent at the boundary timestamp.
+        httpx_mock.add_response(
+            url=re.compile(r".*startFromDate=2024-01-15T10:00:00.000Z.*"),
+            json={"messages": [{"id": "m49"}, {"id": "m50"}], "nextStartFromDate": None, "orgLimitReached": False},
+        )
+        httpx_mock.add_response(
+            json={
+                "messages": [{"id": f"m{i}"} for i in range(50)],
+                "nextStartFromDate": "2024-01-15T10:00:00.000Z",
+                "orgLimitReached": False,
+            },
+        )
+
+        messages = SpaceClient(token="test-token").get_feed_messages("feed-channel-123")
+
+        assert [m["id"] for m in messages] == [f"m{i}" for i in range(51)]
+        assert "nextStartFromDate" in unquote(str(httpx_mock.get_requests()[0].url))
+
+    def test_get_feed_messages_since(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(json={"messages": []})
+
+        client = SpaceClient(token="test-token")
+        client.get_feed_messages(
+            channel_id="feed-channel-123", since=datetime(2024, 1, 15, 10, 30, tzinfo=timezone(timedelta(hours=2)))
+        )
+
+        assert "startFromDate=2024-01-15T08:30:00.000Z" in str(httpx_mock.get_request().url)
+
+
+class TestTimeouts:
+    def test_default_timeout_policy(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(json={"messages": []})
+
+        SpaceClient(token="test-token").get_discussion_thread(channel_id="c")
+
+        assert httpx_mock.get_request().extensions["timeout"]["read"] == 30.0
+
+    def test_per_request_timeout(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(json={"messages": []})
+
+        SpaceClient(token="test-token").get_discussion_thread(channel_id="c", timeout=1.5)
+
+        assert httpx_mock.get_request().extensions["timeout"]["read"] == pytest.approx(1.5, abs=0.05)
+
 
 class TestGetDiscussionThread:
     def test_get_discussion_thread_returns_messages(
@@ -126,3 +243,176 @@ class TestGetUnboundDiscussions:
         url = unquote(str(request.url))
         assert "/projects/key:IJ/code-reviews/2wBoBc4URsmM/unbound-discussions" in url
         assert "$fields=data(id,resolved,archived,item(id))" in url
+
+
+class TestRequestCoalescing:
+    def _run_concurrently(self, count, call):
+        results = [None] * count
+        errors = []
+
+        def run(i):
+            try:
+                results[i] = call()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def test_identical_concurrent_requests_share_one_call(self, httpx_mock: HTTPXMock, sample_review_data):
+        entered = threading.Event()
+        release = threading.Event()
+
+        def respond(request):
+            entered.set()
+            release.wait(5)
+            return httpx.Response(200, json=sample_review_data)
+
+        httpx_mock.add_callback(respond)
+        client = SpaceClient(token="test-token")
+
+        threads, results, errors = self._run_concurrently(20, lambda: client.get_review_by_number("IJ", "174369"))
+        entered.wait(5)
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(httpx_mock.get_requests()) == 1
+        assert all(result == sample_review_data for result in results)
+        assert len({id(result) for result in results}) == 20
+
+    def test_errors_fan_out_to_waiters(self, httpx_mock: HTTPXMock):
+        entered = threading.Event()
+        release = threading.Event()
+
+        def respond(request):
+            entered.set()
+            release.wait(5)
+            return httpx.Response(500)
+
+        httpx_mock.add_callback(respond)
+        client = SpaceClient(token="test-token")
+
+        threads, _, errors = self._run_concurrently(5, lambda: client.get_discussion_thread("c"))
+        entered.wait(5)
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(errors) == 5
+        assert all(isinstance(e, httpx.HTTPStatusError) for e in errors)
+        assert len(httpx_mock.get_requests()) == 1
+
+    def test_sequential_requests_are_not_cached(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(json={"messages": []}, is_reusable=True)
+        client = SpaceClient(token="test-token")
+
+        client.get_discussion_thread("c")
+        client.get_discussion_thread("c")
+
+        assert len(httpx_mock.get_requests()) == 2
+
+
+class TestAdaptiveConcurrency:
+    def test_throttled_responses_shrink_window(self, httpx_mock: HTTPXMock):
+        httpx_mock.add_response(status_code=429)
+        client = SpaceClient(token="test-token", limiter=AdaptiveLimiter(initial=8, maximum=8))
+
+        with pytest.raises(httpx.HTTPStatusError):
+            client.get_discussion_thread("c")
+
+        assert client.limiter.window == 4
+        assert client.metrics()["throttled"] == 1
+
+    def test_metrics_and_trace(self, httpx_mock: HTTPXMock, caplog):
+        httpx_mock.add_response(json={"messages": []}, is_reusable=True)
+        client = SpaceClient(token="test-token")
+
+        with caplog.at_level(logging.DEBUG, logger="space_review"):
+            client.get_discussion_thread("c")
+            client.get_discussion_thread("c")
+            client.close()
+
+        metrics = client.metrics()
+        assert metrics["requests"] == 2
+        assert metrics["errors"] == 0
+        assert metrics["window"] >= 4
+        assert metrics["p90_ms"] is not None
+        assert "GET /chats/messages?channel=id:c&sorting=FromOldestToNewest&batchSize=50 200" in caplog.text
+        assert "requests=2 coalesced=0 errors=0 throttled=0" in caplog.text
+
+
+class TestHedging:
+    def _warm_client(self, hedge=True):
+        client = SpaceClient(token="test-token", hedge=hedge)
+        client._latencies.extend([0.01] * SpaceClient.HEDGE_MIN_SAMPLES)
+        client._stats["requests"] = SpaceClient.HEDGE_MIN_SAMPLES
+        return client
+
+    def _slow_first_response(self, httpx_mock, release):
+        calls = []
+
+        def respond(request):
+            calls.append(request)
+            if len(calls) == 1:
+                release.wait(5)
+                return httpx.Response(200, json={"messages": [{"id": "slow"}]})
+            return httpx.Response(200, json={"messages": [{"id": "fast"}]})
+
+        httpx_mock.add_callback(respond, is_reusable=True)
+        return calls
+
+    def test_slow_thread_fetch_is_hedged(self, httpx_mock: HTTPXMock):
+        release = threading.Event()
+        calls = self._slow_first_response(httpx_mock, release)
+        client = self._warm_client()
+
+        try:
+            result = client.get_discussion_thread("c")
+        finally:
+            release.set()
+            client.close()
+
+        assert result == [{"id": "fast"}]
+        assert len(calls) == 2
+        assert client.metrics()["hedged"] == 1
+        assert client.metrics()["hedge_wins"] == 1
+
+    def test_hedging_is_off_by_default(self, httpx_mock: HTTPXMock):
+        release = threading.Event()
+        calls = self._slow_first_response(httpx_mock, release)
+        client = self._warm_client(hedge=False)
+        threading.Timer(0.1, release.set).start()
+
+        assert client.get_discussion_thread("c") == [{"id": "slow"}]
+        assert len(calls) == 1
+
+    def test_hedges_respect_budget(self, httpx_mock: HTTPXMock):
+        release = threading.Event()
+        calls = self._slow_first_response(httpx_mock, release)
+        client = self._warm_client()
+        client._stats["hedged"] = 2
+        threading.Timer(0.1, release.set).start()
+
+        assert client.get_feed_messages("c") == [{"id": "slow"}]
+        assert len(calls) == 1
+
+    def test_review_header_is_not_hedged(self, httpx_mock: HTTPXMock, sample_review_data):
+        release = threading.Event()
+        threading.Timer(0.1, release.set).start()
+
+        def respond(request):
+            release.wait(5)
+            return httpx.Response(200, json=sample_review_data)
+
+        httpx_mock.add_callback(respond)
+        client = self._warm_client()
+
+        client.get_review_by_number("IJ", "174369")
+
+        assert len(httpx_mock.get_requests()) == 1
@@ -0,0 +1,78 @@
+import json
+import marshal
+
+from space_review.batch import merge_ndjson, render_many, render_serialized, serialize_review, shard_index
+from space_review.formatter import format_markdown, format_color
+
+
+def _review(number):
+    return {"id": f"r{number}", "project": {"key": "IJ"}, "number": number, "title": f"Review {number}", "state": "Opened"}
+
+
+class TestSerializeReview:
+    def test_round_trip_keeps_shared_snippets_shared(self, make_discussion):
+        snippet = [{"text": "val x = 1", "type": "ADDED", "old_line": None, "new_line": 0, "deletes": None, "inserts": None}]
+        payload = serialize_review(_review(1), [make_discussion(snippet=snippet), make_discussion(snippet=snippet)], [])
+
+        review, discussions, comments = marshal.loads(payload)
+
+        assert review == _review(1)
+        assert discussions[0] == make_discussion(snippet=snippet)
+        assert discussions[0]["snippet"] is discussions[1]["snippet"]
+
+
+class TestRenderSerialized:
+    def test_matches_direct_rendering(self, make_discussion):
+        discussion = make_discussion(line=0, snippet=[], suggested_edit={"original": "a\nb", "suggested": "a\nc"})
+        payload = serialize_review(_review(1), [discussion], [])
+
+        assert render_serialized(payload, "markdown") == format_markdown(_review(1), [discussion], [])
+        assert render_serialized(payload, "color") == format_color(_review(1), [discussion], [])
+
+    def test_json_is_single_line(self):
+        output = render_serialized(serialize_review(_review(1), [], []), "json")
+
+        assert "\n" not in output
+        assert json.loads(output)["review"]["number"] == 1
+
+
+class TestRenderMany:
+    def test_results_follow_submission_order(self, make_discussion):
+        payloads = [serialize_review(_review(n), [make_discussion(snippet=[])] * n, []) for n in (30, 1, 10, 2)]
+
+        outputs = list(render_many(payloads, "json", workers=2))
+
+        assert [json.loads(o)["review"]["number"] for o in outputs] == [30, 1, 10, 2]
+
+    def test_single_worker_renders_in_process(self):
+        outputs = list(render_many(iter([serialize_review(_review(5), [], [])]), "markdown", workers=1))
+
+        assert outputs == [format_markdown(_review(5), [], [])]
+
+
+class TestShardIndex:
+    def test_is_stable(self):
+        assert shard_index("IJ", "174369", 4) == shard_index("IJ", 174369, 4) == 0
+        assert [shard_index("IJ", n, 4) for n in range(1, 9)] == [2, 0, 3, 2, 2, 1, 2, 0]
+
+    def test_partitions_every_review_once(self):
+        shards = [shard_index("IJ", n, 3) for n in range(300)]
+
+        assert set(shards) == {0, 1, 2}
+        assert min(shards.count(i) for i in range(3)) > 70
+
+
+class TestMergeNdjson:
+    def _lines(self, *numbers, project="IJ"):
+        return [render_serialized(serialize_review({**_review(n), "project": {"key": project}}, [], []), "json") + "\n" for n in numbers]
+
+    def test_merges_sorted_shards(self):
+        merged = list(merge_ndjson([self._lines(2, 10, 11), self._lines(1, 3), [], self._lines(4, project="KT")]))
+
+        assert [(json.loads(line)["review"]["project"], json.loads(line)["review"]["number"]) for line in merged] == [
+            ("IJ", 1), ("IJ", 2), ("IJ", 3), ("IJ", 10), ("IJ", 11), ("KT", 4),
+        ]
+        assert not any(line.endswith("\n") for line in merged)
+
+    def test_skips_blank_lines(self):
+        assert len(list(merge_ndjson([["\n", *self._lines(1)], self._lines(2)]))) == 2
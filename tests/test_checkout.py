@@ -0,0 +1,75 @@
+import subprocess
+
+import pytest
+
+from space_review.checkout import LocalCheckout, _line_range
+
+
+def _git(root, *args):
+    return subprocess.run(["git", "-C", str(root), *args], capture_output=True, text=True, check=True).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "config", "user.email", "test@example.com")
+    _git(tmp_path, "config", "user.name", "Test")
+    source = tmp_path / "src" / "Main.kt"
+    source.parent.mkdir()
+    source.write_text("".join(f"line {i}\n" for i in range(20)))
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "initial")
+    return tmp_path
+
+
+class TestLineRange:
+    def test_returns_requested_lines(self):
+        assert _line_range(b"a\nb\r\nc\nd", 1, 3) == ["b", "c"]
+
+    def test_stops_at_end_of_file(self):
+        assert _line_range(b"a\nb\n", 1, 10) == ["b"]
+
+
+class TestLocalCheckout:
+    def test_rejects_non_git_directory(self, tmp_path):
+        with pytest.raises(ValueError, match="Not a git checkout"):
+            LocalCheckout(tmp_path)
+
+    def test_snippet_from_unchanged_working_tree(self, repo):
+        revision = _git(repo, "rev-parse", "HEAD")
+
+        with LocalCheckout(repo, context=2) as checkout:
+            snippet = checkout.snippet({"filename": "/src/Main.kt", "revision": revision, "line": 5})
+
+        assert [line["text"] for line in snippet] == ["line 3", "line 4", "line 5", "line 6", "line 7"]
+        assert [line["new_line"] for line in snippet] == [3, 4, 5, 6, 7]
+
+    def test_snippet_covers_end_anchor(self, repo):
+        revision = _git(repo, "rev-parse", "HEAD")
+
+        with LocalCheckout(repo, context=0) as checkout:
+            snippet = checkout.snippet(
+                {"filename": "/src/Main.kt", "revision": revision, "line": 2},
+                {"filename": "/src/Main.kt", "line": 4},
+            )
+
+        assert [line["text"] for line in snippet] == ["line 2", "line 3", "line 4"]
+
+    def test_snippet_reads_revision_when_working_tree_changed(self, repo):
+        revision = _git(repo, "rev-parse", "HEAD")
+        (repo / "src" / "Main.kt").write_text("rewritten\n")
+
+        with LocalCheckout(repo, context=0) as checkout:
+            snippet = checkout.snippet({"filename": "/src/Main.kt", "revision": revision, "line": 1})
+
+        assert [line["text"] for line in snippet] == ["line 1"]
+
+    def test_unknown_revision_yields_empty_snippet(self, repo):
+        with LocalCheckout(repo) as checkout:
+            snippet = checkout.snippet({"filename": "/src/Main.kt", "revision": "0" * 40, "line": 1})
+
+        assert snippet == []
+
+    def test_missing_revision_yields_empty_snippet(self, repo):
+        with LocalCheckout(repo) as checkout:
+            assert checkout.snippet({"filename": "/src/Main.kt", "line": 1}) == []
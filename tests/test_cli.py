@@ -1,9 +1,15 @@
+import copy
+import json
+import logging
 import os
+import time
+from datetime import datetime
 import pytest
 from click.testing import CliRunner
 from unittest.mock import patch, MagicMock
 
 from space_review.cli import main
+from space_review.processor import DiscussionFilter
 
 
 @pytest.fixture
@@ -104,11 +110,144 @@ class TestCliUnresolvedFlag:
             assert call_args[1]["unresolved_only"] is False
 
 
+class TestCliDeadline:
+    @pytest.mark.parametrize("value, seconds", [("5s", 5.0), ("500ms", 0.5), ("2m", 120.0), ("1.5", 1.5)])
+    def test_cli_deadline_parsed(self, runner, value, seconds):
+        with patch("space_review.cli.fetch_review") as mock_fetch:
+            mock_fetch.return_value = ("# Review", [])
+            result = runner.invoke(main, ["IJ-CR-123", "--deadline", value], env={"SPACE_TOKEN": "test-token"})
+
+        assert result.exit_code == 0
+        assert mock_fetch.call_args[1]["deadline"] == seconds
+
+    def test_cli_deadline_rejects_garbage(self, runner):
+        result = runner.invoke(main, ["IJ-CR-123", "--deadline", "soon"], env={"SPACE_TOKEN": "test-token"})
+
+        assert result.exit_code == 2
+        assert "is not a duration" in result.output
+
+    def test_cli_color_with_deadline_skips_streaming(self, runner):
+        with patch("space_review.cli.stream_review_color") as mock_stream, patch("space_review.cli.fetch_review") as mock_fetch:
+            mock_fetch.return_value = ("colored", [])
+            result = runner.invoke(main, ["IJ-CR-123", "--color", "--deadline", "5s"], env={"SPACE_TOKEN": "test-token"})
+
+        assert result.exit_code == 0
+        mock_stream.assert_not_called()
+
+
+class TestCliFilters:
+    def test_cli_builds_discussion_filter(self, runner):
+        with patch("space_review.cli.fetch_review") as mock_fetch:
+            mock_fetch.return_value = ("# Review", [])
+            result = runner.invoke(
+                main,
+                ["IJ-CR-123", "--author", "Lev.Leontev", "--file", "*.kt", "--since", "2024-01-15", "--suggestions-only"],
+                env={"SPACE_TOKEN": "test-token"},
+            )
+
+        assert result.exit_code == 0
+        assert mock_fetch.call_args[1]["filters"] == DiscussionFilter(
+            author="Lev.Leontev", file_glob="*.kt", suggestions_only=True, since=datetime(2024, 1, 15)
+        )
+
+    def test_cli_without_filters_passes_none(self, runner):
+        with patch("space_review.cli.fetch_review") as mock_fetch:
+            mock_fetch.return_value = ("# Review", [])
+            runner.invoke(main, ["IJ-CR-123"], env={"SPACE_TOKEN": "test-token"})
+
+        assert mock_fetch.call_args[1]["filters"] is None
+
+    def test_cli_since_rejected_offline(self, runner, tmp_path):
+        result = runner.invoke(
+            main, ["IJ-CR-123", "--offline", "--since", "2024-01-15", "--store", str(tmp_path / "r.db")]
+        )
+
+        assert result.exit_code == 1
+        assert "not available offline" in result.output
+
+
+class TestCliCheck:
+    @pytest.mark.parametrize("counted, exit_code, output", [
+        ((0, True), 0, "IJ-CR-123 OK: 0 unresolved (max 0)"),
+        ((2, False), 1, "IJ-CR-123 FAIL: at least 2 unresolved (max 0)"),
+    ])
+    def test_cli_check_summary(self, runner, counted, exit_code, output):
+        with patch("space_review.cli.count_unresolved", return_value=counted) as mock_count:
+            result = runner.invoke(main, ["check", "IJ-CR-123"], env={"SPACE_TOKEN": "t"})
+
+        assert result.exit_code == exit_code
+        assert result.output.strip() == output
+        assert mock_count.call_args[1]["limit"] == 0
+
+    def test_cli_check_threshold(self, runner):
+        with patch("space_review.cli.count_unresolved", return_value=(3, True)):
+            passed = runner.invoke(main, ["check", "IJ-CR-123", "--max-unresolved", "3"], env={"SPACE_TOKEN": "t"})
+            failed = runner.invoke(main, ["check", "IJ-CR-123", "--max-unresolved", "2"], env={"SPACE_TOKEN": "t"})
+
+        assert passed.exit_code == 0
+        assert failed.exit_code == 1
+        assert "FAIL: 3 unresolved (max 2)" in failed.output
+
+    def test_cli_check_errors_exit_2(self, runner):
+        with patch("space_review.cli.count_unresolved", side_effect=Exception("boom")):
+            result = runner.invoke(main, ["check", "IJ-CR-123"], env={"SPACE_TOKEN": "t"})
+
+        assert result.exit_code == 2
+        assert "Error checking review: boom" in result.output
+
+
+class TestCliRefresh:
+    def test_cli_refresh_prints_changes(self, runner, tmp_path):
+        changes = [{"kind": "discussion", "id": "d1", "anchor": "/a.kt:1", "change": "resolved"}]
+        with patch("space_review.cli.refresh_resolutions", return_value=changes) as mock_refresh:
+            result = runner.invoke(
+                main, ["refresh", "IJ-CR-123", "--store", str(tmp_path / "r.db"), "--exit-code"], env={"SPACE_TOKEN": "t"}
+            )
+
+        assert result.exit_code == 1
+        assert "~ discussion /a.kt:1  resolved  (d1)" in result.output
+        assert mock_refresh.call_args[0][1] == "IJ-CR-123"
+
+    def test_cli_refresh_unknown_review(self, runner, tmp_path):
+        result = runner.invoke(main, ["refresh", "IJ-CR-123", "--store", str(tmp_path / "r.db")], env={"SPACE_TOKEN": "t"})
+
+        assert result.exit_code == 2
+        assert "not in the local store" in result.output
+
+
+class TestCliConcurrency:
+    def test_cli_concurrency_sets_limiter_maximum(self, runner):
+        with patch("space_review.cli.ReviewSession") as mock_session:
+            mock_session.return_value.__enter__.return_value.get_review.side_effect = ValueError("stop")
+            runner.invoke(main, ["IJ-CR-123", "--concurrency", "64"], env={"SPACE_TOKEN": "test-token"})
+
+        assert mock_session.call_args[1]["max_concurrency"] == 64
+
+
+class TestCliTrace:
+    def test_cli_trace_logs_to_stderr(self, runner):
+        def fake_fetch(**kwargs):
+            logging.getLogger("space_review.api").debug("GET /fake 200 5ms window=4 in_flight=0")
+            return "# Review", []
+
+        root_handlers = logging.getLogger().handlers[:]
+        try:
+            with patch("space_review.cli.fetch_review", side_effect=fake_fetch):
+                result = runner.invoke(main, ["IJ-CR-123", "--trace"], env={"SPACE_TOKEN": "test-token"})
+        finally:
+            logging.getLogger().handlers[:] = root_handlers
+            logging.getLogger("space_review").setLevel(logging.NOTSET)
+
+        assert result.exit_code == 0
+        assert "[trace] GET /fake 200 5ms window=4" in result.stderr
+        assert "[trace]" not in result.stdout
+
+
 class TestCliFileOutput:
     def test_cli_output_to_file(self, runner, tmp_path):
         output_file = tmp_path / "review.md"
-        with patch("space_review.cli.fetch_review") as mock_fetch:
-            mock_fetch.return_value = ("# Test Review Content", [])
+        with patch("space_review.cli.fetch_review_chunks") as mock_fetch:
+            mock_fetch.return_value = (iter(["# Test Review", " Content"]), [])
             result = runner.invoke(
                 main,
                 ["IJ-CR-123", "-o", str(output_file)],
@@ -119,6 +258,21 @@ class TestCliFileOutput:
             assert output_file.read_text() == "# Test Review Content"
             assert "Exported to" in result.output
 
+    def test_cli_output_unchanged_file_is_not_rewritten(self, runner, tmp_path):
+        output_file = tmp_path / "review.md"
+        output_file.write_text("# Same")
+        before = output_file.stat().st_mtime_ns
+        with patch("space_review.cli.fetch_review_chunks") as mock_fetch:
+            mock_fetch.return_value = (iter(["# Same"]), [])
+            result = runner.invoke(
+                main,
+                ["IJ-CR-123", "-o", str(output_file)],
+                env={"SPACE_TOKEN": "test-token"},
+            )
+            assert result.exit_code == 0
+            assert "Unchanged" in result.output
+            assert output_file.stat().st_mtime_ns == before
+
 
 class TestCliErrorHandling:
     def test_cli_invalid_review_id_error(self, runner):
@@ -138,3 +292,298 @@ class TestCliErrorHandling:
             )
             assert result.exit_code != 0
             assert "Error" in result.output
+
+
+class TestCliStore:
+    def test_cli_store_flag_passed(self, runner, tmp_path):
+        with patch("space_review.cli.fetch_review") as mock_fetch:
+            mock_fetch.return_value = ("# Review", [])
+            runner.invoke(
+                main,
+                ["IJ-CR-123", "--store", str(tmp_path / "reviews.db")],
+                env={"SPACE_TOKEN": "test-token"},
+            )
+            assert mock_fetch.call_args[1]["store_path"] == str(tmp_path / "reviews.db")
+
+    def test_cli_store_env_var_does_not_persist_show(self, runner, tmp_path):
+        with patch("space_review.cli.fetch_review") as mock_fetch:
+            mock_fetch.return_value = ("# Review", [])
+            runner.invoke(
+                main,
+                ["IJ-CR-123", "--since", "2024-01-15"],
+                env={"SPACE_TOKEN": "test-token", "SPACE_REVIEW_STORE": str(tmp_path / "reviews.db")},
+            )
+            assert mock_fetch.call_args[1]["store_path"] is None
+
+    def test_cli_query_reads_store(self, runner, tmp_path, sample_review_data, sample_feed_message):
+        from space_review.processor import extract_code_discussions
+        from space_review.store import ReviewStore
+
+        db = tmp_path / "reviews.db"
+        discussions = extract_code_discussions([sample_feed_message])
+        discussions[0]["text"] = "Use `exported`"
+        with ReviewStore(db) as store:
+            store.save_review(sample_review_data, discussions)
+
+        result = runner.invoke(main, ["query", "--file", "plugins/bazel", "--unresolved", "--store", str(db)])
+
+        assert result.exit_code == 0
+        assert "IJ-CR-174369  /plugins/bazel/ModuleEntityUpdater.kt:44  [open] Andrew.Kozlov: Use `exported`" in result.output
+
+
+class TestCliOffline:
+    def test_cli_offline_does_not_require_token(self, runner):
+        with patch.dict(os.environ, {}, clear=True):
+            with patch("space_review.cli.fetch_review") as mock_fetch:
+                mock_fetch.return_value = ("# Review", [])
+                result = runner.invoke(main, ["IJ-CR-123", "--offline"], env={})
+                assert result.exit_code == 0
+                assert mock_fetch.call_args[1]["offline"] is True
+
+    def test_fetch_review_offline_renders_from_store(self, tmp_path, sample_review_data, sample_feed_message):
+        from space_review.cli import fetch_review
+        from space_review.processor import extract_code_discussions
+        from space_review.store import ReviewStore
+
+        db = tmp_path / "reviews.db"
+        discussions = extract_code_discussions([sample_feed_message])
+        discussions[0]["text"] = "Use `exported`"
+        with ReviewStore(db) as store:
+            store.save_review(sample_review_data, discussions)
+
+        with patch("space_review.cli.SpaceClient") as mock_client:
+            output, rendered = fetch_review("IJ-CR-174369", token=None, store_path=str(db), offline=True)
+            mock_client.assert_not_called()
+
+        assert "**Offline:** cached" in output
+        assert "`/plugins/bazel/ModuleEntityUpdater.kt:44`" in output
+        assert [d["id"] for d in rendered] == ["disc-1"]
+
+    def test_fetch_review_offline_missing_review(self, tmp_path):
+        from space_review.cli import fetch_review
+
+        with pytest.raises(ValueError, match="not in the local store"):
+            fetch_review("IJ-CR-1", token=None, store_path=str(tmp_path / "reviews.db"), offline=True)
+
+    def test_fetch_review_offline_renders_from_snapshot(self, tmp_path, sample_review_data, sample_feed_message):
+        from space_review.cli import fetch_review
+        from space_review.processor import extract_code_discussions
+        from space_review.snapshot import write_snapshot
+
+        snap = tmp_path / "review.snap"
+        discussions = extract_code_discussions([sample_feed_message])
+        discussions[0]["text"] = "Use `exported`"
+        write_snapshot(snap, sample_review_data, discussions)
+
+        output, rendered = fetch_review("IJ-CR-174369", token=None, offline=True, snapshot_path=str(snap), output_json=True)
+
+        data = json.loads(output)
+        assert data["discussions"][0]["text"] == "Use `exported`"
+        assert "cache" in data
+        assert rendered == discussions
+
+    def test_cli_offline_rejects_snapshot_of_other_review(self, runner, tmp_path, sample_review_data):
+        from space_review.snapshot import write_snapshot
+
+        snap = tmp_path / "review.snap"
+        write_snapshot(snap, sample_review_data, [])
+
+        result = runner.invoke(main, ["IJ-CR-1", "--offline", "--snapshot", str(snap)])
+
+        assert result.exit_code == 1
+        assert "holds IJ-CR-174369, not IJ-CR-1" in result.output
+
+
+class TestCliDiff:
+    def test_cli_diff_exit_code(self, runner, tmp_path, sample_review_data):
+        from space_review.formatter import format_json
+
+        old = tmp_path / "old.json"
+        new = tmp_path / "new.json"
+        discussion = {"id": "d1", "filename": "/a.kt", "line": 0, "resolved": False, "text": "Fix", "thread": []}
+        old.write_text(format_json(sample_review_data, [discussion]))
+        new.write_text(format_json(sample_review_data, [{**discussion, "resolved": True}]))
+
+        unchanged = runner.invoke(main, ["diff", str(old), str(old), "--exit-code"])
+        changed = runner.invoke(main, ["diff", str(old), str(new), "--exit-code"])
+
+        assert unchanged.exit_code == 0
+        assert "No changes" in unchanged.output
+        assert changed.exit_code == 1
+        assert "~ discussion /a.kt:1  resolved  (d1)" in changed.output
+
+
+class TestCliBatch:
+    def test_cli_batch_outputs_ndjson_in_order(self, runner, tmp_path):
+        ids_file = tmp_path / "ids.txt"
+        ids_file.write_text("IJ-CR-2\n\nIJ-CR-3\n")
+
+        def fake_fetch(client, parsed, unresolved_only, **kwargs):
+            review = {"id": parsed.number, "project": {"key": parsed.project}, "number": int(parsed.number), "title": "t", "state": "Opened"}
+            return review, [], []
+
+        with patch("space_review.cli.fetch_review_data", side_effect=fake_fetch):
+            result = runner.invoke(
+                main,
+                ["batch", "IJ-CR-1", "--from", str(ids_file), "--json", "-j", "1"],
+                env={"SPACE_TOKEN": "test-token"},
+            )
+
+        assert result.exit_code == 0
+        lines = result.output.strip().split("\n")
+        assert [json.loads(line)["review"]["number"] for line in lines] == [1, 2, 3]
+
+    def test_cli_batch_shard_fetches_its_reviews_sorted(self, runner):
+        def fake_fetch(client, parsed, unresolved_only, **kwargs):
+            review = {"id": parsed.number, "project": {"key": parsed.project}, "number": int(parsed.number), "title": "t", "state": "Opened"}
+            return review, [], []
+
+        ids = ["IJ-CR-8", "IJ-CR-1", "IJ-CR-5", "IJ-CR-4", "not-a-review"]
+        outputs, exit_codes = [], []
+        for shard in ("1/4", "2/4", "3/4", "4/4"):
+            with patch("space_review.cli.fetch_review_data", side_effect=fake_fetch):
+                result = runner.invoke(
+                    main, ["batch", *ids, "--json", "-j", "1", "--shard", shard], env={"SPACE_TOKEN": "test-token"}
+                )
+            outputs.append([json.loads(line)["review"]["number"] for line in result.output.splitlines() if line.startswith("{")])
+            exit_codes.append(result.exit_code)
+
+        assert outputs == [[8], [], [1, 4, 5], []]
+        # The unparseable ID is reported by the first shard only.
+        assert exit_codes == [1, 0, 0, 0]
+
+    def test_cli_batch_rejects_bad_shard(self, runner):
+        result = runner.invoke(main, ["batch", "IJ-CR-1", "--shard", "5/4"], env={"SPACE_TOKEN": "test-token"})
+
+        assert result.exit_code == 2
+        assert "is not a shard like 1/4" in result.output
+
+    def test_cli_merge_orders_shard_outputs(self, runner, tmp_path):
+        def line(number):
+            return json.dumps({"review": {"project": "IJ", "number": number}})
+
+        (tmp_path / "a.ndjson").write_text(f"{line(1)}\n{line(7)}\n")
+        (tmp_path / "b.ndjson").write_text(f"{line(3)}\n")
+
+        result = runner.invoke(main, ["merge", str(tmp_path / "a.ndjson"), str(tmp_path / "b.ndjson")])
+
+        assert result.exit_code == 0
+        assert [json.loads(l)["review"]["number"] for l in result.output.splitlines()] == [1, 3, 7]
+
+    def test_cli_merge_rejects_non_json(self, runner, tmp_path):
+        (tmp_path / "a.md").write_text("# Review\n")
+
+        result = runner.invoke(main, ["merge", str(tmp_path / "a.md"), str(tmp_path / "a.md")])
+
+        assert result.exit_code == 1
+        assert "not a sorted batch --json output" in result.output
+
+    def test_cli_batch_reports_failures(self, runner):
+        with patch("space_review.cli.fetch_review_data", side_effect=Exception("boom")):
+            result = runner.invoke(main, ["batch", "IJ-CR-1", "-j", "1"], env={"SPACE_TOKEN": "test-token"})
+
+        assert result.exit_code == 1
+        assert "Error fetching IJ-CR-1: boom" in result.output
+
+
+class TestCliColorStreaming:
+    def test_cli_color_streams_without_pager_when_not_a_tty(self, runner):
+        with patch("space_review.cli.stream_review_color") as mock_stream, patch("space_review.cli.fetch_review") as mock_fetch:
+            mock_stream.return_value = (line for line in ["line 1", "line 2"])
+            result = runner.invoke(main, ["IJ-CR-123", "--color"], env={"SPACE_TOKEN": "test-token"})
+
+        assert result.exit_code == 0
+        assert result.output == "line 1\nline 2\n"
+        mock_fetch.assert_not_called()
+
+    def test_stream_review_color_matches_format_color(self, sample_review_data, sample_feed_message, sample_thread_message):
+        from space_review.cli import stream_review_color
+        from space_review.formatter import format_color
+        from space_review.processor import build_discussion_with_thread, extract_code_discussions
+
+        with patch("space_review.cli.SpaceClient") as mock_client:
+            client = mock_client.return_value
+            client.get_review_by_number.return_value = sample_review_data
+            client.get_feed_messages.return_value = [sample_feed_message]
+            client.get_unbound_discussions.return_value = []
+            client.get_discussion_thread.return_value = [sample_thread_message]
+
+            streamed = "\n".join(stream_review_color("IJ-CR-174369", "token"))
+
+        [discussion] = extract_code_discussions([sample_feed_message])
+        discussion = build_discussion_with_thread(discussion, [sample_thread_message])
+        assert streamed == format_color(sample_review_data, [discussion], [])
+
+    def test_resolved_threads_are_fetched_only_when_reached(self, sample_review_data, sample_feed_message, sample_thread_message):
+        from space_review.cli import stream_review_color
+
+        feed = []
+        for i in range(300):
+            message = copy.deepcopy(sample_feed_message)
+            discussion = message["details"]["codeDiscussion"]
+            discussion.update(id=f"disc-{i}", resolved=i % 10 != 0, channel={"id": f"channel-{i}"})
+            feed.append(message)
+
+        with patch("space_review.cli.SpaceClient") as mock_client:
+            client = mock_client.return_value
+            client.get_review_by_number.return_value = sample_review_data
+            client.get_feed_messages.return_value = feed
+            client.get_unbound_discussions.return_value = []
+            client.get_discussion_thread.return_value = [sample_thread_message]
+
+            stream = stream_review_color("IJ-CR-174369", "token")
+            for _ in range(12):
+                next(stream)
+            time.sleep(0.5)
+            stream.close()
+
+        requested = {int(call.args[0].removeprefix("channel-")) for call in client.get_discussion_thread.call_args_list}
+        assert set(range(0, 300, 10)) <= requested
+        assert max(i for i in requested if i % 10) < 12
+
+    def test_broken_pipe_stops_thread_fetches(self, sample_review_data, sample_feed_message, sample_thread_message):
+        from space_review.cli import _write_stream, stream_review_color
+
+        class ClosedStream:
+            def __init__(self):
+                self.writes = 0
+
+            def write(self, text):
+                self.writes += 1
+                if self.writes > 20:
+                    raise BrokenPipeError
+
+            def flush(self):
+                pass
+
+            def fileno(self):
+                return 1
+
+        feed = []
+        for i in range(100):
+            message = copy.deepcopy(sample_feed_message)
+            message["details"]["codeDiscussion"].update(id=f"disc-{i}", resolved=True, channel={"id": f"channel-{i}"})
+            feed.append(message)
+
+        stream = ClosedStream()
+        with patch("space_review.cli.SpaceClient") as mock_client, patch("space_review.cli.sys.stdout", stream), \
+                patch("space_review.cli.os.dup2"), patch("space_review.cli.os.open"):
+            client = mock_client.return_value
+            client.get_review_by_number.return_value = sample_review_data
+            client.get_feed_messages.return_value = feed
+            client.get_unbound_discussions.return_value = []
+            client.get_discussion_thread.return_value = [sample_thread_message]
+
+            _write_stream(stream_review_color("IJ-CR-174369", "token"), use_pager=False)
+
+        assert stream.writes == 21
+        assert 0 < client.get_discussion_thread.call_count <= 20
+
+
+class TestCliScan:
+    def test_cli_scan_reads_stdin(self, runner):
+        log = "Fix IJ-CR-1\nFollow-up for https://jetbrains.team/p/kt/reviews/2/timeline\nIJ-CR-1 again\n"
+        result = runner.invoke(main, ["scan"], input=log)
+
+        assert result.exit_code == 0
+        assert result.output == "IJ-CR-1\nKT-CR-2\n"
@@ -0,0 +1,90 @@
+from contextlib import ExitStack
+
+import pytest
+
+from space_review.compare import content_hash, diff_reviews, item_hash, load_review_file
+from space_review.formatter import format_changes, format_json
+from space_review.snapshot import write_snapshot
+
+
+class TestContentHash:
+    def test_is_stable_across_key_order(self):
+        assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+
+    def test_item_hash_ignores_snippet_and_position(self, make_discussion):
+        moved = {**make_discussion("d1"), "feed_index": 5, "snippet": [{"text": "x"}]}
+        assert item_hash(moved) == item_hash(make_discussion("d1"))
+
+
+class TestDiffReviews:
+    def test_unchanged_review_has_no_changes(self, make_discussion):
+        assert diff_reviews([make_discussion("d1")], [make_discussion("d1")]) == []
+
+    def test_added_and_removed(self, make_discussion):
+        changes = diff_reviews([make_discussion("d1")], [make_discussion("d2")])
+        assert [(c["change"], c["id"]) for c in changes] == [("added", "d2"), ("removed", "d1")]
+
+    def test_resolution_flips(self, make_discussion):
+        resolved = diff_reviews([make_discussion("d1")], [make_discussion("d1", resolved=True)])
+        reopened = diff_reviews([make_discussion("d1", resolved=True)], [make_discussion("d1")])
+        assert [c["change"] for c in resolved] == ["resolved"]
+        assert [c["change"] for c in reopened] == ["reopened"]
+
+    def test_edited_text(self, make_discussion):
+        changes = diff_reviews([make_discussion("d1")], [make_discussion("d1", text="Please rename it")])
+        assert [c["change"] for c in changes] == ["edited"]
+        assert changes[0]["anchor"] == "/src/Main.kt:10"
+
+    def test_new_replies(self, make_discussion):
+        reply = {"author": "Lev.Leontev", "text": "Done"}
+        changes = diff_reviews([make_discussion("d1", thread=[reply])], [make_discussion("d1", thread=[reply, reply, reply])])
+        assert changes == [{"kind": "discussion", "id": "d1", "anchor": "/src/Main.kt:10", "change": "new_replies", "count": 2}]
+
+    def test_edited_reply(self, make_discussion):
+        old = make_discussion("d1", thread=[{"author": "Lev.Leontev", "text": "Done"}])
+        new = make_discussion("d1", thread=[{"author": "Lev.Leontev", "text": "Done, thanks"}])
+        assert [c["change"] for c in diff_reviews([old], [new])] == ["replies_edited"]
+
+    def test_general_comments(self):
+        old = [{"id": "c1", "author": "Lev.Leontev", "text": "LGTM", "resolved": False}]
+        new = [{"id": "c1", "author": "Lev.Leontev", "text": "LGTM", "resolved": True}]
+        changes = diff_reviews([], [], old, new)
+        assert changes == [{"kind": "comment", "id": "c1", "anchor": "Lev.Leontev", "change": "resolved"}]
+
+
+class TestLoadReviewFile:
+    def test_loads_snapshot_and_json_export(self, tmp_path, sample_review_data, make_discussion):
+        snap = tmp_path / "old.snap"
+        export = tmp_path / "new.json"
+        write_snapshot(snap, sample_review_data, [make_discussion("d1")])
+        export.write_text(format_json(sample_review_data, [make_discussion("d1", resolved=True)]))
+
+        with ExitStack() as stack:
+            _, old, _ = load_review_file(snap, stack)
+            _, new, _ = load_review_file(export, stack)
+            changes = diff_reviews(old, new)
+
+        assert [c["change"] for c in changes] == ["resolved"]
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "review.md"
+        path.write_text("# Review")
+        with ExitStack() as stack, pytest.raises(ValueError, match="neither a snapshot"):
+            load_review_file(path, stack)
+
+
+class TestFormatChanges:
+    def test_no_changes(self):
+        assert format_changes([]) == "No changes"
+
+    def test_lines(self):
+        changes = [
+            {"kind": "discussion", "id": "d1", "anchor": "/src/Main.kt:10", "change": "added"},
+            {"kind": "discussion", "id": "d2", "anchor": "/src/Main.kt:12", "change": "new_replies", "count": 2},
+            {"kind": "comment", "id": "c1", "anchor": "Lev.Leontev", "change": "resolved"},
+        ]
+        assert format_changes(changes).split("\n") == [
+            "+ discussion /src/Main.kt:10  added  (d1)",
+            "+ discussion /src/Main.kt:12  2 new replies  (d2)",
+            "~ comment Lev.Leontev  resolved  (c1)",
+        ]
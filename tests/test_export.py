@@ -0,0 +1,87 @@
+import gzip
+import os
+
+import pytest
+from unittest.mock import patch
+
+from space_review.export import join_lines, write_export
+
+
+class TestJoinLines:
+    def test_matches_str_join(self):
+        lines = ["a", "", "b", "c"]
+        assert "".join(join_lines(lines)) == "\n".join(lines)
+
+    def test_empty(self):
+        assert list(join_lines([])) == []
+
+
+class TestWriteExport:
+    def test_writes_streamed_chunks(self, tmp_path):
+        path = tmp_path / "review.md"
+
+        assert write_export(path, iter(["# Title", "\n", "body"])) is True
+        assert path.read_text() == "# Title\nbody"
+
+    def test_skips_write_when_content_matches(self, tmp_path):
+        path = tmp_path / "review.md"
+        write_export(path, ["same"])
+        os.utime(path, ns=(0, 0))
+
+        assert write_export(path, ["sa", "me"]) is False
+        assert path.stat().st_mtime_ns == 0
+
+    def test_unchanged_export_creates_no_temp_file(self, tmp_path):
+        path = tmp_path / "review.md"
+        write_export(path, ["same content"])
+
+        with patch("space_review.export.tempfile.mkstemp") as mkstemp:
+            assert write_export(path, ["same ", "content"]) is False
+
+        mkstemp.assert_not_called()
+
+    @pytest.mark.parametrize("old, new", [
+        ("# Title\nold body", ["# Title\n", "new body"]),
+        ("# Title\nbody", ["# Title\n", "body", " and more"]),
+        ("# Title\nbody and more", ["# Title\n", "body"]),
+    ])
+    def test_keeps_matching_prefix_when_content_diverges(self, tmp_path, old, new):
+        for name in ("review.md", "review.md.gz"):
+            path = tmp_path / name
+            write_export(path, [old])
+
+            assert write_export(path, iter(new)) is True
+            content = gzip.decompress(path.read_bytes()) if name.endswith(".gz") else path.read_bytes()
+            assert content.decode("utf-8") == "".join(new)
+
+        assert sorted(os.listdir(tmp_path)) == ["review.md", "review.md.gz"]
+
+    def test_replaces_changed_content(self, tmp_path):
+        path = tmp_path / "review.md"
+        path.write_text("old")
+        path.chmod(0o600)
+
+        assert write_export(path, ["new"]) is True
+        assert path.read_text() == "new"
+        assert path.stat().st_mode & 0o777 == 0o600
+
+    def test_compresses_gz_paths(self, tmp_path):
+        path = tmp_path / "review.md.gz"
+
+        assert write_export(path, ["# Title ", "✅"]) is True
+        assert gzip.decompress(path.read_bytes()).decode("utf-8") == "# Title ✅"
+        assert write_export(path, ["# Title ✅"]) is False
+
+    def test_failure_keeps_existing_file_and_removes_temp(self, tmp_path):
+        path = tmp_path / "review.md"
+        path.write_text("complete")
+
+        def chunks():
+            yield "partial"
+            raise RuntimeError("crash")
+
+        with pytest.raises(RuntimeError):
+            write_export(path, chunks())
+
+        assert path.read_text() == "complete"
+        assert os.listdir(tmp_path) == ["review.md"]
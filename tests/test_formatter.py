@@ -1,9 +1,16 @@
+import difflib
 import json
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+
 import pytest
 from space_review.formatter import (
     format_markdown,
     format_json,
     format_suggested_edit_diff,
+    format_search_results,
+    format_color,
+    iter_color,
 )
 
 
@@ -71,6 +78,34 @@ class TestFormatMarkdownReviewHeader:
         assert "**Review:** `IJ-CR-174369` | **State:** 🟢 Opened" in result
 
 
+class TestFormatCachedNotice:
+    def test_markdown_marks_offline_age(self, sample_review):
+        cached_at = (datetime.now(timezone.utc) - timedelta(hours=3, minutes=5)).isoformat()
+
+        result = format_markdown(sample_review, [], cached_at=cached_at)
+
+        assert f"> ⚠️ **Offline:** cached 3h 5m ago ({cached_at})" in result
+
+    def test_color_marks_offline_age(self, sample_review):
+        cached_at = (datetime.now(timezone.utc) - timedelta(days=3, hours=2)).isoformat()
+
+        result = format_color(sample_review, [], cached_at=cached_at)
+
+        assert "Offline: cached 3d 2h ago" in result
+
+    def test_json_includes_cache_metadata(self, sample_review):
+        cached_at = (datetime.now(timezone.utc) - timedelta(seconds=90)).isoformat()
+
+        result = json.loads(format_json(sample_review, [], cached_at=cached_at))
+
+        assert result["cache"]["fetched_at"] == cached_at
+        assert 90 <= result["cache"]["age_seconds"] < 100
+
+    def test_no_notice_when_fetched_live(self, sample_review):
+        assert "Offline" not in format_markdown(sample_review, [])
+        assert "cache" not in json.loads(format_json(sample_review, []))
+
+
 class TestFormatMarkdownCodeDiscussion:
     def test_format_markdown_code_discussion(self, sample_review, sample_discussion):
         result = format_markdown(sample_review, [sample_discussion])
@@ -201,6 +236,50 @@ class TestFormatSuggestedEditDiff:
         assert "-val x = 1" in result
         assert "+val x = 2" in result
 
+    def test_format_suggested_edit_diff_is_memoized(self):
+        original = "val memo = 1\nval y = 2"
+        suggested = "val memo = 3\nval y = 2"
+
+        with patch("space_review.formatter.difflib.unified_diff", wraps=difflib.unified_diff) as unified_diff:
+            first = format_suggested_edit_diff(original, suggested)
+            second = format_suggested_edit_diff(original, suggested)
+
+        assert first == second
+        assert unified_diff.call_count == 1
+
+    def test_format_suggested_edit_diff_pure_addition_skips_difflib(self):
+        original = "a\nb\nc\nd\ne\nf\ng\nh"
+        suggested = "a\nb\nc\nd\nX\nY\ne\nf\ng\nh"
+
+        with patch("space_review.formatter.difflib.unified_diff") as unified_diff:
+            result = format_suggested_edit_diff(original, suggested)
+
+        unified_diff.assert_not_called()
+        assert result == "@@ -2,6 +2,8 @@ b\n c\n d\n+X\n+Y\n e\n f\n g"
+
+    def test_format_suggested_edit_diff_pure_deletion(self):
+        result = format_suggested_edit_diff("keep\ndrop me\n", "keep\n")
+
+        assert result == "@@ -1,2 +1 @@ keep\n-drop me"
+
+    def test_format_suggested_edit_diff_from_empty(self):
+        assert format_suggested_edit_diff("", "a\nb") == "@@ -0,0 +1,2 @@+a\n+b"
+
+    def test_format_suggested_edit_diff_identical(self):
+        assert format_suggested_edit_diff("same", "same") == ""
+
+    def test_format_suggested_edit_diff_large_edit_is_simplified(self):
+        original = "\n".join(f"old {i}" for i in range(1500))
+        suggested = "\n".join(f"new {i}" for i in range(1500))
+
+        with patch("space_review.formatter.difflib.unified_diff") as unified_diff:
+            result = format_suggested_edit_diff(original, suggested)
+
+        unified_diff.assert_not_called()
+        lines = result.split("\n")
+        assert lines[0].startswith("@@ -1,1500 +1,1500 @@-old 0")
+        assert lines[-1] == "\\ Simplified line-level diff: 1500 removed and 1500 added lines exceed the 2000-line limit"
+
 
 class TestFormatMarkdownGeneralComments:
     def test_format_general_comments_section(self, sample_review):
@@ -318,3 +397,54 @@ class TestFormatInlineDiff:
         assert "*" in result
         assert "[-oldValue-]" in result
         assert "[+newValue+]" in result
+
+
+class TestFormatSearchResults:
+    def test_renders_discussion_anchor_and_comment(self):
+        hits = [
+            {
+                "type": "discussion",
+                "id": "d1",
+                "matched": ["discussion"],
+                "item": {
+                    "project": "IJ",
+                    "number": 174369,
+                    "filename": "/src/Main.kt",
+                    "line": 9,
+                    "resolved": False,
+                    "snippet": [],
+                    "author": "Andrew.Kozlov",
+                    "text": "Use exported",
+                    "thread": [],
+                },
+            },
+            {
+                "type": "comment",
+                "id": "c1",
+                "matched": ["comment"],
+                "item": {"project": "IJ", "number": 1, "author": "Lev.Leontev", "text": "exported?", "resolved": None},
+            },
+        ]
+
+        result = format_search_results("exported", hits)
+
+        assert "## Search: `exported` (2 hits)" in result
+        assert "**Review:** `IJ-CR-174369` | **Matched:** discussion" in result
+        assert "### 💬 `/src/Main.kt:10`" in result
+        assert "### 💭 **Lev.Leontev**" in result
+        assert "> exported?" in result
+
+
+class TestIterColor:
+    def test_joined_lines_equal_format_color(self, sample_review, sample_discussion):
+        assert "\n".join(iter_color(sample_review, [sample_discussion])) == format_color(sample_review, [sample_discussion])
+
+    def test_threads_load_lazily(self, sample_review, sample_discussion):
+        loaded = []
+        lines = iter_color(sample_review, [sample_discussion, {**sample_discussion, "id": "disc-2"}], load_thread=lambda d: loaded.append(d["id"]))
+
+        for line in lines:
+            if "Andrew.Kozlov" in line:
+                break
+
+        assert loaded == ["disc-1"]
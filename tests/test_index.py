@@ -0,0 +1,22 @@
+from space_review.index import ReviewIndex
+
+
+class TestReviewIndex:
+    def test_roundtrip(self, tmp_path):
+        with ReviewIndex(tmp_path / "index.db") as index:
+            index.put("IJ", 174369, "2wBoBc4URsmM", "feed-channel-123")
+
+        with ReviewIndex(tmp_path / "index.db") as index:
+            assert index.get("IJ", "174369") == ("2wBoBc4URsmM", "feed-channel-123")
+            assert index.get("IJ", "1") is None
+
+    def test_put_replaces_entry(self, tmp_path):
+        with ReviewIndex(tmp_path / "index.db") as index:
+            index.put("IJ", "1", "old", "old-feed")
+            index.put("IJ", "1", "new", "new-feed")
+
+            assert index.get("IJ", "1") == ("new", "new-feed")
+
+    def test_creates_parent_directory(self, tmp_path):
+        with ReviewIndex(tmp_path / "nested" / "index.db") as index:
+            assert index.get("IJ", "1") is None
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from space_review.limiter import AdaptiveLimiter, percentile
+
+
+class TestPercentile:
+    def test_nearest_rank(self):
+        values = list(range(1, 11))
+        assert percentile(values, 0.9) == 9
+        assert percentile(values, 0.5) == 5
+        assert percentile(values, 1.0) == 10
+
+    def test_empty(self):
+        assert percentile([], 0.9) is None
+
+
+class TestAdaptiveLimiter:
+    def _complete(self, limiter, latency, count=1, overloaded=False):
+        for _ in range(count):
+            assert limiter.acquire(timeout=1)
+            limiter.release(latency, overloaded)
+
+    def test_grows_additively_while_latency_is_flat(self):
+        limiter = AdaptiveLimiter(initial=2, maximum=8, sample_size=5)
+
+        self._complete(limiter, 0.1, count=2)
+        assert limiter.window == 2
+        self._complete(limiter, 0.1)
+        assert limiter.window == 3
+
+        self._complete(limiter, 0.1, count=100)
+        assert limiter.window == 8
+
+    def test_halves_on_throttling(self):
+        limiter = AdaptiveLimiter(initial=8, maximum=8)
+
+        self._complete(limiter, None, overloaded=True)
+        assert limiter.window == 4
+        self._complete(limiter, None, overloaded=True, count=5)
+        assert limiter.window == 1
+
+    def test_backs_off_on_latency_spike(self):
+        limiter = AdaptiveLimiter(initial=4, maximum=4, sample_size=5, tolerance=2.0)
+        self._complete(limiter, 0.1, count=5)
+        assert limiter.window == 4
+
+        self._complete(limiter, 1.0)
+
+        assert limiter.window == 2
+
+    def test_acquire_blocks_at_window(self):
+        limiter = AdaptiveLimiter(initial=1, maximum=1)
+        assert limiter.acquire()
+
+        assert limiter.acquire(timeout=0.05) is False
+
+        released = threading.Timer(0.05, limiter.release, args=(0.01,))
+        released.start()
+        assert limiter.acquire(timeout=5)
+        released.join()
+
+    @pytest.mark.parametrize("initial, window", [(0, 1), (100, 16)])
+    def test_initial_window_is_clamped(self, initial, window):
+        assert AdaptiveLimiter(initial=initial, maximum=16).window == window
@@ -1,6 +1,6 @@
 import pytest
 
-from space_review.parser import ParsedReviewId, parse_review_id
+from space_review.parser import ParsedReviewId, parse_review_id, scan_review_ids
 
 
 def test_parse_review_id_cr_format():
@@ -26,3 +26,41 @@ def test_parse_url_files():
 def test_parse_invalid_format():
     with pytest.raises(ValueError):
         parse_review_id("invalid-format")
+
+
+def test_parse_url_custom_host():
+    result = parse_review_id("https://acme.jetbrains.space/p/ij/reviews/42/timeline", hosts=["acme.jetbrains.space"])
+    assert result == ParsedReviewId(project="IJ", number="42")
+
+
+def test_parse_url_unknown_host_rejected():
+    with pytest.raises(ValueError):
+        parse_review_id("https://acme.jetbrains.space/p/ij/reviews/42/timeline")
+
+
+def test_scan_finds_ids_and_urls_in_order():
+    text = [
+        "BAZEL-2284: fix red code (IJ-CR-174369)\n",
+        "See https://jetbrains.team/p/kt/reviews/12/files and IJ-MR-188658.\n",
+    ]
+    assert list(scan_review_ids(text)) == [
+        ParsedReviewId(project="IJ", number="174369"),
+        ParsedReviewId(project="KT", number="12"),
+        ParsedReviewId(project="IJ", number="188658"),
+    ]
+
+
+def test_scan_deduplicates_across_lines_and_forms():
+    text = ["IJ-CR-1 IJ-MR-1\n", "https://jetbrains.team/p/ij/reviews/1/timeline\n"]
+    assert list(scan_review_ids(text)) == [ParsedReviewId(project="IJ", number="1")]
+
+
+def test_scan_ignores_partial_matches():
+    assert list(scan_review_ids(["XIJ-CR-1a", "foo-IJ-CR-2", "IJ-CR-", "ij-cr-3"])) == []
+
+
+def test_scan_custom_hosts():
+    text = ["https://acme.jetbrains.space/p/web/reviews/7 and https://other.example/p/web/reviews/8"]
+    assert list(scan_review_ids(text, hosts=["https://acme.jetbrains.space/"])) == [
+        ParsedReviewId(project="WEB", number="7"),
+    ]
@@ -1,9 +1,14 @@
+import copy
 import pytest
 from space_review.processor import (
     extract_code_discussions,
     extract_general_comments,
     filter_discussions,
+    filter_general_comments,
     build_discussion_with_thread,
+    DiscussionFilter,
+    SnippetPool,
+    thread_priority,
 )
 
 
@@ -121,6 +126,25 @@ class TestExtractCodeDiscussions:
 
         assert result == []
 
+    def test_extract_uses_snippet_source_when_snippet_missing(self, sample_feed_message):
+        del sample_feed_message["details"]["codeDiscussion"]["snippet"]
+        local_lines = [{"text": "val x = 1", "type": None, "old_line": None, "new_line": 41, "deletes": None, "inserts": None}]
+        calls = []
+
+        def snippet_source(anchor, end_anchor):
+            calls.append((anchor["filename"], end_anchor))
+            return local_lines
+
+        [result] = extract_code_discussions([sample_feed_message], snippet_source=snippet_source)
+
+        assert result["snippet"] == local_lines
+        assert calls == [(sample_feed_message["details"]["codeDiscussion"]["anchor"]["filename"], None)]
+
+    def test_extract_prefers_downloaded_snippet_over_snippet_source(self, sample_feed_message):
+        [result] = extract_code_discussions([sample_feed_message], snippet_source=lambda *_: [])
+
+        assert result["snippet"]
+
 
 class TestFilterDiscussions:
     def test_filter_unresolved_only(self):
@@ -162,6 +186,58 @@ class TestFilterDiscussions:
         assert result == []
 
 
+class TestDiscussionFilter:
+    @pytest.fixture
+    def discussions(self):
+        return [
+            {"id": "1", "resolved": False, "author": "Andrew.Kozlov", "filename": "/plugins/bazel/A.kt", "is_suggestion": True},
+            {"id": "2", "resolved": True, "author": "Lev.Leontev", "filename": "/plugins/bazel/B.java", "is_suggestion": False},
+            {"id": "3", "resolved": False, "author": "Lev.Leontev", "filename": "/platform/C.kt", "is_suggestion": False},
+        ]
+
+    def test_author(self, discussions):
+        result = filter_discussions(discussions, False, DiscussionFilter(author="Lev.Leontev"))
+
+        assert [d["id"] for d in result] == ["2", "3"]
+
+    @pytest.mark.parametrize("glob, expected", [
+        ("plugins/bazel/*", ["1", "2"]),
+        ("/plugins/bazel/*", ["1", "2"]),
+        ("*.kt", ["1", "3"]),
+        ("platform/C.kt", ["3"]),
+    ])
+    def test_file_glob(self, discussions, glob, expected):
+        assert [d["id"] for d in filter_discussions(discussions, False, DiscussionFilter(file_glob=glob))] == expected
+
+    def test_combines_with_unresolved(self, discussions):
+        filters = DiscussionFilter(author="Lev.Leontev", file_glob="*.kt")
+
+        assert [d["id"] for d in filter_discussions(discussions, True, filters)] == ["3"]
+        assert [d["id"] for d in filter_discussions(discussions, False, DiscussionFilter(suggestions_only=True))] == ["1"]
+
+    def test_general_comments(self):
+        comments = [{"id": "c1", "author": "Andrew.Kozlov"}, {"id": "c2", "author": "Lev.Leontev"}]
+
+        assert filter_general_comments(comments) == comments
+        assert filter_general_comments(comments, DiscussionFilter(author="Lev.Leontev")) == [comments[1]]
+        assert filter_general_comments(comments, DiscussionFilter(file_glob="*.kt")) == []
+        assert filter_general_comments(comments, DiscussionFilter(suggestions_only=True)) == []
+
+
+class TestThreadPriority:
+    def test_orders_unresolved_suggestions_recent_then_resolved(self):
+        discussions = [
+            {"id": "old-open", "resolved": False, "is_suggestion": False, "feed_index": 0},
+            {"id": "resolved", "resolved": True, "is_suggestion": True, "feed_index": 5},
+            {"id": "new-open", "resolved": False, "is_suggestion": False, "feed_index": 3},
+            {"id": "suggestion", "resolved": False, "is_suggestion": True, "feed_index": 1},
+        ]
+
+        ordered = sorted(discussions, key=thread_priority)
+
+        assert [d["id"] for d in ordered] == ["suggestion", "new-open", "old-open", "resolved"]
+
+
 class TestBuildDiscussionWithThread:
     def test_build_with_thread_messages(self, sample_thread_message):
         discussion = {
@@ -417,3 +493,39 @@ class TestExtractGeneralComments:
         result = extract_general_comments([])
 
         assert result == []
+
+
+class TestSnippetPool:
+    def _feed_message(self, sample_feed_message, discussion_id):
+        message = copy.deepcopy(sample_feed_message)
+        message["details"]["codeDiscussion"]["id"] = discussion_id
+        return message
+
+    def test_discussions_on_same_hunk_share_snippet(self, sample_feed_message):
+        feed = [self._feed_message(sample_feed_message, "d1"), self._feed_message(sample_feed_message, "d2")]
+
+        first, second = extract_code_discussions(feed)
+
+        assert first["snippet"] is second["snippet"]
+        assert first["snippet"] == extract_code_discussions([sample_feed_message])[0]["snippet"]
+
+    def test_pool_shares_lines_across_reviews(self, sample_feed_message):
+        pool = SnippetPool()
+        shifted = self._feed_message(sample_feed_message, "d2")
+        shifted["details"]["codeDiscussion"]["snippet"]["lines"].append(
+            {"text": "}", "type": None, "oldLineNum": 43, "newLineNum": 44}
+        )
+
+        [first] = extract_code_discussions([sample_feed_message], snippet_pool=pool)
+        [second] = extract_code_discussions([shifted], snippet_pool=pool)
+
+        assert first["snippet"] is not second["snippet"]
+        assert all(a is b for a, b in zip(first["snippet"], second["snippet"]))
+        assert len(pool) == 4
+
+    def test_inline_diff_ranges_are_part_of_line_identity(self):
+        pool = SnippetPool()
+        plain = {"text": "x", "type": "MODIFIED", "deletes": None, "inserts": None}
+        modified = {"text": "x", "type": "MODIFIED", "deletes": [{"start": 0, "length": 1}], "inserts": None}
+
+        assert pool.intern([plain])[0] is not pool.intern([modified])[0]
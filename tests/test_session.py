@@ -0,0 +1,433 @@
+import copy
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from pytest_httpx import HTTPXMock
+
+from space_review import ReviewData, ReviewSession, SpaceClient, load_review, render_json, render_markdown
+from space_review.parser import parse_review_id
+from space_review.processor import DiscussionFilter, extract_code_discussions
+from space_review.index import ReviewIndex
+from space_review.session import (
+    ThreadScheduler,
+    count_unresolved,
+    fetch_review_data,
+    fetch_review_feed,
+    refresh_resolutions,
+)
+from space_review.snapshot import write_snapshot
+from space_review.store import ReviewStore
+
+
+@pytest.fixture
+def review_responses(httpx_mock: HTTPXMock, sample_review_data, sample_feed_message, sample_thread_message):
+    httpx_mock.add_response(url=re.compile(r".*/code-reviews/number:174369.*"), json=sample_review_data, is_reusable=True)
+    httpx_mock.add_response(url=re.compile(r".*channel=id:feed-channel-123.*"), json={"messages": [sample_feed_message]}, is_reusable=True)
+    httpx_mock.add_response(url=re.compile(r".*channel=id:disc-channel-1.*"), json={"messages": [sample_thread_message]}, is_reusable=True)
+    httpx_mock.add_response(url=re.compile(r".*/unbound-discussions.*"), json={"data": []}, is_reusable=True)
+    return httpx_mock
+
+
+class TestReviewSession:
+    def test_requires_token_or_client(self):
+        with pytest.raises(ValueError, match="token or client"):
+            ReviewSession()
+
+    def test_get_review_returns_structured_data(self, review_responses):
+        with ReviewSession(token="test-token") as session:
+            data = session.get_review("IJ-CR-174369")
+
+        assert isinstance(data, ReviewData)
+        assert data.review["id"] == "2wBoBc4URsmM"
+        assert [d["id"] for d in data.discussions] == ["disc-1"]
+        assert data.discussions[0]["author"] == "Lev.Leontev"
+        assert data.fetched_at is None
+
+    def test_reuses_injected_http_client(self, review_responses):
+        http_client = httpx.Client()
+        client = SpaceClient(token="test-token", http_client=http_client)
+
+        with ReviewSession(client=client) as session:
+            session.get_review("IJ-CR-174369")
+            session.get_review("IJ-CR-174369", unresolved_only=True)
+
+        assert not http_client.is_closed
+        assert all(r.headers["Authorization"] == "Bearer test-token" for r in review_responses.get_requests())
+        http_client.close()
+
+    def test_max_concurrency_caps_the_limiter(self):
+        with ReviewSession(token="test-token", max_concurrency=64) as session:
+            assert session.client.limiter.maximum == 64
+
+    def test_close_releases_owned_client(self):
+        session = ReviewSession(token="test-token")
+        session.close()
+
+        assert session.client._client.is_closed
+
+
+class TestLoadReview:
+    def test_load_review_from_store(self, tmp_path, sample_review_data, sample_feed_message):
+        db = tmp_path / "reviews.db"
+        with ReviewStore(db) as store:
+            store.save_review(sample_review_data, extract_code_discussions([sample_feed_message]))
+
+        data = load_review("IJ-CR-174369", store_path=str(db))
+
+        assert data.fetched_at is not None
+        assert [d["id"] for d in data.discussions] == ["disc-1"]
+
+    def test_load_review_from_snapshot_is_lazy(self, tmp_path, sample_review_data, sample_feed_message):
+        snap = tmp_path / "review.snap"
+        discussions = extract_code_discussions([sample_feed_message])
+        discussions[0]["text"] = "Use `exported`"
+        write_snapshot(snap, sample_review_data, discussions)
+
+        with load_review("IJ-CR-174369", snapshot_path=str(snap), filters=DiscussionFilter(file_glob="*.kt")) as data:
+            assert [d["id"] for d in data.discussions] == ["disc-1"]
+            assert not isinstance(data.discussions[0], dict)
+            assert "Use `exported`" in render_markdown(data)
+
+    def test_load_review_rejects_other_snapshot(self, tmp_path, sample_review_data):
+        snap = tmp_path / "review.snap"
+        write_snapshot(snap, sample_review_data, [])
+
+        with pytest.raises(ValueError, match="holds IJ-CR-174369, not IJ-CR-1"):
+            load_review("IJ-CR-1", snapshot_path=str(snap))
+
+    def test_load_review_missing(self, tmp_path):
+        with pytest.raises(ValueError, match="not in the local store"):
+            load_review("IJ-CR-1", store_path=str(tmp_path / "reviews.db"))
+
+
+class TestRender:
+    def test_render_functions_use_structured_data(self, sample_review_data):
+        data = ReviewData(sample_review_data, [], [], fetched_at="2024-01-15T10:30:00+00:00")
+
+        assert "**Offline:** cached" in render_markdown(data)
+        assert json.loads(render_json(data))["cache"]["fetched_at"] == "2024-01-15T10:30:00+00:00"
+
+
+def _fake_client(sample_review_data, feed, thread_for):
+    client = MagicMock()
+    client.get_review_by_number.return_value = sample_review_data
+    client.get_feed_messages.return_value = feed
+    client.get_unbound_discussions.return_value = []
+    client.get_discussion_thread.side_effect = lambda channel_id, timeout=None: thread_for(channel_id)
+    return client
+
+
+def _feed(sample_feed_message, *discussions):
+    feed = []
+    for discussion_id, resolved in discussions:
+        message = copy.deepcopy(sample_feed_message)
+        message["details"]["codeDiscussion"].update(id=discussion_id, resolved=resolved, channel={"id": f"ch-{discussion_id}"})
+        feed.append(message)
+    return feed
+
+
+class TestThreadScheduler:
+    def test_thread_waits_for_that_discussion_only(self, sample_thread_message):
+        release = threading.Event()
+        client = MagicMock()
+        client.get_discussion_thread.side_effect = (
+            lambda channel_id, timeout=None: release.wait(5) and [] if channel_id == "ch-slow" else [sample_thread_message]
+        )
+        discussions = [
+            {"id": "slow", "channel_id": "ch-slow", "resolved": False, "feed_index": 1},
+            {"id": "fast", "channel_id": "ch-fast", "resolved": True, "feed_index": 0},
+        ]
+
+        with ThreadScheduler(client, discussions, concurrency=2) as scheduler:
+            assert scheduler.thread(discussions[1]) == [sample_thread_message]
+            release.set()
+            assert scheduler.thread(discussions[0]) == []
+
+    def test_thread_fetches_queued_discussion_inline(self, sample_thread_message):
+        started = threading.Event()
+        release = threading.Event()
+        callers = {}
+
+        def thread_for(channel_id, timeout=None):
+            callers[channel_id] = threading.current_thread()
+            if channel_id == "ch-open":
+                started.set()
+                release.wait(5)
+            return [sample_thread_message]
+
+        client = MagicMock()
+        client.get_discussion_thread.side_effect = thread_for
+        discussions = [
+            {"id": "done", "channel_id": "ch-done", "resolved": True, "feed_index": 0},
+            {"id": "open", "channel_id": "ch-open", "resolved": False, "feed_index": 1},
+        ]
+
+        with ThreadScheduler(client, discussions, concurrency=1) as scheduler:
+            started.wait(5)
+            assert scheduler.thread(discussions[0]) == [sample_thread_message]
+            release.set()
+
+        assert callers["ch-done"] is threading.current_thread()
+
+    def test_close_cancels_pending_fetches(self):
+        started = threading.Event()
+        release = threading.Event()
+        client = MagicMock()
+        client.get_discussion_thread.side_effect = lambda channel_id, timeout=None: (started.set(), release.wait(5), [])[2]
+        discussions = [{"id": str(i), "channel_id": f"ch-{i}", "resolved": False, "feed_index": i} for i in range(5)]
+
+        scheduler = ThreadScheduler(client, discussions, concurrency=1)
+        started.wait(5)
+        scheduler.close()
+        release.set()
+
+        assert client.get_discussion_thread.call_count == 1
+        assert sum(f.cancelled() for f in scheduler.futures.values()) == 4
+
+
+class TestDeadline:
+    def test_slow_threads_become_placeholders(self, sample_review_data, sample_feed_message, sample_thread_message):
+        release = threading.Event()
+
+        def thread_for(channel_id):
+            if channel_id == "ch-slow":
+                release.wait(5)
+            return [sample_thread_message]
+
+        feed = _feed(sample_feed_message, ("fast", False), ("slow", False))
+        client = _fake_client(sample_review_data, feed, thread_for)
+        try:
+            review, discussions, _ = fetch_review_data(
+                client, parse_review_id("IJ-CR-174369"), False, deadline=time.monotonic() + 0.2
+            )
+        finally:
+            release.set()
+
+        by_id = {d["id"]: d for d in discussions}
+        assert by_id["fast"]["text"] == sample_thread_message["text"]
+        assert by_id["slow"]["partial"] is True
+        assert "Thread not loaded before the deadline" in render_markdown(ReviewData(review, discussions))
+
+    def test_unresolved_threads_are_fetched_first(self, sample_review_data, sample_feed_message, sample_thread_message):
+        calls = []
+
+        def thread_for(channel_id):
+            calls.append(channel_id)
+            return [sample_thread_message]
+
+        feed = _feed(sample_feed_message, ("a", True), ("b", False), ("c", True), ("d", False), ("e", False))
+        feed[1]["details"]["codeDiscussion"]["suggestedEdit"] = {"suggestionCommitId": "c1"}
+        client = _fake_client(sample_review_data, feed, thread_for)
+
+        fetch_review_data(client, parse_review_id("IJ-CR-174369"), False, concurrency=1)
+
+        assert calls == ["ch-b", "ch-e", "ch-d", "ch-c", "ch-a"]
+
+    def test_thread_errors_still_propagate(self, sample_review_data, sample_feed_message):
+        def thread_for(channel_id):
+            raise httpx.HTTPStatusError("boom", request=MagicMock(), response=MagicMock())
+
+        client = _fake_client(sample_review_data, _feed(sample_feed_message, ("a", False)), thread_for)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            fetch_review_data(client, parse_review_id("IJ-CR-174369"), False, deadline=time.monotonic() + 5)
+
+    def test_partial_review_is_not_persisted(self, tmp_path, sample_review_data, sample_feed_message):
+        def thread_for(channel_id):
+            raise httpx.ReadTimeout("slow")
+
+        client = _fake_client(sample_review_data, _feed(sample_feed_message, ("a", False)), thread_for)
+        db = tmp_path / "reviews.db"
+
+        fetch_review_data(client, parse_review_id("IJ-CR-174369"), False, store_path=str(db), deadline=time.monotonic() + 5)
+
+        with ReviewStore(db) as store:
+            assert store.load_review("IJ", "174369") is None
+
+    def test_expired_deadline_fails_before_header(self, sample_review_data):
+        client = _fake_client(sample_review_data, [], lambda channel_id: [])
+
+        with pytest.raises(TimeoutError):
+            fetch_review_data(client, parse_review_id("IJ-CR-174369"), False, deadline=time.monotonic() - 1)
+        client.get_review_by_number.assert_not_called()
+
+
+class TestFilterPushdown:
+    def test_filters_apply_before_thread_fetches(self, sample_review_data, sample_feed_message, sample_thread_message):
+        calls = []
+
+        def thread_for(channel_id):
+            calls.append(channel_id)
+            return [sample_thread_message]
+
+        feed = _feed(sample_feed_message, ("a", False), ("b", False), ("c", True))
+        feed[1]["details"]["codeDiscussion"]["anchor"]["filename"] = "/platform/Other.kt"
+        client = _fake_client(sample_review_data, feed, thread_for)
+        filters = DiscussionFilter(file_glob="plugins/*", since=datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+        _, discussions, _ = fetch_review_data(client, parse_review_id("IJ-CR-174369"), True, filters=filters)
+
+        assert [d["id"] for d in discussions] == ["a"]
+        assert calls == ["ch-a"]
+        assert client.get_feed_messages.call_args.kwargs["since"] == filters.since
+
+    def test_since_cannot_be_persisted(self, tmp_path, sample_review_data):
+        client = _fake_client(sample_review_data, [], lambda channel_id: [])
+        filters = DiscussionFilter(since=datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+        with pytest.raises(ValueError, match="since"):
+            fetch_review_data(client, parse_review_id("IJ-CR-174369"), False, store_path=str(tmp_path / "r.db"), filters=filters)
+        client.get_review_by_number.assert_not_called()
+
+    def test_persisted_review_is_whole(self, tmp_path, sample_review_data, sample_feed_message, sample_thread_message):
+        client = _fake_client(sample_review_data, _feed(sample_feed_message, ("a", False)), lambda channel_id: [sample_thread_message])
+        db = tmp_path / "reviews.db"
+
+        _, discussions, _ = fetch_review_data(
+            client, parse_review_id("IJ-CR-174369"), False, store_path=str(db), filters=DiscussionFilter(author="Nobody")
+        )
+
+        assert discussions == []
+        assert [d["id"] for d in load_review("IJ-CR-174369", store_path=str(db)).discussions] == ["a"]
+        assert load_review("IJ-CR-174369", store_path=str(db), filters=DiscussionFilter(author="Nobody")).discussions == []
+
+
+class TestRefreshResolutions:
+    @pytest.fixture
+    def db(self, tmp_path, sample_review_data, sample_feed_message):
+        db = tmp_path / "reviews.db"
+        comments = [{"id": "c1", "feed_index": 2, "author": "Lev.Leontev", "text": "LGTM", "time": None, "resolved": False}]
+        discussions = extract_code_discussions(_feed(sample_feed_message, ("a", False), ("b", True)))
+        with ReviewStore(db) as store:
+            store.save_review(sample_review_data, discussions, comments)
+        return str(db)
+
+    def _client(self, states, unbound):
+        client = MagicMock()
+        client.get_resolution_states.return_value = [{"details": {"className": "M2TextItemContent"}}] + [
+            {"details": {"className": "CodeDiscussionAddedFeedEvent", "codeDiscussion": {"id": i, "resolved": r}}}
+            for i, r in states
+        ]
+        client.get_unbound_discussions.return_value = unbound
+        return client
+
+    def test_applies_flips_to_stored_review(self, db):
+        client = self._client([("a", True), ("b", True), ("new", False)], [{"id": "u1", "resolved": True, "item": {"id": "c1"}}])
+
+        changes = refresh_resolutions(client, "IJ-CR-174369", store_path=db)
+
+        assert [(c["kind"], c["id"], c["change"]) for c in changes] == [
+            ("discussion", "a", "resolved"),
+            ("comment", "c1", "resolved"),
+        ]
+        data = load_review("IJ-CR-174369", store_path=db)
+        assert [d["resolved"] for d in data.discussions] == [True, True]
+        assert data.general_comments[0]["resolved"] is True
+        client.get_resolution_states.assert_called_once_with("feed-channel-123", timeout=None)
+        client.get_discussion_thread.assert_not_called()
+
+    def test_no_changes(self, db):
+        client = self._client([("a", False), ("b", True)], [])
+
+        assert refresh_resolutions(client, "IJ-CR-174369", store_path=db) == []
+
+    def test_requires_stored_review(self, tmp_path):
+        with pytest.raises(ValueError, match="not in the local store"):
+            refresh_resolutions(MagicMock(), "IJ-CR-1", store_path=str(tmp_path / "reviews.db"))
+
+
+class TestCountUnresolved:
+    def _client(self, sample_review_data, pages, unbound=()):
+        requested = []
+
+        def iter_pages(channel_id):
+            for page in pages:
+                requested.append(page)
+                yield [
+                    {"details": {"className": "CodeDiscussionAddedFeedEvent", "codeDiscussion": {"id": i, "resolved": r}}}
+                    for i, r in page
+                ]
+
+        client = MagicMock()
+        client.get_review_by_number.return_value = sample_review_data
+        client.iter_resolution_pages.side_effect = iter_pages
+        client.get_unbound_discussions.return_value = list(unbound)
+        return client, requested
+
+    def test_counts_feed_and_unbound(self, sample_review_data):
+        pages = [[("a", False), ("b", True)], [("c", False), ("a", False)]]
+        unbound = [{"resolved": False, "item": {"id": "c1"}}, {"resolved": False, "archived": True}, {"resolved": True}]
+        client, _ = self._client(sample_review_data, pages, unbound)
+
+        assert count_unresolved(client, parse_review_id("IJ-CR-174369")) == (3, True)
+        client.get_discussion_thread.assert_not_called()
+
+    def test_stops_paging_past_the_limit(self, sample_review_data):
+        pages = [[("a", False)], [("b", False)], [("c", False)]]
+        client, requested = self._client(sample_review_data, pages)
+
+        assert count_unresolved(client, parse_review_id("IJ-CR-174369"), limit=1) == (2, False)
+        assert len(requested) == 2
+
+    def test_uses_review_index(self, tmp_path, sample_review_data):
+        with ReviewIndex(tmp_path / "index.db") as index:
+            index.put("IJ", "174369", "2wBoBc4URsmM", "feed-channel-123")
+        client, _ = self._client(sample_review_data, [[]])
+
+        count_unresolved(client, parse_review_id("IJ-CR-174369"), limit=0, index_path=tmp_path / "index.db")
+
+        client.get_review_by_number.assert_not_called()
+        client.iter_resolution_pages.assert_called_once_with("feed-channel-123")
+
+
+class TestReviewIndexLookup:
+    def test_fetch_records_review_ids(self, tmp_path, sample_review_data):
+        client = _fake_client(sample_review_data, [], lambda channel_id: [])
+        index_path = tmp_path / "index.db"
+
+        fetch_review_feed(client, parse_review_id("IJ-CR-174369"), index_path=index_path)
+
+        with ReviewIndex(index_path) as index:
+            assert index.get("IJ", "174369") == ("2wBoBc4URsmM", "feed-channel-123")
+
+    def test_indexed_review_requests_feed_without_waiting_for_header(self, tmp_path, sample_review_data):
+        feed_started = threading.Event()
+        client = _fake_client(sample_review_data, [], lambda channel_id: [])
+        client.get_review_by_number.side_effect = lambda *args, **kwargs: (feed_started.wait(5), sample_review_data)[1]
+        client.get_feed_messages.side_effect = lambda *args, **kwargs: (feed_started.set(), [])[1]
+        index_path = tmp_path / "index.db"
+        with ReviewIndex(index_path) as index:
+            index.put("IJ", "174369", "2wBoBc4URsmM", "feed-channel-123")
+
+        start = time.monotonic()
+        fetch_review_feed(client, parse_review_id("IJ-CR-174369"), index_path=index_path)
+
+        assert time.monotonic() - start < 1
+        client.get_unbound_discussions.assert_called_once_with("IJ", "2wBoBc4URsmM", timeout=None)
+
+    def test_stale_index_entry_is_refetched_and_replaced(self, tmp_path, sample_review_data):
+        client = _fake_client(sample_review_data, [], lambda channel_id: [])
+        index_path = tmp_path / "index.db"
+        with ReviewIndex(index_path) as index:
+            index.put("IJ", "174369", "stale-id", "stale-feed")
+
+        fetch_review_feed(client, parse_review_id("IJ-CR-174369"), index_path=index_path)
+
+        assert client.get_feed_messages.call_args.args[0] == "feed-channel-123"
+        with ReviewIndex(index_path) as index:
+            assert index.get("IJ", "174369") == ("2wBoBc4URsmM", "feed-channel-123")
+
+    def test_unusable_index_is_ignored(self, tmp_path, sample_review_data):
+        client = _fake_client(sample_review_data, [], lambda channel_id: [])
+        index_path = tmp_path / "index.db"
+        index_path.write_text("not a database")
+
+        review, _, _ = fetch_review_feed(client, parse_review_id("IJ-CR-174369"), index_path=index_path)
+
+        assert review["id"] == "2wBoBc4URsmM"
@@ -0,0 +1,138 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from space_review.formatter import format_markdown, format_color, format_json
+from space_review.snapshot import _HEADER, Snapshot, write_snapshot
+
+
+@pytest.fixture
+def review_parts(sample_review_data, make_discussion):
+    snippet = [
+        {"text": "val x = 1", "type": None, "old_line": 0, "new_line": 0, "deletes": None, "inserts": None},
+        {"text": "val y = 2", "type": "MODIFIED", "old_line": 1, "new_line": 1,
+         "deletes": [{"start": 8, "length": 1}], "inserts": [{"start": 8, "length": 1}]},
+    ]
+    thread = [{"author": "Lev.Leontev", "text": "reply ✅"}]
+    discussions = [
+        make_discussion("d1", "/b/Second.kt", line=0, end_line=2, snippet=snippet, thread=thread),
+        make_discussion(
+            "d2", "/a/First.kt", resolved=True, feed_index=2, line=0, end_line=2, snippet=snippet, thread=thread,
+            suggested_edit={"original": "a", "suggested": "b"},
+        ),
+        make_discussion("d3", "/b/Second.kt", feed_index=3, line=0, end_line=2, snippet=snippet, thread=thread),
+    ]
+    comments = [{"id": "c1", "feed_index": 1, "author": "Lev.Leontev", "text": "LGTM", "time": "2024-01-15T10:30:00Z", "resolved": None}]
+    return sample_review_data, discussions, comments
+
+
+@pytest.fixture
+def snapshot_path(tmp_path, review_parts):
+    path = tmp_path / "review.snap"
+    write_snapshot(path, *review_parts, fetched_at="2026-10-01T00:00:00+00:00")
+    return path
+
+
+class TestSnapshotRoundTrip:
+    def test_review_and_fetch_time(self, snapshot_path, review_parts):
+        with Snapshot(snapshot_path) as snapshot:
+            assert snapshot.review == review_parts[0]
+            assert snapshot.fetched_at == "2026-10-01T00:00:00+00:00"
+            assert snapshot.discussion_count == 3
+
+    def test_discussions_match_processor_output(self, snapshot_path, review_parts):
+        with Snapshot(snapshot_path) as snapshot:
+            assert [dict(d) for d in snapshot.iter_discussions()] == review_parts[1]
+
+    def test_general_comments(self, snapshot_path, review_parts):
+        with Snapshot(snapshot_path) as snapshot:
+            assert snapshot.general_comments() == review_parts[2]
+
+    def test_rendering_matches_dict_input(self, snapshot_path, review_parts):
+        with Snapshot(snapshot_path) as snapshot:
+            discussions = list(snapshot.iter_discussions())
+            comments = snapshot.general_comments()
+            assert format_markdown(snapshot.review, discussions, comments) == format_markdown(*review_parts)
+            assert format_color(snapshot.review, discussions, comments) == format_color(*review_parts)
+            assert json.loads(format_json(snapshot.review, discussions, comments)) == json.loads(format_json(*review_parts))
+
+
+class TestSnapshotLazyAccess:
+    def test_filters_by_filename_through_index(self, snapshot_path):
+        with Snapshot(snapshot_path) as snapshot:
+            assert [d["id"] for d in snapshot.iter_discussions(filename="/b/Second.kt")] == ["d1", "d3"]
+            assert [d["id"] for d in snapshot.iter_discussions(filename="/a/First.kt")] == ["d2"]
+            assert list(snapshot.iter_discussions(filename="/c/Missing.kt")) == []
+
+    def test_filters_by_glob_through_index(self, snapshot_path):
+        with Snapshot(snapshot_path) as snapshot:
+            assert [d["id"] for d in snapshot.iter_discussions(file_glob="b/*.kt")] == ["d1", "d3"]
+            assert [d["id"] for d in snapshot.iter_discussions(file_glob="*.kt")] == ["d1", "d2", "d3"]
+            assert [d["id"] for d in snapshot.iter_discussions(file_glob="/a/*", unresolved_only=True)] == []
+
+    def test_filters_unresolved(self, snapshot_path):
+        with Snapshot(snapshot_path) as snapshot:
+            assert [d["id"] for d in snapshot.iter_discussions(unresolved_only=True)] == ["d1", "d3"]
+
+    def test_single_record_access(self, snapshot_path):
+        with Snapshot(snapshot_path) as snapshot:
+            discussion = snapshot.discussion(1)
+            assert discussion["filename"] == "/a/First.kt"
+            assert discussion.get("missing") is None
+            with pytest.raises(IndexError):
+                snapshot.discussion(3)
+
+    def test_strings_are_stored_once(self, tmp_path, review_parts, make_discussion):
+        review, discussions, comments = review_parts
+        path = tmp_path / "big.snap"
+        write_snapshot(path, review, [make_discussion(f"d{i}", "/b/Second.kt") for i in range(200)], comments)
+        assert path.stat().st_size < 200 * 200
+
+    def test_shared_snippets_are_stored_once(self, tmp_path, review_parts, make_discussion):
+        review, discussions, comments = review_parts
+        snippet = discussions[0]["snippet"]
+        path = tmp_path / "many.snap"
+        copies = [make_discussion(f"d{i}", snippet=[dict(line) for line in snippet]) for i in range(50)]
+        write_snapshot(path, review, copies, comments)
+
+        header = _HEADER.unpack(path.read_bytes()[:_HEADER.size])
+        snippet_line_count = header[3 + 2 * 3 + 1]
+        assert snippet_line_count == 2
+        with Snapshot(path) as snapshot:
+            assert snapshot.discussion(49)["snippet"] == snippet
+
+
+class TestSnapshotErrors:
+    def test_rejects_non_snapshot_file(self, tmp_path):
+        path = tmp_path / "review.json"
+        path.write_text("{}")
+        with pytest.raises(ValueError, match="Invalid snapshot"):
+            Snapshot(path)
+
+    def test_rejects_empty_file(self, tmp_path):
+        path = tmp_path / "empty.snap"
+        path.write_bytes(b"")
+        with pytest.raises(ValueError, match="Invalid snapshot"):
+            Snapshot(path)
+
+    def test_rejects_truncated_file(self, snapshot_path):
+        data = snapshot_path.read_bytes()
+        snapshot_path.write_bytes(data[:len(data) // 2])
+        with pytest.raises(ValueError, match="Invalid snapshot"):
+            Snapshot(snapshot_path)
+
+    def test_rejects_truncated_header(self, snapshot_path):
+        snapshot_path.write_bytes(snapshot_path.read_bytes()[:_HEADER.size - 1])
+        with pytest.raises(ValueError, match="Invalid snapshot"):
+            Snapshot(snapshot_path)
+
+    def test_failed_write_keeps_previous_snapshot(self, snapshot_path, review_parts):
+        review, discussions, comments = review_parts
+        previous = snapshot_path.read_bytes()
+
+        with patch("space_review.snapshot.os.replace", side_effect=OSError("disk full")), pytest.raises(OSError):
+            write_snapshot(snapshot_path, review, discussions[:1], comments)
+
+        assert snapshot_path.read_bytes() == previous
+        assert [p.name for p in snapshot_path.parent.iterdir()] == [snapshot_path.name]
@@ -0,0 +1,248 @@
+import pytest
+
+from space_review.processor import extract_code_discussions, extract_general_comments
+from space_review.store import ReviewStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ReviewStore(tmp_path / "reviews.db") as store:
+        yield store
+
+
+class TestSaveReview:
+    def test_round_trips_processor_output(self, store, sample_review_data, sample_feed_message, sample_thread_message):
+        discussions = extract_code_discussions([sample_feed_message])
+        discussions[0]["thread"] = [{"author": "Lev.Leontev", "text": sample_thread_message["text"]}]
+
+        store.save_review(sample_review_data, discussions)
+        result = store.query_discussions(project="IJ", number=174369)
+
+        assert len(result) == 1
+        assert result[0]["project"] == "IJ"
+        assert result[0]["number"] == 174369
+        for key, value in discussions[0].items():
+            assert result[0][key] == value
+
+    def test_saving_again_replaces_previous_rows(self, store, sample_review_data, make_discussion):
+        store.save_review(sample_review_data, [make_discussion("d1", "/a.kt"), make_discussion("d2", "/b.kt")])
+        reply = {"author": "Lev.Leontev", "text": "reply"}
+        store.save_review(sample_review_data, [make_discussion("d1", "/a.kt", resolved=True, thread=[reply])])
+
+        result = store.query_discussions()
+
+        assert [d["id"] for d in result] == ["d1"]
+        assert result[0]["resolved"] is True
+        assert result[0]["thread"] == [reply]
+
+    def test_saves_general_comments(self, store, sample_review_data):
+        feed = [{"id": "c1", "text": "LGTM", "author": {"name": "Lev.Leontev"}, "details": {"className": "M2TextItemContent"}}]
+        comments = extract_general_comments(feed)
+
+        store.save_review(sample_review_data, [], comments)
+
+        rows = store._conn.execute("SELECT id, author, text FROM general_comments").fetchall()
+        assert [tuple(r) for r in rows] == [("c1", "Lev.Leontev", "LGTM")]
+
+
+class TestQueryDiscussions:
+    @pytest.fixture(autouse=True)
+    def _populate(self, store, sample_review_data, make_discussion):
+        other_review = {**sample_review_data, "id": "other", "number": 1, "project": {"key": "KT"}}
+        store.save_review(sample_review_data, [
+            make_discussion("d1", "/plugins/bazel/A.kt", feed_index=0),
+            make_discussion("d2", "/plugins/bazel/B.kt", resolved=True, feed_index=1),
+            make_discussion("d3", "/plugins/maven/C.kt", author="Lev.Leontev", feed_index=2),
+        ])
+        store.save_review(other_review, [make_discussion("d4", "/plugins/bazel/D.kt")])
+
+    def test_filters_by_filename_prefix_and_resolved(self, store):
+        result = store.query_discussions(filename_prefix="plugins/bazel/", resolved=False)
+        assert [d["id"] for d in result] == ["d1", "d4"]
+
+    def test_filters_by_project_and_number(self, store):
+        assert [d["id"] for d in store.query_discussions(project="KT")] == ["d4"]
+        assert [d["id"] for d in store.query_discussions(project="IJ", number="174369")] == ["d1", "d2", "d3"]
+
+    def test_filters_by_author(self, store):
+        assert [d["id"] for d in store.query_discussions(author="Lev.Leontev")] == ["d3"]
+
+    def test_filename_query_uses_index(self, store):
+        plan = store._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM discussions WHERE filename >= ? AND filename < ?",
+            ("/plugins/", "/plugins/\U0010ffff"),
+        ).fetchall()
+        assert any("idx_discussions_filename" in row[-1] for row in plan)
+
+
+class TestSearch:
+    @pytest.fixture(autouse=True)
+    def _populate(self, store, sample_review_data, make_discussion):
+        first = make_discussion("d1", "/plugins/bazel/A.kt", feed_index=0)
+        first["text"] = "I'd suggest using `exported` word everywhere."
+        second = make_discussion("d2", "/plugins/bazel/B.kt", feed_index=1)
+        second["thread"] = [{"author": "Lev.Leontev", "text": "exported is set per dependency, exported twice"}]
+        third = make_discussion("d3", "/plugins/bazel/C.kt", feed_index=2)
+        third["snippet"] = [{"text": "val exported = true", "type": "ADDED", "old_line": None, "new_line": 10, "deletes": None, "inserts": None}]
+        comments = [{"id": "c1", "feed_index": 3, "author": "Lev.Leontev", "text": "Nothing exported here", "time": None, "resolved": None}]
+        store.save_review(sample_review_data, [first, second, third, make_discussion("d4", "/other.kt")], comments)
+
+    def test_finds_discussions_replies_snippets_and_comments(self, store):
+        hits = store.search("exported")
+
+        assert {(h["type"], h["id"]) for h in hits} == {
+            ("discussion", "d1"), ("discussion", "d2"), ("discussion", "d3"), ("comment", "c1"),
+        }
+        by_id = {h["id"]: h for h in hits}
+        assert by_id["d2"]["matched"] == ["reply"]
+        assert by_id["d3"]["matched"] == ["snippet"]
+        assert by_id["d1"]["item"]["filename"] == "/plugins/bazel/A.kt"
+        assert by_id["c1"]["item"]["project"] == "IJ"
+
+    def test_hits_are_ranked(self, store):
+        scores = [h["score"] for h in store.search("exported")]
+        assert scores == sorted(scores)
+
+    def test_query_syntax_characters_do_not_raise(self, store):
+        assert store.search('exported" OR (') == []
+        assert [h["id"] for h in store.search("`exported`-word")] == ["d1"]
+
+    def test_limit(self, store):
+        assert len(store.search("exported", limit=2)) == 2
+        assert store.search("exported", limit=0) == []
+
+    def test_limit_counts_items_not_matching_rows(self, store, sample_review_data, make_discussion):
+        chatty = make_discussion("d9", "/chatty.kt", thread=[{"author": "Lev.Leontev", "text": "exported"}] * 20)
+        store.save_review({**sample_review_data, "id": "other", "number": 1}, [chatty])
+
+        hits = store.search("exported", limit=3)
+
+        assert len(hits) == 3
+        assert hits[0]["id"] == "d9"
+        assert len({hit["id"] for hit in hits}) == 3
+
+    def test_resaving_review_replaces_index_rows(self, store, sample_review_data):
+        store.save_review(sample_review_data, [])
+        assert store.search("exported") == []
+
+
+class TestLoadReview:
+    def test_returns_review_discussions_comments_and_fetch_time(self, store, sample_review_data, make_discussion):
+        comments = [{"id": "c1", "feed_index": 1, "author": "Lev.Leontev", "text": "LGTM", "time": None, "resolved": True}]
+        store.save_review(sample_review_data, [make_discussion("d1", "/a.kt")], comments, fetched_at="2026-10-01T00:00:00+00:00")
+
+        review, discussions, general_comments, fetched_at = store.load_review("IJ", "174369")
+
+        assert review == sample_review_data
+        assert discussions == [make_discussion("d1", "/a.kt")]
+        assert general_comments == comments
+        assert fetched_at == "2026-10-01T00:00:00+00:00"
+
+    def test_missing_review_returns_none(self, store):
+        assert store.load_review("IJ", 1) is None
+
+
+class TestUpdateResolved:
+    def test_updates_only_given_items(self, store, sample_review_data, make_discussion):
+        comments = [{"id": "c1", "feed_index": 1, "author": "Lev.Leontev", "text": "LGTM", "time": None, "resolved": False}]
+        store.save_review(sample_review_data, [make_discussion("d1", "/a.kt"), make_discussion("d2", "/b.kt")], comments)
+
+        store.update_resolved(sample_review_data["id"], {"d2": True}, {"c1": True})
+
+        _, discussions, comments, _ = store.load_review("IJ", 174369)
+        assert [d["resolved"] for d in discussions] == [False, True]
+        assert comments[0]["resolved"] is True
+
+    def test_counts_changed_items(self, store, sample_review_data, make_discussion):
+        store.save_review(sample_review_data, [make_discussion("d1", "/a.kt"), make_discussion("d2", "/b.kt")])
+
+        assert store.update_resolved(sample_review_data["id"], {"d1": False, "d2": True}, {}) == 1
+        assert store.update_resolved(sample_review_data["id"], {"d2": True}, {}) == 0
+
+
+class TestTargetedUpdates:
+    def test_update_review_keeps_items_and_fetch_time(self, store, sample_review_data, make_discussion):
+        store.save_review(sample_review_data, [make_discussion("d1", "/a.kt")], fetched_at="2026-10-01T00:00:00+00:00")
+
+        assert store.update_review(sample_review_data["id"], state="Closed")
+        assert not store.update_review(sample_review_data["id"], state="Closed")
+
+        review, discussions, _, fetched_at = store.load_review("IJ", 174369)
+        assert (review["title"], review["state"]) == (sample_review_data["title"], "Closed")
+        assert [d["id"] for d in discussions] == ["d1"]
+        assert fetched_at == "2026-10-01T00:00:00+00:00"
+
+    def test_add_feed_items_appends_and_indexes(self, store, sample_review_data, make_discussion):
+        store.save_review(sample_review_data, [make_discussion("d1", "/a.kt")])
+        comment = {"id": "c1", "author": "Lev.Leontev", "text": "Looks reasonable", "time": None, "resolved": None}
+
+        assert store.add_feed_items(sample_review_data["id"], [make_discussion("d2", "/b.kt", feed_index=5)], [comment])
+        assert not store.add_feed_items(sample_review_data["id"], [], [comment])
+
+        _, discussions, comments, _ = store.load_review("IJ", 174369)
+        assert [(d["id"], d["feed_index"]) for d in discussions] == [("d1", 0), ("d2", 1)]
+        assert comments[0]["feed_index"] == 1
+        assert [(hit["type"], hit["id"]) for hit in store.search("reasonable")] == [("comment", "c1")]
+
+    def test_add_reply_fills_text_then_appends(self, store, sample_review_data, make_discussion):
+        discussion = make_discussion("d1", "/a.kt", author=None, text=None)
+        store.save_review(sample_review_data, [discussion])
+
+        assert store.add_reply("channel-d1", "Andrew.Kozlov", "Please rename")
+        assert store.add_reply("channel-d1", "Lev.Leontev", "Renamed")
+        assert not store.add_reply("channel-d1", "Lev.Leontev", "Renamed")
+        assert not store.add_reply("elsewhere", "Lev.Leontev", "Renamed")
+
+        _, discussions, _, _ = store.load_review("IJ", 174369)
+        assert (discussions[0]["author"], discussions[0]["text"]) == ("Andrew.Kozlov", "Please rename")
+        assert discussions[0]["thread"] == [{"author": "Lev.Leontev", "text": "Renamed"}]
+        assert [hit["matched"] for hit in store.search("rename")] == [["discussion"]]
+        assert [hit["matched"] for hit in store.search("renamed")] == [["reply"]]
+
+
+    def test_general_comment_edit_and_deletion(self, store, sample_review_data):
+        comment = {"id": "c1", "feed_index": 0, "author": "Lev.Leontev", "text": "LGTM", "time": None, "resolved": None}
+        store.save_review(sample_review_data, [], [comment])
+
+        assert store.update_general_comment(sample_review_data["id"], "c1", "Looks reasonable")
+        assert not store.update_general_comment(sample_review_data["id"], "c1", "Looks reasonable")
+        assert [hit["id"] for hit in store.search("reasonable")] == ["c1"]
+        assert store.search("LGTM") == []
+
+        assert store.delete_general_comment(sample_review_data["id"], "c1")
+        assert not store.delete_general_comment(sample_review_data["id"], "c1")
+        assert store.load_review("IJ", 174369)[2] == []
+        assert store.search("reasonable") == []
+
+
+class TestSnippetStorage:
+    def test_identical_snippets_are_stored_once(self, store, sample_review_data, make_discussion):
+        other_review = {**sample_review_data, "id": "other", "number": 1}
+        store.save_review(sample_review_data, [make_discussion("d1", "/a.kt"), make_discussion("d2", "/a.kt")])
+        store.save_review(other_review, [make_discussion("d3", "/a.kt")])
+
+        assert store._conn.execute("SELECT COUNT(*) FROM snippets").fetchone()[0] == 1
+        discussions = store.query_discussions()
+        assert discussions[0]["snippet"] == make_discussion("d1", "/a.kt")["snippet"]
+        assert discussions[0]["snippet"] is discussions[1]["snippet"]
+
+    def test_unreferenced_snippets_are_removed(self, store, sample_review_data, make_discussion):
+        changed = make_discussion("d1", "/a.kt")
+        changed["snippet"] = []
+        store.save_review(sample_review_data, [make_discussion("d1", "/a.kt")])
+        store.save_review(sample_review_data, [changed])
+
+        assert [row[0] for row in store._conn.execute("SELECT lines FROM snippets")] == ["[]"]
+
+    def test_older_schema_is_rebuilt(self, tmp_path, sample_review_data, make_discussion):
+        import sqlite3
+
+        path = tmp_path / "old.db"
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE discussions (id TEXT PRIMARY KEY, snippet TEXT)")
+        conn.commit()
+        conn.close()
+
+        with ReviewStore(path) as store:
+            store.save_review(sample_review_data, [make_discussion("d1", "/a.kt")])
+            assert [d["id"] for d in store.query_discussions()] == ["d1"]
@@ -0,0 +1,208 @@
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from space_review.processor import extract_code_discussions, extract_general_comments
+from space_review.store import ReviewStore
+from space_review.webhook import apply_event, make_server, sign, verify_signature
+
+SIGNING_KEY = "test-signing-key"
+
+
+@pytest.fixture
+def store(tmp_path, sample_review_data, sample_feed_message):
+    general = {
+        "id": "comment-1",
+        "text": "LGTM overall",
+        "author": {"name": "Lev.Leontev"},
+        "time": "2024-01-15T09:00:00Z",
+        "details": {"className": "M2TextItemContent"},
+    }
+    feed = [general, sample_feed_message]
+    with ReviewStore(tmp_path / "reviews.db") as store:
+        store.save_review(
+            sample_review_data,
+            extract_code_discussions(feed),
+            extract_general_comments(feed, [{"item": {"id": "comment-1"}, "resolved": False}]),
+        )
+        yield store
+
+
+def _message(message_id, text, author="Andrew.Kozlov", details=None):
+    return {"id": message_id, "text": text, "author": {"name": author}, "time": 1705312800000, "details": details}
+
+
+class TestVerifySignature:
+    def test_valid_signature(self):
+        timestamp = str(int(time.time() * 1000))
+        assert verify_signature(SIGNING_KEY, timestamp, b"{}", sign(SIGNING_KEY, timestamp, b"{}"))
+
+    def test_rejects_tampered_body(self):
+        timestamp = str(int(time.time() * 1000))
+        assert not verify_signature(SIGNING_KEY, timestamp, b"{ }", sign(SIGNING_KEY, timestamp, b"{}"))
+
+    def test_rejects_stale_timestamp(self):
+        timestamp = str(int((time.time() - 3600) * 1000))
+        assert not verify_signature(SIGNING_KEY, timestamp, b"{}", sign(SIGNING_KEY, timestamp, b"{}"))
+
+    @pytest.mark.parametrize("timestamp, signature", [(None, "abc"), ("123", None), ("soon", "abc")])
+    def test_rejects_missing_headers(self, timestamp, signature):
+        assert not verify_signature(SIGNING_KEY, timestamp, b"{}", signature)
+
+
+class TestApplyEvent:
+    def test_review_state_change(self, store):
+        event = {"className": "CodeReviewWebhookEvent", "reviewId": "2wBoBc4URsmM", "title": "New title",
+                 "review": {"id": "2wBoBc4URsmM", "title": "New title", "state": "Closed"}}
+        _, discussions_before, _, fetched_at = store.load_review("IJ", 174369)
+
+        assert apply_event(store, event) == "IJ-CR-174369"
+        assert apply_event(store, event) is None
+
+        review, discussions, _, fetched_after = store.load_review("IJ", 174369)
+        assert (review["title"], review["state"]) == ("New title", "Closed")
+        assert discussions == discussions_before
+        assert fetched_after == fetched_at
+
+    def test_discussion_resolved(self, store):
+        event = {
+            "className": "CodeReviewDiscussionWebhookEvent",
+            "review": {"id": "2wBoBc4URsmM"},
+            "discussion": {"className": "CodeReviewDiscussion.Bound", "discussion": {"id": "disc-1"}},
+            "resolved": {"old": False, "new": True},
+        }
+
+        assert apply_event(store, event) == "IJ-CR-174369"
+        assert apply_event(store, event) is None
+
+        _, discussions, _, _ = store.load_review("IJ", 174369)
+        assert discussions[0]["resolved"] is True
+
+    def test_unbound_discussion_resolved(self, store):
+        event = {
+            "className": "CodeReviewDiscussionWebhookEvent",
+            "review": {"id": "2wBoBc4URsmM"},
+            "discussion": {"className": "CodeReviewDiscussion.Unbound", "discussion": {"id": "u1", "item": {"id": "comment-1"}}},
+            "resolved": {"old": False, "new": True},
+        }
+
+        apply_event(store, event)
+
+        _, _, comments, _ = store.load_review("IJ", 174369)
+        assert comments[0]["resolved"] is True
+
+    def test_thread_messages_fill_text_then_replies(self, store):
+        first = {"className": "ChatMessageCreatedEvent", "channelId": "disc-channel-1", "message": _message("m1", "Use `exported`")}
+        reply = {"className": "ChatMessageCreatedEvent", "channelId": "disc-channel-1", "message": _message("m2", "Done", "Lev.Leontev")}
+
+        apply_event(store, first)
+        apply_event(store, reply)
+        assert apply_event(store, reply) is None
+
+        _, discussions, _, _ = store.load_review("IJ", 174369)
+        assert discussions[0]["text"] == "Use `exported`"
+        assert discussions[0]["thread"] == [{"author": "Lev.Leontev", "text": "Done"}]
+        assert store.search("exported")[0]["id"] == "disc-1"
+
+    def test_feed_message_adds_general_comment(self, store):
+        event = {
+            "className": "ChatMessageCreatedEvent",
+            "channelId": "feed-channel-123",
+            "message": _message("comment-2", "Please add a test", details={"className": "M2TextItemContent"}),
+        }
+
+        apply_event(store, event)
+
+        _, discussions, comments, _ = store.load_review("IJ", 174369)
+        assert [c["id"] for c in comments] == ["comment-1", "comment-2"]
+        assert comments[1]["feed_index"] > discussions[0]["feed_index"]
+
+    def test_general_comment_edit_and_deletion(self, store):
+        edited = {
+            "className": "ChatMessageUpdatedEvent",
+            "channelId": "feed-channel-123",
+            "message": _message("comment-1", "LGTM once the tests pass", "Lev.Leontev"),
+        }
+        deleted = {"className": "ChatMessageDeletedEvent", "channelId": "feed-channel-123", "messageId": "comment-1"}
+
+        assert apply_event(store, edited) == "IJ-CR-174369"
+        assert apply_event(store, edited) is None
+        assert store.load_review("IJ", 174369)[2][0]["text"] == "LGTM once the tests pass"
+        assert [hit["id"] for hit in store.search("tests")] == ["comment-1"]
+
+        assert apply_event(store, deleted) == "IJ-CR-174369"
+        assert apply_event(store, deleted) is None
+        assert store.load_review("IJ", 174369)[2] == []
+        assert store.search("LGTM") == []
+
+    def test_thread_message_edit_is_not_tracked(self, store):
+        event = {"className": "ChatMessageUpdatedEvent", "channelId": "disc-channel-1", "message": _message("m1", "Edited")}
+
+        assert apply_event(store, event) is None
+
+    def test_unknown_review_is_ignored(self, store):
+        event = {"className": "ChatMessageCreatedEvent", "channelId": "elsewhere", "message": _message("x", "hi")}
+
+        assert apply_event(store, event) is None
+        assert apply_event(store, {"className": "IssueWebhookEvent"}) is None
+
+
+class TestWebhookServer:
+    @pytest.fixture
+    def server(self, store, tmp_path):
+        events = []
+        server = make_server(tmp_path / "reviews.db", SIGNING_KEY, port=0, on_event=lambda *args: events.append(args))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server, events
+        server.shutdown()
+        server.server_close()
+
+    def _post(self, server, payload, signing_key=SIGNING_KEY):
+        body = json.dumps({"clientId": "c", "webhookId": "w", "payload": payload}).encode()
+        timestamp = str(int(time.time() * 1000))
+        return httpx.post(
+            f"http://127.0.0.1:{server.server_port}/",
+            content=body,
+            headers={"X-Space-Timestamp": timestamp, "X-Space-Signature": sign(signing_key, timestamp, body)},
+        )
+
+    def test_signed_event_updates_store(self, server, tmp_path):
+        server, events = server
+        event = {
+            "className": "CodeReviewDiscussionWebhookEvent",
+            "review": {"id": "2wBoBc4URsmM"},
+            "discussion": {"className": "CodeReviewDiscussion.Bound", "discussion": {"id": "disc-1"}},
+            "resolved": {"old": False, "new": True},
+        }
+
+        response = self._post(server, event)
+
+        assert response.status_code == 200
+        assert events == [("CodeReviewDiscussionWebhookEvent", "IJ-CR-174369")]
+        with ReviewStore(tmp_path / "reviews.db") as store:
+            assert store.load_review("IJ", 174369)[1][0]["resolved"] is True
+
+    def test_bad_signature_is_rejected(self, server):
+        server, events = server
+
+        response = self._post(server, {"className": "CodeReviewWebhookEvent"}, signing_key="wrong")
+
+        assert response.status_code == 401
+        assert events == []
+
+    def test_malformed_body_is_rejected(self, server):
+        server, _ = server
+        body = b"not json"
+        timestamp = str(int(time.time() * 1000))
+
+        response = httpx.post(
+            f"http://127.0.0.1:{server.server_port}/",
+            content=body,
+            headers={"X-Space-Timestamp": timestamp, "X-Space-Signature": sign(SIGNING_KEY, timestamp, body)},
+        )
+
+        assert response.status_code == 400